@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class AnswersConfig(AppConfig):
     name = "answers"
+
+    def ready(self):
+        # Connects the signal handlers invalidating cached search results
+        from answers import search_cache  # noqa: F401
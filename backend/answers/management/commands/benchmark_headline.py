@@ -0,0 +1,123 @@
+import functools
+import random
+import re
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from answers.views_search import generate_boundary, parse_headline
+
+WORDS = (
+    "the of and to a in is that for it as with be on not this are by algorithm "
+    "proof lemma graph vertex edge complexity theorem induction matrix vector "
+    "probability distribution compiler grammar automaton regular language"
+).split()
+
+
+def legacy_parse_recursive(text, start_re, end_re, i, start_len, end_len):
+    parts = []
+    s = text[i:]
+    while i < len(text):
+        start_match = start_re.match(s)
+        end_match = end_re.match(s)
+        start_pos = start_match.end(0) if start_match else float("inf")
+        end_pos = end_match.end(0) if end_match else float("inf")
+        if not start_match and not end_match:
+            parts.append(s)
+            i += len(s)
+            return parts, i
+        elif start_pos < end_pos:
+            p = s[: start_pos - start_len]
+            if len(p) > 0:
+                parts.append(p)
+            i += start_pos
+            child, i = legacy_parse_recursive(
+                text, start_re, end_re, i, start_len, end_len
+            )
+            parts.append(child)
+        else:
+            i += end_pos
+            parts.append(s[: end_pos - end_len])
+            return parts, i
+        s = text[i:]
+    return parts, i
+
+
+def legacy_parse_headline(text, start, end, frag):
+    """The regex based parser this command compares `parse_headline` against."""
+    start_re = re.compile(".*?(" + re.escape(start) + ")", flags=re.DOTALL)
+    end_re = re.compile(".*?(" + re.escape(end) + ")", flags=re.DOTALL)
+    result = []
+    for part in text.split(frag):
+        res, i = legacy_parse_recursive(part, start_re, end_re, 0, len(start), len(end))
+        if i < len(part):
+            res.append(part[i:])
+        result.append(res)
+    return result
+
+
+def fake_headline(rng, fragments, words, start, end, frag):
+    """
+    Builds a string shaped like the output of ts_headline: `fragments` runs of `words`
+    words separated by `frag`, in which roughly every eighth word is highlighted.
+    """
+    return frag.join(
+        " ".join(
+            f"{start}{word}{end}" if rng.random() < 0.125 else word
+            for word in rng.choices(WORDS, k=words)
+        )
+        for _ in range(fragments)
+    )
+
+
+def run(parser, texts, start, end, frag):
+    return [parser(text, start, end, frag) for text in texts]
+
+
+class Command(BaseCommand):
+    help = "Compares the headline parser of the search against the old regex parser"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        start, end, frag = generate_boundary(), generate_boundary(), generate_boundary()
+        cases = [
+            # answers and comments: max_fragments=5, max_words=35
+            ("answer", 5, 35),
+            # exam pages have a few more matches on average
+            ("exam page", 5, 35 * 4),
+            # non-fragment mode returns a single long excerpt
+            ("long excerpt", 1, 2000),
+        ]
+        for name, fragments, words in cases:
+            texts = [
+                fake_headline(rng, fragments, words, start, end, frag)
+                for _ in range(20)
+            ]
+            for text in texts:
+                if parse_headline(text, start, end, frag) != legacy_parse_headline(
+                    text, start, end, frag
+                ):
+                    raise AssertionError(f"parsers disagree on {text!r}")
+
+            timings = {}
+            for label, parser in (
+                ("legacy", legacy_parse_headline),
+                ("current", parse_headline),
+            ):
+                timings[label] = min(
+                    timeit.repeat(
+                        functools.partial(run, parser, texts, start, end, frag),
+                        number=10,
+                        repeat=options["repeat"],
+                    )
+                ) / (10 * len(texts))
+            self.stdout.write(
+                f"{name:>12} ({len(texts[0]):>6} chars): "
+                f"legacy {timings['legacy'] * 1e6:9.1f} us, "
+                f"current {timings['current'] * 1e6:9.1f} us, "
+                f"{timings['legacy'] / timings['current']:6.1f}x faster"
+            )
@@ -0,0 +1,134 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from answers import pdf_utils
+from answers.models import Exam
+from util import s3_util
+
+
+def extract(path):
+    start = time.perf_counter()
+    pages = pdf_utils.extract_pages(path)
+    return pages, time.perf_counter() - start
+
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+class Command(BaseCommand):
+    help = "Extracts the text of all exam PDFs again and rebuilds their pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of processes extracting text at the same time",
+        )
+        parser.add_argument(
+            "--stale",
+            action="store_true",
+            help="Only process exams extracted by an older version of the code",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="File listing the processed exams. Exams in it are skipped, so an "
+            "interrupted run can be resumed by passing the same file again.",
+        )
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.select_related("category").order_by("id")
+        if options["stale"]:
+            exams = exams.filter(
+                text_extraction_version__lt=pdf_utils.EXTRACTION_VERSION
+            )
+        done = read_checkpoint(options["checkpoint"])
+        exams = [exam for exam in exams if exam.filename not in done]
+        total = len(exams)
+        self.stdout.write(f"Processing {total} exam(s), {len(done)} already done")
+        if not total:
+            return
+
+        workers = max(1, options["workers"])
+        # Downloads happen in this process, keep a few PDFs ready for every worker
+        # but not the whole corpus.
+        max_pending = 2 * workers
+        finished = 0
+        start = time.perf_counter()
+        # Worker processes only parse PDFs. They are spawned instead of forked so
+        # that they do not inherit the database connections of this process.
+        with (
+            tempfile.TemporaryDirectory(dir=settings.COMSOL_UPLOAD_FOLDER) as tmpdir,
+            ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            ) as pool,
+        ):
+            queue = iter(exams)
+            pending = {}
+            while True:
+                while len(pending) < max_pending:
+                    exam = next(queue, None)
+                    if exam is None:
+                        break
+                    path = os.path.join(tmpdir, exam.filename)
+                    download_start = time.perf_counter()
+                    if not s3_util.save_file(
+                        settings.COMSOL_EXAM_DIR, exam.filename, path
+                    ):
+                        finished += 1
+                        self.report(finished, total, exam, "missing in S3")
+                        continue
+                    future = pool.submit(extract, path)
+                    pending[future] = (
+                        exam,
+                        path,
+                        time.perf_counter() - download_start,
+                    )
+                if not pending:
+                    break
+
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    exam, path, download_time = pending.pop(future)
+                    os.remove(path)
+                    finished += 1
+                    try:
+                        pages, extract_time = future.result()
+                    except Exception as e:
+                        self.report(finished, total, exam, f"failed: {e!r}")
+                        continue
+                    save_start = time.perf_counter()
+                    pdf_utils.save_pages(exam, pages)
+                    save_time = time.perf_counter() - save_start
+                    if options["checkpoint"]:
+                        with open(options["checkpoint"], "a") as f:
+                            f.write(exam.filename + "\n")
+                    self.report(
+                        finished,
+                        total,
+                        exam,
+                        f"{len(pages)} pages, download {download_time:.2f}s, "
+                        f"extract {extract_time:.2f}s, save {save_time:.2f}s",
+                    )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {finished} exam(s) in {time.perf_counter() - start:.1f}s"
+            )
+        )
+
+    def report(self, finished, total, exam, message):
+        self.stdout.write(f"({finished}/{total}) {exam.filename}: {message}")
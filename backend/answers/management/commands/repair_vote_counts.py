@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from answers.models import Answer, Comment
+
+# Counter column and the many-to-many field it counts
+COUNTS = {
+    Answer: {
+        "upvote_count": "upvotes",
+        "downvote_count": "downvotes",
+        "expertvote_count": "expertvotes",
+        "flagged_count": "flagged",
+        "marked_as_ai_count": "marked_as_ai",
+    },
+    Comment: {
+        "flagged_count": "flagged",
+        "marked_as_ai_count": "marked_as_ai",
+    },
+}
+
+
+def actual_count(model, relation):
+    through = getattr(model, relation).through
+    column = model._meta.model_name
+    return Coalesce(
+        Subquery(
+            through.objects.filter(**{column: OuterRef("pk")})
+            .values(column)
+            .annotate(count=Count("*"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = "Recomputes the vote counters of answers and comments from the vote tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the counters that are wrong",
+        )
+
+    def handle(self, *args, **options):
+        for model, counts in COUNTS.items():
+            for field, relation in counts.items():
+                wrong = list(
+                    model.objects.annotate(actual=actual_count(model, relation))
+                    .exclude(**{field: F("actual")})
+                    .values_list("pk", flat=True)
+                )
+                if wrong and not options["dry_run"]:
+                    model.objects.filter(pk__in=wrong).update(
+                        **{field: actual_count(model, relation)}
+                    )
+                self.stdout.write(
+                    f"{model._meta.label}.{field}: {len(wrong)} wrong counter(s)"
+                )
@@ -0,0 +1,97 @@
+# Manually written on 2026/10/18
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("answers", "0023_20260428_merge_upstream_user_solved_exams"),
+    ]
+
+    # The vector covers "category displayname - exam displayname". Exams
+    # recompute their own vector when their displayname or category changes,
+    # and a category rename recomputes the vectors of all exams in it. The
+    # category trigger only touches category_search_vector, so it does not
+    # cascade into the exam trigger.
+    sql = """
+    CREATE FUNCTION answers_exam_category_search_vector(category_id integer, displayname text)
+    RETURNS tsvector AS $$
+        SELECT to_tsvector(
+            'pg_catalog.english',
+            COALESCE(
+                (SELECT cc.displayname FROM categories_category cc WHERE cc.id = $1),
+                ''
+            ) || ' - ' || COALESCE($2, '')
+        );
+    $$ LANGUAGE sql STABLE;
+
+    CREATE FUNCTION answers_exam_category_search_vector_trigger() RETURNS trigger AS $$
+    BEGIN
+        NEW.category_search_vector := answers_exam_category_search_vector(
+            NEW.category_id, NEW.displayname
+        );
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER exam_category_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF displayname, category_id
+    ON answers_exam
+    FOR EACH ROW EXECUTE PROCEDURE
+    answers_exam_category_search_vector_trigger();
+
+    CREATE FUNCTION categories_category_exam_search_vector_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.displayname IS DISTINCT FROM OLD.displayname THEN
+            UPDATE answers_exam
+            SET category_search_vector = answers_exam_category_search_vector(
+                answers_exam.category_id, answers_exam.displayname
+            )
+            WHERE answers_exam.category_id = NEW.id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER category_exam_search_vector_trigger
+    AFTER UPDATE OF displayname
+    ON categories_category
+    FOR EACH ROW EXECUTE PROCEDURE
+    categories_category_exam_search_vector_trigger();
+
+    UPDATE answers_exam
+    SET category_search_vector = answers_exam_category_search_vector(
+        category_id, displayname
+    );
+    """
+
+    reverse_sql = """
+    DROP TRIGGER IF EXISTS category_exam_search_vector_trigger ON categories_category;
+    DROP FUNCTION IF EXISTS categories_category_exam_search_vector_trigger();
+    DROP TRIGGER IF EXISTS exam_category_search_vector_trigger ON answers_exam;
+    DROP FUNCTION IF EXISTS answers_exam_category_search_vector_trigger();
+    DROP FUNCTION IF EXISTS answers_exam_category_search_vector(integer, text);
+    """
+
+    operations = [
+        migrations.AddField(
+            model_name="exam",
+            name="category_search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(null=True),
+        ),
+        migrations.RunSQL(sql, reverse_sql),
+        migrations.AlterField(
+            model_name="exam",
+            name="category_search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(null=False),
+        ),
+        migrations.AddIndex(
+            model_name="exam",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["category_search_vector"],
+                name="answers_exa_categor_416cfd_gin",
+            ),
+        ),
+    ]
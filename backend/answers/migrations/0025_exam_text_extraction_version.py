@@ -0,0 +1,18 @@
+# Generated by Django 5.2.16 on 2026-10-18 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('answers', '0024_exam_category_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='text_extraction_version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
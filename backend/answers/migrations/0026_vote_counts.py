@@ -0,0 +1,149 @@
+# Manually written on 2026/10/18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("answers", "0025_exam_text_extraction_version"),
+    ]
+
+    # Every vote table keeps the matching counter of its answer or comment up to
+    # date. The arguments of the trigger function are the table of the counter, the
+    # column referencing it and the counter column. Deleting an answer or comment
+    # also deletes its votes, in which case the update finds no row.
+    sql = """
+    CREATE FUNCTION answers_update_vote_count() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            EXECUTE format(
+                'UPDATE %I SET %I = %I + 1 WHERE id = ($1).%I',
+                TG_ARGV[0], TG_ARGV[2], TG_ARGV[2], TG_ARGV[1]
+            ) USING NEW;
+        ELSE
+            EXECUTE format(
+                'UPDATE %I SET %I = %I - 1 WHERE id = ($1).%I',
+                TG_ARGV[0], TG_ARGV[2], TG_ARGV[2], TG_ARGV[1]
+            ) USING OLD;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER answers_answer_upvotes_count_trigger
+    AFTER INSERT OR DELETE ON answers_answer_upvotes
+    FOR EACH ROW EXECUTE PROCEDURE
+    answers_update_vote_count('answers_answer', 'answer_id', 'upvote_count');
+
+    CREATE TRIGGER answers_answer_downvotes_count_trigger
+    AFTER INSERT OR DELETE ON answers_answer_downvotes
+    FOR EACH ROW EXECUTE PROCEDURE
+    answers_update_vote_count('answers_answer', 'answer_id', 'downvote_count');
+
+    CREATE TRIGGER answers_answer_expertvotes_count_trigger
+    AFTER INSERT OR DELETE ON answers_answer_expertvotes
+    FOR EACH ROW EXECUTE PROCEDURE
+    answers_update_vote_count('answers_answer', 'answer_id', 'expertvote_count');
+
+    CREATE TRIGGER answers_answer_flagged_count_trigger
+    AFTER INSERT OR DELETE ON answers_answer_flagged
+    FOR EACH ROW EXECUTE PROCEDURE
+    answers_update_vote_count('answers_answer', 'answer_id', 'flagged_count');
+
+    CREATE TRIGGER answers_answer_marked_as_ai_count_trigger
+    AFTER INSERT OR DELETE ON answers_answer_marked_as_ai
+    FOR EACH ROW EXECUTE PROCEDURE
+    answers_update_vote_count('answers_answer', 'answer_id', 'marked_as_ai_count');
+
+    CREATE TRIGGER answers_comment_flagged_count_trigger
+    AFTER INSERT OR DELETE ON answers_comment_flagged
+    FOR EACH ROW EXECUTE PROCEDURE
+    answers_update_vote_count('answers_comment', 'comment_id', 'flagged_count');
+
+    CREATE TRIGGER answers_comment_marked_as_ai_count_trigger
+    AFTER INSERT OR DELETE ON answers_comment_marked_as_ai
+    FOR EACH ROW EXECUTE PROCEDURE
+    answers_update_vote_count('answers_comment', 'comment_id', 'marked_as_ai_count');
+
+    UPDATE answers_answer SET
+        upvote_count = (
+            SELECT count(*) FROM answers_answer_upvotes v
+            WHERE v.answer_id = answers_answer.id
+        ),
+        downvote_count = (
+            SELECT count(*) FROM answers_answer_downvotes v
+            WHERE v.answer_id = answers_answer.id
+        ),
+        expertvote_count = (
+            SELECT count(*) FROM answers_answer_expertvotes v
+            WHERE v.answer_id = answers_answer.id
+        ),
+        flagged_count = (
+            SELECT count(*) FROM answers_answer_flagged v
+            WHERE v.answer_id = answers_answer.id
+        ),
+        marked_as_ai_count = (
+            SELECT count(*) FROM answers_answer_marked_as_ai v
+            WHERE v.answer_id = answers_answer.id
+        );
+
+    UPDATE answers_comment SET
+        flagged_count = (
+            SELECT count(*) FROM answers_comment_flagged v
+            WHERE v.comment_id = answers_comment.id
+        ),
+        marked_as_ai_count = (
+            SELECT count(*) FROM answers_comment_marked_as_ai v
+            WHERE v.comment_id = answers_comment.id
+        );
+    """
+
+    reverse_sql = """
+    DROP TRIGGER IF EXISTS answers_answer_upvotes_count_trigger ON answers_answer_upvotes;
+    DROP TRIGGER IF EXISTS answers_answer_downvotes_count_trigger ON answers_answer_downvotes;
+    DROP TRIGGER IF EXISTS answers_answer_expertvotes_count_trigger ON answers_answer_expertvotes;
+    DROP TRIGGER IF EXISTS answers_answer_flagged_count_trigger ON answers_answer_flagged;
+    DROP TRIGGER IF EXISTS answers_answer_marked_as_ai_count_trigger ON answers_answer_marked_as_ai;
+    DROP TRIGGER IF EXISTS answers_comment_flagged_count_trigger ON answers_comment_flagged;
+    DROP TRIGGER IF EXISTS answers_comment_marked_as_ai_count_trigger ON answers_comment_marked_as_ai;
+    DROP FUNCTION IF EXISTS answers_update_vote_count();
+    """
+
+    operations = [
+        migrations.AddField(
+            model_name="answer",
+            name="upvote_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="answer",
+            name="downvote_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="answer",
+            name="expertvote_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="answer",
+            name="flagged_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="answer",
+            name="marked_as_ai_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="flagged_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="marked_as_ai_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunSQL(sql, reverse_sql),
+    ]
@@ -0,0 +1,44 @@
+# Manually written on 2026/10/18
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("answers", "0026_vote_counts"),
+    ]
+
+    # Notifies answers.section_events of every added or removed section and of every
+    # new cut_version. Notifications are only delivered once the transaction commits,
+    # and identical ones within a transaction are merged.
+    sql = """
+    CREATE FUNCTION answers_answersection_notify() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM pg_notify('answers_section_versions', json_build_object(
+                'exam', OLD.exam_id, 'oid', OLD.id, 'cutVersion', NULL
+            )::text);
+        ELSE
+            PERFORM pg_notify('answers_section_versions', json_build_object(
+                'exam', NEW.exam_id, 'oid', NEW.id, 'cutVersion', NEW.cut_version
+            )::text);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER answersection_notify
+    AFTER INSERT OR DELETE OR UPDATE OF cut_version
+    ON answers_answersection
+    FOR EACH ROW EXECUTE PROCEDURE
+    answers_answersection_notify();
+    """
+
+    reverse_sql = """
+    DROP TRIGGER IF EXISTS answersection_notify ON answers_answersection;
+    DROP FUNCTION IF EXISTS answers_answersection_notify();
+    """
+
+    operations = [
+        migrations.RunSQL(sql, reverse_sql),
+    ]
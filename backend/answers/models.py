@@ -37,10 +37,20 @@ class Exam(ExportModelOperationsMixin("exam"), models.Model):
     master_solution = models.CharField(max_length=512)
 
     dark_mode_warning = models.BooleanField(default=False)
+    # pdf_utils.EXTRACTION_VERSION of the code that extracted the text of the pages,
+    # 0 if unknown. Used by `manage.py reindex_exams --stale`.
+    text_extraction_version = models.IntegerField(default=0)
     search_vector = SearchVectorField()
+    # Vector of "category displayname - exam displayname", maintained by
+    # triggers on both answers_exam and categories_category so that renaming a
+    # category refreshes the vectors of all of its exams.
+    category_search_vector = SearchVectorField()
 
     class Meta:
-        indexes = [GinIndex(fields=["search_vector"])]
+        indexes = [
+            GinIndex(fields=["search_vector"]),
+            GinIndex(fields=["category_search_vector"]),
+        ]
 
     def current_user_can_view(self, request):
         is_admin = auth_check.has_admin_rights_for_exam(request, self)
@@ -151,7 +161,30 @@ def generate_long_id():
     return res
 
 
-class Answer(ExportModelOperationsMixin("answer"), models.Model):
+class TriggerCountsMixin:
+    """
+    For models with counter columns that are maintained by database triggers. Saving
+    an existing instance leaves the counters alone, so that counts loaded before
+    someone else voted are not written back. Like a plain save, it only writes the
+    fields that were loaded.
+    """
+
+    trigger_count_fields: tuple[str, ...] = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.trigger_count_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class Answer(ExportModelOperationsMixin("answer"), TriggerCountsMixin, models.Model):
     class Kind(models.TextChoices):
         PERSONAL = "personal"
         OFFICIAL = "official"
@@ -174,18 +207,38 @@ class Answer(ExportModelOperationsMixin("answer"), models.Model):
     long_id = models.CharField(max_length=256, default=generate_long_id, unique=True)
     is_anonymous = models.BooleanField(default=False)
 
+    # Sizes of the vote sets above, maintained by triggers on their tables. Can be
+    # recomputed with `manage.py repair_vote_counts`.
+    upvote_count = models.IntegerField(default=0)
+    downvote_count = models.IntegerField(default=0)
+    expertvote_count = models.IntegerField(default=0)
+    flagged_count = models.IntegerField(default=0)
+    marked_as_ai_count = models.IntegerField(default=0)
+    trigger_count_fields = (
+        "upvote_count",
+        "downvote_count",
+        "expertvote_count",
+        "flagged_count",
+        "marked_as_ai_count",
+    )
+
     search_vector = SearchVectorField()
 
     class Meta:
         indexes = [GinIndex(fields=["search_vector"])]
 
 
-class Comment(ExportModelOperationsMixin("comment"), CommentMixin):
+class Comment(ExportModelOperationsMixin("comment"), TriggerCountsMixin, CommentMixin):
     answer = models.ForeignKey(
         "Answer", on_delete=models.CASCADE, related_name="comments"
     )
     long_id = models.CharField(max_length=256, default=generate_long_id, unique=True)
 
+    # Maintained by triggers like the counters of Answer
+    flagged_count = models.IntegerField(default=0)
+    marked_as_ai_count = models.IntegerField(default=0)
+    trigger_count_fields = ("flagged_count", "marked_as_ai_count")
+
 
 class ExamUserSolved(ExportModelOperationsMixin("exam_user_solved"), models.Model):
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
@@ -1,13 +1,36 @@
 import logging
+from itertools import islice
 
 import pypdfium2 as pdfium
+from django.db import transaction
 
+from answers import search_cache
+from answers.models import (
+    Exam as ExamModel,
+)
 from answers.models import (
     ExamPage as ExamPageModel,
 )
 
 logger = logging.getLogger(__name__)
 
+# Number of ExamPage rows inserted per query when analyzing a PDF
+PAGE_BATCH_SIZE = 50
+
+# Increase whenever the extracted text changes, e.g. after upgrading pdfium, so that
+# `manage.py reindex_exams --stale` picks up the exams extracted by older code.
+EXTRACTION_VERSION = 1
+
+
+def _extract_text(page):
+    textpage = page.get_textpage()
+    try:
+        # PDFium generates text with \r\n line breaks, but we want to use \n for
+        # consistency with pdftotext and general text handling in Python
+        return textpage.get_text_bounded().replace("\r\n", "\n")
+    finally:
+        textpage.close()
+
 
 def get_page_text(path_to_pdf, page):
     with pdfium.PdfDocument(path_to_pdf) as pdf:
@@ -19,16 +42,64 @@ def get_page_text(path_to_pdf, page):
 
         if page == 0:
             # Have a way to extract text from the entire PDF
-            return "\n".join(
-                page.get_textpage().get_text_bounded().replace("\r\n", "\n")
-                for page in pdf
-            )
+            return "\n".join(_extract_text(page) for page in pdf)
 
-        page = pdf[page - 1]
+        return _extract_text(pdf[page - 1])
+
+
+def iter_pages(pdf):
+    """
+    Yields `(page_number, width, height, text)` for every page of an open PDF. Each
+    page is closed again before the next one is loaded, so only one page of a large
+    document is held in memory at a time.
+    """
+    for index in range(len(pdf)):
+        page = pdf[index]
+        try:
+            width, height = page.get_size()
+            yield index + 1, width, height, _extract_text(page)
+        finally:
+            page.close()
+
+
+def extract_pages(path_to_pdf):
+    """
+    Returns the pages of a PDF as `(page_number, width, height, text)` tuples. Does
+    not touch the database, so that it can run in a separate process.
+    """
+    with pdfium.PdfDocument(path_to_pdf) as pdf:
+        return list(iter_pages(pdf))
 
-        # PDFium generates text with \r\n line breaks, but we want to use \n for
-        # consistency with pdftotext and general text handling in Python
-        return page.get_textpage().get_text_bounded().replace("\r\n", "\n")
+
+def save_pages(exam, pages, ExamPage=ExamPageModel):
+    """
+    Replaces the pages of an exam with `pages`, an iterable of `(page_number, width,
+    height, text)` tuples, and marks the exam as extracted with the current version.
+    """
+    with transaction.atomic():
+        ExamPage.objects.filter(exam=exam).delete()
+        pages = iter(pages)
+        while batch := list(islice(pages, PAGE_BATCH_SIZE)):
+            ExamPage.objects.bulk_create(
+                ExamPage(
+                    exam=exam,
+                    page_number=page_number,
+                    width=width,
+                    height=height,
+                    text=text,
+                )
+                for page_number, width, height, text in batch
+            )
+        # Historical models used by old migrations do not have the version yet
+        if ExamPage is ExamPageModel:
+            ExamModel.objects.filter(pk=exam.pk).update(
+                text_extraction_version=EXTRACTION_VERSION
+            )
+
+    # bulk_create does not send any signals
+    search_cache.invalidate(
+        exam.category.slug if exam.category_id else None, kinds=("exams",)
+    )
 
 
 def analyze_pdf(
@@ -37,21 +108,8 @@ def analyze_pdf(
     ExamPage=ExamPageModel,
 ):
     try:
-        ExamPage.objects.filter(exam=exam).delete()
         with pdfium.PdfDocument(path_to_pdf) as pdf:
-            for page_number in range(1, len(pdf) + 1):
-                page = pdf[page_number - 1]
-                w, h = page.get_size()
-                page_text = get_page_text(path_to_pdf, page_number)
-                exam_page = ExamPage(
-                    exam=exam,
-                    page_number=page_number,
-                    width=w,
-                    height=h,
-                    text=page_text,
-                )
-                exam_page.save()
-
+            save_pages(exam, iter_pages(pdf), ExamPage=ExamPage)
         return True
     except (FileNotFoundError, pdfium.PdfiumError):
         return False
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from answers.models import Answer, Comment, Exam
+from categories.models import Category
+
+"""
+Cache for the results of the search endpoint. During exam season the same course codes
+are searched by many students, so identical searches are answered from the cache without
+touching postgres at all.
+
+A cached result depends on the search term, the filters and on which exams the user is
+allowed to see, so all of them are part of the cache key. Invalidation works with
+generations: every key contains a random token for each kind of document it searches in
+the scope it searches, which is replaced whenever a document of that kind in that scope
+changes. Searches restricted to a category use the tokens of that category, all other
+searches use global tokens. A new answer therefore only invalidates the answer searches
+of its category and the unfiltered ones, but not exam or comment searches or those of
+other categories. Stale entries are never read again and simply expire.
+
+Exam pages are written in bulk when a PDF is analyzed, so instead of reacting to every
+single page, `pdf_utils.analyze_pdf` invalidates the exam's category once it is done.
+
+Invalidation only reaches other processes if they share the cache, so the cache is
+disabled unless `REDIS_URL` is configured (see `COMSOL_SEARCH_CACHE_TIMEOUT`).
+"""
+
+GLOBAL_SCOPE = "*"
+
+# Kinds of documents the search endpoint returns
+KINDS = ("exams", "answers", "comments")
+
+
+def _generation_key(kind, category_slug):
+    return f"search:generation:{kind}:{category_slug}"
+
+
+def get_generations(kinds, category_slug=GLOBAL_SCOPE):
+    """
+    Returns the current tokens of the given kinds of documents in a scope.
+    """
+    keys = [_generation_key(kind, category_slug) for kind in kinds]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # A fresh token instead of a counter, so that a generation that got
+            # evicted from the cache can never bring back entries of an older one.
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def invalidate(*category_slugs, kinds=KINDS):
+    """
+    Invalidates the cached searches for the given kinds of documents that might
+    contain documents from one of the given categories. This always includes the
+    searches without a category filter.
+
+    The tokens are replaced once the current transaction has committed. Otherwise a
+    search running in the meantime could cache what it read before the commit under
+    the new tokens.
+    """
+    generations = {
+        _generation_key(kind, slug): uuid.uuid4().hex
+        for slug in {GLOBAL_SCOPE, *category_slugs}
+        if slug is not None
+        for kind in kinds
+    }
+    transaction.on_commit(lambda: cache.set_many(generations, timeout=None))
+
+
+def get_visibility(is_admin, user_admin_categories):
+    """
+    Returns the class of exams a user can see in search results: everything for
+    admins, otherwise the public exams plus those of the categories they administer.
+    """
+    if is_admin:
+        return "admin"
+    return ",".join(str(pk) for pk in sorted(user_admin_categories)) or "public"
+
+
+def get_key(term, visibility, category_filter, kinds, **filters):
+    """
+    Returns the cache key of a search for the given kinds of documents or None if
+    search results are not cached.
+    """
+    if not settings.COMSOL_SEARCH_CACHE_TIMEOUT:
+        return None
+    normalized = {
+        "term": " ".join(term.lower().split()),
+        "visibility": visibility,
+        "category": category_filter,
+        "kinds": sorted(kinds),
+        **filters,
+    }
+    digest = hashlib.sha256(
+        json.dumps(normalized, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    generations = get_generations(kinds, category_filter or GLOBAL_SCOPE)
+    return f"search:result:{':'.join(generations)}:{digest}"
+
+
+def load(key):
+    if key is None:
+        return None
+    return cache.get(key)
+
+
+def store(key, results):
+    if key is None:
+        return
+    cache.set(key, results, timeout=settings.COMSOL_SEARCH_CACHE_TIMEOUT)
+
+
+def _category_slug(**filters):
+    return Category.objects.filter(**filters).values_list("slug", flat=True).first()
+
+
+@receiver(pre_save, sender=Exam)
+def _exam_pre_save(sender, instance, **kwargs):
+    # The exam might be moved out of its old category
+    if instance.pk is not None:
+        invalidate(_category_slug(exam__pk=instance.pk))
+
+
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+def _exam_changed(sender, instance, **kwargs):
+    invalidate(_category_slug(pk=instance.category_id))
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def _answer_changed(sender, instance, **kwargs):
+    invalidate(
+        _category_slug(exam__answersection__pk=instance.answer_section_id),
+        kinds=("answers",),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def _comment_changed(sender, instance, **kwargs):
+    invalidate(
+        _category_slug(exam__answersection__answer__pk=instance.answer_id),
+        kinds=("comments",),
+    )
+
+
+@receiver(post_save, sender=Category)
+def _category_changed(sender, instance, **kwargs):
+    # Results contain the displayname of the category
+    invalidate(instance.slug)
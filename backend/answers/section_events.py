@@ -0,0 +1,205 @@
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+import psycopg2
+from django.conf import settings
+from django.db import connection
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+"""
+Pushes changes of answer sections to the clients that have an exam open, so that they
+do not have to poll `get_cut_versions`.
+
+A trigger on answers_answersection (migration 0027) sends a postgres notification
+whenever a section is added, removed or its cut_version changes. Every answer, comment,
+vote and cut write bumps the cut_version, so this covers all of them, no matter which
+process made the change. Every worker process runs a single `Listener` that receives
+these notifications and hands them to the in-process `broker`, which fans them out to
+the server-sent event streams of that worker.
+
+Without `COMSOL_EVENTS_LISTEN`, e.g. during tests, nothing is received from postgres
+and events can be published to the broker directly.
+"""
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "answers_section_versions"
+# Events a slow client may fall behind before its stream is closed. It gets all
+# versions again when it reconnects.
+SUBSCRIPTION_QUEUE_SIZE = 1000
+
+
+class Subscription:
+    def __init__(self, broker, exam_id):
+        self.broker = broker
+        self.exam_id = exam_id
+        self.queue = queue.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+        self.closed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.closed = True
+
+    def get(self, timeout):
+        """
+        Returns the next event or None if there was none within `timeout` seconds.
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    Fans out section events to the subscriptions of the exam they belong to.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    def subscribe(self, exam_id):
+        if settings.COMSOL_EVENTS_LISTEN:
+            Listener.ensure_running(self)
+        subscription = Subscription(self, exam_id)
+        with self.lock:
+            self.subscriptions.setdefault(exam_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.exam_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.exam_id, None)
+
+    def publish(self, exam_id, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(exam_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def close_all(self):
+        """
+        Ends all streams, e.g. because events might have been lost. The clients
+        reconnect and start from the current versions.
+        """
+        with self.lock:
+            subscriptions = [s for exam in self.subscriptions.values() for s in exam]
+        for subscription in subscriptions:
+            subscription.closed = True
+
+
+broker = Broker()
+
+
+def dispatch(payload, broker=broker):
+    """
+    Publishes the payload of a notification sent by the trigger.
+    """
+    data = json.loads(payload)
+    broker.publish(data["exam"], {"oid": data["oid"], "cutVersion": data["cutVersion"]})
+
+
+class Listener(threading.Thread):
+    """
+    Receives the notifications of the trigger with a database connection of its own.
+    The connection has to stay in the same session, so it does not go through
+    pgbouncer but connects to `COMSOL_EVENTS_DATABASE`.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, broker):
+        super().__init__(name="section-events-listener", daemon=True)
+        self.broker = broker
+
+    @classmethod
+    def ensure_running(cls, broker):
+        with cls._lock:
+            if cls._instance is None or not cls._instance.is_alive():
+                cls._instance = cls(broker)
+                cls._instance.start()
+
+    def run(self):
+        while True:
+            try:
+                self.listen()
+            except Exception:
+                logger.exception("Listening for section events failed")
+            # Notifications sent in the meantime are lost
+            self.broker.close_all()
+            time.sleep(settings.COMSOL_EVENTS_RECONNECT_DELAY)
+
+    def listen(self):
+        db = settings.COMSOL_EVENTS_DATABASE
+        conn = psycopg2.connect(
+            dbname=db["NAME"],
+            user=db["USER"],
+            password=db["PASSWORD"],
+            host=db["HOST"],
+            port=db["PORT"],
+        )
+        try:
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            while True:
+                # select cooperates with gevent, psycopg2 itself would block
+                readable, _, _ = select.select([conn], [], [], 60)
+                if not readable:
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    dispatch(conn.notifies.pop(0).payload, self.broker)
+        finally:
+            conn.close()
+
+
+def format_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream(exam):
+    """
+    Yields the server-sent events for an exam. The first `versions` event lists the
+    current version of every section, every `section` event after that a section
+    that changed, with a null `cutVersion` if it was removed. The stream ends after
+    `COMSOL_EVENTS_STREAM_TIMEOUT` seconds and the browser reconnects.
+    """
+    # Subscribe before reading the versions so that no change gets lost in between
+    with broker.subscribe(exam.id) as subscription:
+        versions = dict(exam.answersection_set.values_list("id", "cut_version"))
+        # The rest of the stream does not need the database, so it should not keep
+        # a connection for its whole lifetime
+        if not connection.in_atomic_block:
+            connection.close()
+
+        yield f"retry: {settings.COMSOL_EVENTS_RETRY}\n"
+        yield format_event("versions", versions)
+        deadline = time.monotonic() + settings.COMSOL_EVENTS_STREAM_TIMEOUT
+        while not subscription.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            event = subscription.get(min(settings.COMSOL_EVENTS_KEEPALIVE, remaining))
+            if event is None:
+                # Comments keep proxies from closing the connection and notice
+                # clients that went away
+                yield ": keepalive\n\n"
+            else:
+                yield format_event("section", event)
@@ -1,51 +1,52 @@
-from django.db.models import Count, Exists, F, Manager, OuterRef, Prefetch
+from django.db import connection
+from django.db.models import Exists, F, Manager, OuterRef, Prefetch
 
-from answers.models import Answer, Comment
+from answers.models import Answer, AnswerSection, Comment
 from ediauth import auth_check
 
 
+def annotate_answer_counts(objects: Manager[Answer], request) -> Manager[Answer]:
+    # The counts themselves are columns maintained by triggers
+    return objects.annotate(
+        is_upvoted=Exists(
+            Answer.objects.filter(id=OuterRef("id"), upvotes=request.user)
+        ),
+        is_downvoted=Exists(
+            Answer.objects.filter(id=OuterRef("id"), downvotes=request.user)
+        ),
+        is_expertvoted=Exists(
+            Answer.objects.filter(id=OuterRef("id"), expertvotes=request.user)
+        ),
+        is_flagged=Exists(
+            Answer.objects.filter(id=OuterRef("id"), flagged=request.user)
+        ),
+        is_marked_as_ai=Exists(
+            Answer.objects.filter(id=OuterRef("id"), marked_as_ai=request.user)
+        ),
+        delta_votes=F("upvote_count") - F("downvote_count"),
+    )
+
+
+def annotate_comment_counts(objects: Manager[Comment], request) -> Manager[Comment]:
+    return objects.annotate(
+        is_flagged=Exists(
+            Comment.objects.filter(id=OuterRef("id"), flagged=request.user)
+        ),
+        is_marked_as_ai=Exists(
+            Comment.objects.filter(id=OuterRef("id"), marked_as_ai=request.user)
+        ),
+    )
+
+
 def prepare_answer_objects(objects: Manager[Answer], request) -> Manager[Answer]:
     # Important optimization. Prevents amount of queries from
     # increasing quadratically ((N+1 problem)^2) and instead
     # results in a constant amount of queries.
-    comments_query = (
-        Comment.objects.select_related("author")
-        .annotate(
-            flagged_count=Count("flagged", distinct=True),
-            is_flagged=Exists(
-                Comment.objects.filter(id=OuterRef("id"), flagged=request.user)
-            ),
-            marked_as_ai_count=Count("marked_as_ai", distinct=True),
-            is_marked_as_ai=Exists(
-                Comment.objects.filter(id=OuterRef("id"), marked_as_ai=request.user)
-            ),
-        )
-        .order_by("time", "id")
-    )
+    comments_query = annotate_comment_counts(
+        Comment.objects.select_related("author__profile"), request
+    ).order_by("time", "id")
     return (
-        objects.annotate(
-            expert_count=Count("expertvotes", distinct=True),
-            downvotes_count=Count("downvotes", distinct=True),
-            upvotes_count=Count("upvotes", distinct=True),
-            flagged_count=Count("flagged", distinct=True),
-            marked_as_ai_count=Count("marked_as_ai", distinct=True),
-            is_upvoted=Exists(
-                Answer.objects.filter(id=OuterRef("id"), upvotes=request.user)
-            ),
-            is_downvoted=Exists(
-                Answer.objects.filter(id=OuterRef("id"), downvotes=request.user)
-            ),
-            is_expertvoted=Exists(
-                Answer.objects.filter(id=OuterRef("id"), expertvotes=request.user)
-            ),
-            is_flagged=Exists(
-                Answer.objects.filter(id=OuterRef("id"), flagged=request.user)
-            ),
-            is_marked_as_ai=Exists(
-                Answer.objects.filter(id=OuterRef("id"), marked_as_ai=request.user)
-            ),
-            delta_votes=F("upvotes_count") - F("downvotes_count"),
-        )
+        annotate_answer_counts(objects, request)
         .prefetch_related(
             Prefetch(
                 "comments",
@@ -53,18 +54,21 @@ def prepare_answer_objects(objects: Manager[Answer], request) -> Manager[Answer]
                 to_attr="all_comments",
             )
         )
-        .select_related("author")
+        .select_related("author__profile")
     )
 
 
-def get_answer_response(request, answer: Answer, ignore_exam_admin=False):
+def get_answer_response(
+    request, answer: Answer, ignore_exam_admin=False, exam_admin=None
+):
     """
     Call `prepare_answer_objects` on the answer objects beforehand to annotate
     them with the required aggregations. This function will fail otherwise.
+    `exam_admin` can be passed if the admin rights for the exam are already known.
     """
     if ignore_exam_admin:
         exam_admin = False
-    else:
+    elif exam_admin is None:
         exam_admin = auth_check.has_admin_rights_for_exam(
             request, answer.answer_section.exam
         )
@@ -110,7 +114,7 @@ def get_answer_response(request, answer: Answer, ignore_exam_admin=False):
             "oid": answer.id,
             "longId": answer.long_id,
             "upvotes": answer.delta_votes,
-            "expertvotes": answer.expert_count,
+            "expertvotes": answer.expertvote_count,
             "authorId": author_id,
             "authorDisplayName": author_display_name,
             "canEdit": answer.author == request.user
@@ -167,15 +171,13 @@ def get_comment_response(request, comment: Comment):
         raise ValueError("The object is missing the required annotations.") from err
 
 
-def get_answersection_response(request, section):
-    prepared_query = prepare_answer_objects(section.answer_set, request)
-
-    answers = [
-        get_answer_response(request, answer)
-        for answer in sorted(
-            prepared_query, key=lambda x: (-x.expert_count, -x.delta_votes, x.time)
-        )
-    ]
+def get_answersection_response(request, section, answers=None):
+    """
+    `answers` are all answers of the section, prepared with `prepare_answer_objects`.
+    They are loaded if they are not given.
+    """
+    if answers is None:
+        answers = list(prepare_answer_objects(section.answer_set, request))
 
     has_permission_official_answers = auth_check.has_admin_rights_for_exam(
         request, section.exam
@@ -183,15 +185,73 @@ def get_answersection_response(request, section):
 
     return {
         "oid": section.id,
-        "answers": answers,
-        "allow_new_answer": not prepared_query.filter(author=request.user).exists(),
+        "answers": [
+            get_answer_response(
+                request, answer, exam_admin=has_permission_official_answers
+            )
+            for answer in sorted(
+                answers, key=lambda x: (-x.expertvote_count, -x.delta_votes, x.time)
+            )
+        ],
+        "allow_new_answer": not any(
+            answer.author_id == request.user.pk for answer in answers
+        ),
         "allow_new_official_answer": has_permission_official_answers
-        and not prepared_query.filter(kind=Answer.Kind.OFFICIAL).exists(),
+        and not any(answer.kind == Answer.Kind.OFFICIAL for answer in answers),
         "cutVersion": section.cut_version,
         "has_answers": section.has_answers,
     }
 
 
+def wants_compact_response(request):
+    """
+    Votes and flags can ask for only the counters of the changed answer or comment
+    instead of the whole section by passing `compact`.
+    """
+    return request.POST.get("compact", "false") != "false"
+
+
+def get_answer_counters_response(request, answer: Answer, section):
+    """
+    Returns the counters of a single answer together with the new `cut_version` of
+    its section, which is enough for a client to patch its copy of the section.
+    """
+    answer = annotate_answer_counts(Answer.objects.filter(pk=answer.pk), request).get()
+    return {
+        "oid": answer.id,
+        "upvotes": answer.delta_votes,
+        "expertvotes": answer.expertvote_count,
+        "isUpvoted": answer.is_upvoted,
+        "isDownvoted": answer.is_downvoted,
+        "isExpertVoted": answer.is_expertvoted,
+        "isFlagged": answer.is_flagged,
+        "flaggedCount": answer.flagged_count,
+        "isMarkedAsAi": answer.is_marked_as_ai,
+        "markedAsAiCount": answer.marked_as_ai_count,
+        "sectionId": section.id,
+        "cutVersion": section.cut_version,
+    }
+
+
+def get_comment_counters_response(request, comment: Comment, section):
+    """
+    Like `get_answer_counters_response`, but for a comment.
+    """
+    comment = annotate_comment_counts(
+        Comment.objects.filter(pk=comment.pk), request
+    ).get()
+    return {
+        "oid": comment.id,
+        "answerId": comment.answer_id,
+        "isFlagged": comment.is_flagged,
+        "flaggedCount": comment.flagged_count,
+        "isMarkedAsAi": comment.is_marked_as_ai,
+        "markedAsAiCount": comment.marked_as_ai_count,
+        "sectionId": section.id,
+        "cutVersion": section.cut_version,
+    }
+
+
 def get_answer_fields_to_preselect():
     return [
         "author",
@@ -227,6 +287,20 @@ def get_comment_fields_to_prefetch():
     return []
 
 
+def increase_section_version_sql():
+    """
+    SQL that increases the version of the section with the id given as parameter and
+    returns the new version. Incrementing in the database instead of saving the
+    section keeps concurrent increments from overwriting each other.
+    """
+    table = connection.ops.quote_name(AnswerSection._meta.db_table)
+    return (
+        f"UPDATE {table} SET cut_version = cut_version + 1 WHERE id = %s "
+        "RETURNING cut_version"
+    )
+
+
 def increase_section_version(section):
-    section.cut_version += 1
-    section.save()
+    with connection.cursor() as cursor:
+        cursor.execute(increase_section_version_sql(), [section.pk])
+        (section.cut_version,) = cursor.fetchone()
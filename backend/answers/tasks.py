@@ -0,0 +1,35 @@
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+
+from answers import pdf_utils
+from answers.models import Exam
+from jobs import queue
+from util import s3_util
+
+logger = logging.getLogger(__name__)
+
+
+@queue.handler("process_exam_upload")
+def process_exam_upload(filename):
+    """
+    Extracts the text of the pages of an uploaded exam, which also fills in their
+    search vectors. The exam is already in S3 when the job is queued, so it can be
+    viewed even if this fails; `manage.py reindex_exams` catches up on such exams.
+    """
+    exam = Exam.objects.filter(filename=filename).first()
+    if exam is None:
+        # Removed before we got to it
+        return
+    handle, path = tempfile.mkstemp(dir=settings.COMSOL_UPLOAD_FOLDER, suffix=".pdf")
+    os.close(handle)
+    try:
+        if not s3_util.save_file(settings.COMSOL_EXAM_DIR, filename, path):
+            # Raised so that the job is retried
+            raise FileNotFoundError(f"Could not download exam {filename}")
+        if not pdf_utils.analyze_pdf(exam, path):
+            logger.warning(f"Could not extract the pages of exam {filename}")
+    finally:
+        os.remove(path)
@@ -1,6 +1,20 @@
+import io
+import os
+import tempfile
+import time
 from datetime import timedelta
+from unittest import mock
 
+import pypdfium2 as pdfium
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from answers import pdf_utils
+from answers.models import Exam, ExamPage
 from testing.tests import ComsolTestExamData
+from util import s3_util
 
 
 class TestMetadata(ComsolTestExamData):
@@ -17,6 +31,37 @@ class TestMetadata(ComsolTestExamData):
         self.assertEqual(res["finished_cuts"], self.exam.finished_cuts)
         self.assertEqual(res["dark_mode_warning"], self.exam.dark_mode_warning)
 
+    def test_metadata_conditional_get(self):
+        url = f"/api/exam/metadata/{self.exam.filename}/"
+        etag = self.get(url, as_json=False)["ETag"]
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        self.exam.remark = "changed"
+        self.exam.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["value"]["remark"], "changed")
+
+        # The presigned URLs have to be renewed before they expire
+        etag = res["ETag"]
+        with mock.patch(
+            "time.time",
+            return_value=time.time() + s3_util.PRESIGNED_URL_VALIDITY,
+        ):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+
+    def test_metadata_loaded_once(self):
+        url = f"/api/exam/metadata/{self.exam.filename}/"
+        # The ETag and the response share the exam they loaded
+        with CaptureQueriesContext(connection) as queries:
+            self.get(url)
+        self.assertEqual(
+            len([q for q in queries if "JSONB_AGG" in q["sql"].upper()]), 1
+        )
+        self.get("/api/exam/metadata/nonexistent.pdf/", status_code=404)
+
     def test_set_metadata(self):
         self.post(
             f"/api/exam/setmetadata/{self.exam.filename}/",
@@ -77,3 +122,69 @@ class TestClaim(ComsolTestExamData):
         )
 
         self.user = self.adminUsers[1]
+
+
+class TestAnalyzePdf(ComsolTestExamData):
+    add_sections = False
+
+    def test_analyze_pdf(self):
+        pdf = pdfium.PdfDocument.new()
+        for i in range(5):
+            pdf.new_page(100 + i, 200)
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as file:
+            pdf.save(file)
+            file.flush()
+            ExamPage(
+                exam=self.exam, page_number=7, width=1, height=1, text="old"
+            ).save()
+            with mock.patch.object(pdf_utils, "PAGE_BATCH_SIZE", 2):
+                self.assertTrue(pdf_utils.analyze_pdf(self.exam, file.name))
+
+        pages = ExamPage.objects.filter(exam=self.exam).order_by("page_number")
+        self.assertEqual(
+            [(page.page_number, page.width, page.height) for page in pages],
+            [(i + 1, 100 + i, 200) for i in range(5)],
+        )
+
+    def test_analyze_missing_pdf(self):
+        ExamPage(exam=self.exam, page_number=1, width=1, height=1, text="old").save()
+        self.assertFalse(pdf_utils.analyze_pdf(self.exam, "/nonexistent/file.pdf"))
+        self.assertEqual(ExamPage.objects.filter(exam=self.exam).count(), 1)
+
+
+class TestReindexExams(ComsolTestExamData):
+    add_sections = False
+
+    def reindex(self, *args):
+        out = io.StringIO()
+        call_command("reindex_exams", "--workers", "1", *args, stdout=out)
+        return out.getvalue()
+
+    def test_reindex(self):
+        s3_util.save_file_to_s3(
+            settings.COMSOL_EXAM_DIR,
+            self.exam.filename,
+            os.path.join(os.path.dirname(__file__), "search_test.pdf"),
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint = os.path.join(tmpdir, "checkpoint")
+            out = self.reindex("--stale", "--checkpoint", checkpoint)
+            self.assertIn(f"{self.exam.filename}: 1 pages", out)
+            self.assertEqual(
+                Exam.objects.get(pk=self.exam.pk).text_extraction_version,
+                pdf_utils.EXTRACTION_VERSION,
+            )
+            self.assertIn(
+                "uniqueidthatwecansearch",
+                ExamPage.objects.get(exam=self.exam, page_number=1).text,
+            )
+
+            # Resuming skips the exams in the checkpoint
+            self.assertIn(
+                "0 exam(s), 1 already done", self.reindex("--checkpoint", checkpoint)
+            )
+
+        # Up to date exams are not stale
+        self.assertIn("Processing 0 exam(s)", self.reindex("--stale"))
+        s3_util.delete_file(settings.COMSOL_EXAM_DIR, self.exam.filename)
+        self.assertIn("missing in S3", self.reindex())
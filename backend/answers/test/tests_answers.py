@@ -1,4 +1,9 @@
-from answers.models import Answer, AnswerSection
+import io
+
+from django.core.management import call_command
+
+from answers import section_util, votes
+from answers.models import Answer, AnswerSection, Comment
 from testing.tests import ComsolTestExamData
 
 
@@ -50,6 +55,34 @@ class TestExistingAnswer(ComsolTestExamData):
         self.assertEqual(answer.upvotes.count(), 0)
         self.assertEqual(answer.downvotes.count(), 0)
 
+    def test_like_compact(self):
+        answer = self.answers[1]
+        version = answer.answer_section.cut_version
+        res = self.post(
+            f"/api/exam/setlike/{answer.id}/", {"like": -1, "compact": True}
+        )["value"]
+        self.assertEqual(res["oid"], answer.id)
+        self.assertEqual(res["upvotes"], -1)
+        self.assertFalse(res["isUpvoted"])
+        self.assertTrue(res["isDownvoted"])
+        self.assertEqual(res["sectionId"], answer.answer_section.id)
+        self.assertEqual(res["cutVersion"], version + 1)
+        self.assertNotIn("answers", res)
+
+        res = self.post(
+            f"/api/exam/setanswerflagged/{answer.id}/",
+            {"flagged": True, "compact": True},
+        )["value"]
+        self.assertTrue(res["isFlagged"])
+        self.assertEqual(res["flaggedCount"], 1)
+        self.assertEqual(res["upvotes"], -1)
+        self.assertEqual(res["cutVersion"], version + 2)
+
+        # The full section is still the default
+        res = self.post(f"/api/exam/setlike/{answer.id}/", {"like": 0})["value"]
+        self.assertEqual(res["oid"], answer.answer_section.id)
+        self.assertEqual(res["cutVersion"], version + 3)
+
     def test_flag(self):
         answer = self.answers[1]
         self.assertEqual(answer.flagged.count(), 0)
@@ -103,6 +136,93 @@ class TestExistingAnswer(ComsolTestExamData):
         self.assertEqual(answer.expertvotes.count(), 0)
 
 
+class TestVoteCounts(ComsolTestExamData):
+    def test_counts(self):
+        answer = self.answers[1]
+        stale = Answer.objects.get(pk=answer.pk)
+        self.post(f"/api/exam/setlike/{answer.id}/", {"like": 1})
+        self.post(f"/api/exam/setanswerflagged/{answer.id}/", {"flagged": True})
+        self.user = self.adminUsers[1]
+        self.post(f"/api/exam/setlike/{answer.id}/", {"like": -1})
+        self.post(f"/api/exam/setlike/{answer.id}/", {"like": 1})
+
+        # Saving an instance loaded before the votes keeps the counts
+        stale.text = "Changed"
+        stale.save()
+        answer.refresh_from_db()
+        self.assertEqual(answer.text, "Changed")
+        self.assertEqual(answer.upvote_count, 2)
+        self.assertEqual(answer.downvote_count, 0)
+        self.assertEqual(answer.flagged_count, 1)
+
+        self.post(f"/api/exam/resetanswerflagged/{answer.id}/", {})
+        answer.refresh_from_db()
+        self.assertEqual(answer.flagged_count, 0)
+
+        comment = self.comments[0]
+        comment.marked_as_ai.add(*answer.upvotes.all())
+        comment.refresh_from_db()
+        self.assertEqual(comment.marked_as_ai_count, 2)
+
+    def test_save_deferred(self):
+        partial = Answer.objects.defer("search_vector").get(pk=self.answers[0].pk)
+        partial.text = "Changed"
+        partial.save()
+        # Deferred fields are neither loaded nor written
+        self.assertEqual(partial.get_deferred_fields(), {"search_vector"})
+        self.answers[0].refresh_from_db()
+        self.assertEqual(self.answers[0].text, "Changed")
+
+    def test_repair(self):
+        answer = self.answers[1]
+        answer.upvotes.add(self.get_my_user())
+        Answer.objects.filter(pk=answer.pk).update(upvote_count=5, flagged_count=1)
+        Comment.objects.filter(pk=self.comments[0].pk).update(flagged_count=3)
+
+        out = io.StringIO()
+        call_command("repair_vote_counts", "--dry-run", stdout=out)
+        self.assertIn("answers.Answer.upvote_count: 1 wrong", out.getvalue())
+        answer.refresh_from_db()
+        self.assertEqual(answer.upvote_count, 5)
+
+        call_command("repair_vote_counts", stdout=io.StringIO())
+        answer.refresh_from_db()
+        self.assertEqual(answer.upvote_count, 1)
+        self.assertEqual(answer.flagged_count, 0)
+        self.assertEqual(Comment.objects.get(pk=self.comments[0].pk).flagged_count, 0)
+
+
+class TestVotes(ComsolTestExamData):
+    add_comments = False
+
+    def test_set_memberships(self):
+        answer = self.answers[1]
+        user = self.get_my_user()
+        section = AnswerSection.objects.get(pk=answer.answer_section.pk)
+        stale = AnswerSection.objects.get(pk=section.pk)
+        version = section.cut_version
+
+        with self.assertNumQueries(4):
+            votes.set_memberships(section, answer, user, upvotes=False, downvotes=True)
+        self.assertEqual(section.cut_version, version + 1)
+        self.assertTrue(answer.downvotes.filter(pk=user.pk).exists())
+
+        # Adding twice is a no-op apart from the version
+        votes.set_memberships(stale, answer, user, downvotes=True)
+        self.assertEqual(stale.cut_version, version + 2)
+        votes.set_memberships(section, answer, user, upvotes=True, downvotes=False)
+        self.assertEqual(section.cut_version, version + 3)
+        self.assertEqual(list(answer.upvotes.all()), [user])
+        self.assertEqual(list(answer.downvotes.all()), [])
+        answer.refresh_from_db()
+        self.assertEqual((answer.upvote_count, answer.downvote_count), (1, 0))
+
+        section_util.increase_section_version(stale)
+        self.assertEqual(stale.cut_version, version + 4)
+        section.refresh_from_db()
+        self.assertEqual(section.cut_version, version + 4)
+
+
 class TestDeleteNonadmin(ComsolTestExamData):
     add_comments = False
 
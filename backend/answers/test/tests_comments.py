@@ -14,6 +14,19 @@ class TestComment(ComsolTestExamData):
         comment.refresh_from_db()
         self.assertEqual(comment.flagged.count(), 0)
 
+    def test_flag_compact(self):
+        comment = self.comments[1]
+        res = self.post(
+            f"/api/exam/setcommentmarkedasai/{comment.id}/",
+            {"marked_as_ai": True, "compact": True},
+        )["value"]
+        self.assertEqual(res["oid"], comment.id)
+        self.assertEqual(res["answerId"], comment.answer.id)
+        self.assertTrue(res["isMarkedAsAi"])
+        self.assertEqual(res["markedAsAiCount"], 1)
+        self.assertFalse(res["isFlagged"])
+        self.assertEqual(res["sectionId"], comment.answer.answer_section.id)
+
     def test_mark_as_ai(self):
         comment = self.comments[1]
         self.assertEqual(comment.marked_as_ai.count(), 0)
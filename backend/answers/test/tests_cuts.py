@@ -1,4 +1,7 @@
-from answers.models import AnswerSection
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from answers.models import Answer, AnswerSection, Comment
 from testing.tests import ComsolTestExamData
 
 
@@ -136,3 +139,85 @@ class TestAnswerSection(ComsolTestExamData):
 
             # TODO test whether the content makes any sense
             # TODO test whether upvoting adjusts the score correctly
+
+    def test_get_sections(self):
+        url = f"/api/exam/answersections/{self.exam.filename}/"
+        res = self.get(url)["value"]
+        self.assertEqual(
+            [section["oid"] for section in res["sections"]],
+            [section.id for section in self.sections],
+        )
+        for section in res["sections"]:
+            single = self.get(f"/api/exam/answersection/{section['oid']}/")["value"]
+            self.assertEqual(section, single)
+
+        # Sections the client already knows are left out
+        known = self.sections[0]
+        self.post(f"/api/exam/setlike/{self.answers[4].id}/", {"like": 1})
+        versions = ",".join(
+            f"{oid}:{version}" for oid, version in res["cutVersions"].items()
+        )
+        res = self.get(f"{url}?versions={versions}")["value"]
+        self.assertEqual(
+            [section["oid"] for section in res["sections"]], [self.sections[1].id]
+        )
+        self.assertEqual(len(res["cutVersions"]), 4)
+        self.assertEqual(res["cutVersions"][str(known.id)], known.cut_version)
+
+        self.get(f"{url}?versions=abc", status_code=400)
+
+    def test_get_sections_queries(self):
+        url = f"/api/exam/answersections/{self.exam.filename}/"
+        self.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.get(url, test_post=False)
+        section = AnswerSection.objects.create(
+            exam=self.exam,
+            author=self.get_my_user(),
+            page_num=2,
+            rel_height=0.5,
+        )
+        answer = Answer.objects.create(
+            answer_section=section, author=self.get_my_user(), text="More"
+        )
+        Comment.objects.create(answer=answer, author=self.get_my_user(), text="More")
+        with CaptureQueriesContext(connection) as more_queries:
+            res = self.get(url, test_post=False)["value"]
+        self.assertEqual(len(res["sections"]), 5)
+        self.assertEqual(len(more_queries), len(queries))
+
+    def test_conditional_get(self):
+        section = self.sections[0]
+        url = f"/api/exam/answersection/{section.id}/"
+        res = self.get(url, as_json=False)
+        etag = res["ETag"]
+        self.assertIn("private", res["Cache-Control"])
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        answer = section.answer_set.first()
+        self.post(f"/api/exam/setlike/{answer.id}/", {"like": 1})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
+        etag = res["ETag"]
+
+        # Other users see different votes and permissions
+        self.login_as(self.nonAdminUsers[0])
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_conditional_get_cuts(self):
+        url = f"/api/exam/cuts/{self.exam.filename}/"
+        etag = self.get(url, as_json=False)["ETag"]
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        self.post(
+            f"/api/exam/editcut/{self.sections[0].id}/",
+            {"name": "Renamed"},
+        )
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
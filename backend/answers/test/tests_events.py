@@ -0,0 +1,57 @@
+import json
+from unittest import mock
+
+from django.test import override_settings
+
+from answers import section_events
+from testing.tests import ComsolTestExamData
+
+
+class TestSectionEvents(ComsolTestExamData):
+    add_answers = False
+
+    def test_broker(self):
+        broker = section_events.Broker()
+        with broker.subscribe(1) as first, broker.subscribe(2) as second:
+            section_events.dispatch('{"exam": 1, "oid": 3, "cutVersion": 4}', broker)
+            self.assertEqual(first.get(0), {"oid": 3, "cutVersion": 4})
+            self.assertIsNone(first.get(0))
+            self.assertIsNone(second.get(0))
+        self.assertEqual(broker.subscriptions, {})
+
+    def test_slow_subscriber(self):
+        broker = section_events.Broker()
+        with mock.patch.object(section_events, "SUBSCRIPTION_QUEUE_SIZE", 1):
+            subscription = broker.subscribe(1)
+        broker.publish(1, {"oid": 1, "cutVersion": 1})
+        self.assertFalse(subscription.closed)
+        broker.publish(1, {"oid": 1, "cutVersion": 2})
+        self.assertTrue(subscription.closed)
+
+    @override_settings(COMSOL_EVENTS_KEEPALIVE=0.01, COMSOL_EVENTS_STREAM_TIMEOUT=1)
+    def test_stream(self):
+        res = self.get(f"/api/exam/events/{self.exam.filename}/", as_json=False)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        content = iter(res.streaming_content)
+        self.assertTrue(next(content).startswith(b"retry: "))
+
+        event, data = next(content).decode().strip().split("\n")
+        self.assertEqual(event, "event: versions")
+        self.assertEqual(
+            json.loads(data.removeprefix("data: ")),
+            {str(section.id): section.cut_version for section in self.sections},
+        )
+
+        section_events.broker.publish(self.exam.id, {"oid": 1, "cutVersion": 2})
+        self.assertEqual(
+            next(content),
+            b'event: section\ndata: {"oid": 1, "cutVersion": 2}\n\n',
+        )
+        self.assertEqual(next(content), b": keepalive\n\n")
+
+        # The stream ends after the timeout
+        self.assertEqual(set(content), {b": keepalive\n\n"})
+        self.assertNotIn(self.exam.id, section_events.broker.subscriptions)
+
+    def test_stream_unknown_exam(self):
+        self.get("/api/exam/events/unknown.pdf/", status_code=404)
@@ -1,6 +1,12 @@
+import os
+
+from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from jobs import queue
+from jobs.models import Job
 from testing.tests import ComsolTest
+from util import s3_util
 
 
 class TestFiles(ComsolTest):
@@ -25,6 +31,28 @@ class TestFiles(ComsolTest):
         self.assertEqual(response.status_code, 200)
         self.post(f"/api/exam/remove/exam/{filename}/", {})
 
+    def test_upload_exam_job(self):
+        res = self.post(
+            "/api/exam/upload/exam/",
+            {
+                "category": "default",
+                "displayname": "Test",
+                "file": self.exam_file(),
+            },
+        )
+        filename = res["filename"]
+        # The exam can be viewed before its text is extracted
+        self.assertTrue(s3_util.is_file_in_s3(settings.COMSOL_EXAM_DIR, filename))
+        self.assertEqual(
+            self.get(f"/api/job/{res['job']}/")["value"]["status"], "queued"
+        )
+
+        uploads = set(os.listdir(settings.COMSOL_UPLOAD_FOLDER))
+        queue.run_pending()
+        self.assertEqual(Job.objects.get(pk=res["job"]).status, Job.Status.DONE)
+        self.assertEqual(set(os.listdir(settings.COMSOL_UPLOAD_FOLDER)), uploads)
+        self.post(f"/api/exam/remove/exam/{filename}/", {})
+
     def test_upload_solution(self):
         filename = self.post(
             "/api/exam/upload/exam/",
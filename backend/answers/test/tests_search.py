@@ -1,10 +1,16 @@
 import logging
+import time
 from os.path import dirname, join
 
 from django.contrib.postgres.search import SearchVector
+from django.core.cache import cache
+from django.test import override_settings
 
-from answers.models import ExamPage
-from testing.tests import ComsolTestExamData
+from answers.models import Answer, Exam, ExamPage
+from answers.views_search import parse_headline, run_search_branches
+from categories.models import EuclidCode
+from jobs import queue
+from testing.tests import ComsolTest, ComsolTestExamData
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +27,7 @@ class TestSearch(ComsolTestExamData):
                 "/api/exam/upload/exam/",
                 {"category": "default", "displayname": "Test", "file": infile},
             )
+            queue.run_pending()
             ExamPage.objects.update(search_vector=SearchVector("text"))
 
             # Edit the first answer to have a unique text that we can search
@@ -54,6 +61,13 @@ class TestSearch(ComsolTestExamData):
         self.assertEqual(match["category_displayname"], "default")
         self.assertEqual(match["category_slug"], "default")
         self.assertEqual(len(match["pages"]), 1)
+        self.assertNotIn("id", match)
+
+        # Pages are (page number, rank, headline) with the match highlighted
+        page_number, rank, page_headline = match["pages"][0]
+        self.assertEqual(page_number, 1)
+        self.assertEqual(rank, match["rank"])
+        self.assertIn(["uniqueidthatwecansearch"], page_headline[0])
 
     def test_search_exam_with_category_filter(self):
         """Test that searching with a category filter works as expected when
@@ -87,6 +101,8 @@ class TestSearch(ComsolTestExamData):
 
         match = res[0]
         self.assertEqual(match["type"], "answer")
+        self.assertEqual(match["highlighted_words"], ["mywacky", "answer"])
+        self.assertNotIn("id", match)
         self.assertEqual(
             match["category_displayname"],
             self.answers[0].answer_section.exam.category.displayname,
@@ -189,3 +205,199 @@ class TestSearch(ComsolTestExamData):
             },
         )["value"]
         self.assertEqual(len(res), 0)
+
+    def test_search_exam_with_category_name(self):
+        """Test that searching with the category name matches on the category
+        displayname and that the match follows category renames.
+        """
+        args = {
+            "term": "Test Category Displayname",
+            "include_answers": False,
+            "include_comments": False,
+        }
+        res = self.post("/api/exam/search/", dict(args))["value"]
+        self.assertEqual(len(res), 0)
+
+        res = self.post(
+            "/api/exam/search/", {**args, "exams_with_category_name": True}
+        )["value"]
+        self.assertEqual(len(res), 1)
+        self.assertEqual(res[0]["filename"], self.exam.filename)
+
+        self.category.displayname = "Renamed Course"
+        self.category.save()
+
+        res = self.post(
+            "/api/exam/search/", {**args, "exams_with_category_name": True}
+        )["value"]
+        self.assertEqual(len(res), 0)
+
+        res = self.post(
+            "/api/exam/search/",
+            {
+                **args,
+                "term": "Renamed Course Displayname",
+                "exams_with_category_name": True,
+            },
+        )["value"]
+        self.assertEqual(len(res), 1)
+        self.assertEqual(res[0]["filename"], self.exam.filename)
+
+
+class TestParseHeadline(ComsolTest):
+    def test_parse_headline(self):
+        self.assertEqual(
+            parse_headline("a <b>c</b> d|<b>e</b>", "<b>", "</b>", "|"),
+            [["a ", ["c"], " d"], [["e"]]],
+        )
+        self.assertEqual(
+            parse_headline("<b>a <b>b</b></b>c", "<b>", "</b>", "|"),
+            [[["a ", ["b"], ""], "c"]],
+        )
+        # Not well formed
+        self.assertEqual(parse_headline("a <b>b", "<b>", "</b>", "|"), [["a ", ["b"]]])
+        self.assertEqual(parse_headline("a</b> b", "<b>", "</b>", "|"), [["a", " b"]])
+        self.assertEqual(parse_headline("", "<b>", "</b>", "|"), [[]])
+
+
+class TestSearchBranches(ComsolTest):
+    def test_sequential(self):
+        results, durations = run_search_branches(
+            {"exams": lambda: [1, 2], "answers": lambda: [3]}
+        )
+        self.assertEqual(results, {"exams": [1, 2], "answers": [3]})
+        self.assertEqual(set(durations), {"exams", "answers"})
+
+    def test_parallel_slow_branch_degrades(self):
+        """A branch exceeding the timeout should have no result, while the
+        other branches are still returned."""
+
+        def slow():
+            time.sleep(1)
+            return [4]
+
+        results, _ = run_search_branches(
+            {"exams": lambda: [1, 2], "comments": slow},
+            parallel=True,
+            timeout=0.2,
+        )
+        self.assertEqual(results, {"exams": [1, 2], "comments": None})
+
+
+@override_settings(COMSOL_SEARCH_CACHE_TIMEOUT=60)
+class TestSearchCache(ComsolTestExamData):
+    def mySetUp(self):
+        cache.clear()
+
+    def search(self, term):
+        return self.post(
+            "/api/exam/search/",
+            {"term": term, "include_exams": False},
+        )["value"]
+
+    def test_cached_until_write(self):
+        self.assertEqual(self.search("mywacky"), [])
+
+        # Writes through the ORM invalidate the cached result once they are committed
+        self.answers[0].text = "mywacky answer"
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.answers[0].save()
+        self.assertEqual(self.search("mywacky"), [])
+        for callback in callbacks:
+            callback()
+        res = self.search("mywacky")
+        self.assertEqual(len(res), 1)
+        self.assertEqual(res[0]["text"], "mywacky answer")
+
+        # Bulk updates bypass the invalidation, so the cached result is served
+        Answer.objects.filter(pk=self.answers[0].pk).update(text="mywacky changed")
+        res = self.search("  MyWacky ")
+        self.assertEqual(res[0]["text"], "mywacky answer")
+
+        self.comments[0].text = "unrelated comment"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comments[0].save()
+        res = self.search("mywacky")
+        self.assertEqual(res[0]["text"], "mywacky changed")
+
+    def test_scoped_to_kind(self):
+        def search_exams():
+            return self.post(
+                "/api/exam/search/",
+                {
+                    "term": "displayname",
+                    "include_answers": False,
+                    "include_comments": False,
+                },
+            )["value"]
+
+        self.assertEqual(len(search_exams()), 1)
+        Exam.objects.filter(pk=self.exam.pk).update(displayname="Renamed")
+
+        # Answers and comments are not part of the result, so writing them keeps it
+        with self.captureOnCommitCallbacks(execute=True):
+            self.answers[0].text = "changed answer"
+            self.answers[0].save()
+            self.comments[0].text = "changed comment"
+            self.comments[0].save()
+        self.assertEqual(len(search_exams()), 1)
+
+        self.exam.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exam.save()
+        self.assertEqual(search_exams(), [])
+
+
+class TestTypeahead(ComsolTestExamData):
+    def mySetUp(self):
+        EuclidCode(code="INFR09014", category=self.category).save()
+
+    def typeahead(self, term, **kwargs):
+        return self.post("/api/exam/search/typeahead/", {"term": term, **kwargs})[
+            "value"
+        ]
+
+    def test_partial_words(self):
+        res = self.typeahead("Test Cat")
+        self.assertEqual(
+            [(match["type"], match.get("slug")) for match in res],
+            [("category", self.category.slug), ("exam", None)],
+        )
+        self.assertEqual(res[0]["euclid_codes"], ["INFR09014"])
+        self.assertEqual(res[1]["filename"], self.exam.filename)
+        self.assertEqual(res[1]["category_slug"], self.category.slug)
+
+        res = self.typeahead("displ")
+        self.assertEqual([match["type"] for match in res], ["exam"])
+
+        self.assertEqual(self.typeahead("nothingmatches"), [])
+        self.assertEqual(self.typeahead(" &|! "), [])
+
+    def test_euclid_code(self):
+        res = self.typeahead("infr0901")
+        self.assertEqual(len(res), 1)
+        self.assertEqual(res[0]["slug"], self.category.slug)
+
+    def test_category_filter(self):
+        res = self.typeahead("Test", category=self.category.slug)
+        self.assertEqual([match["type"] for match in res], ["exam"])
+        self.assertEqual(self.typeahead("Test", category="something"), [])
+
+    def test_amount(self):
+        self.assertEqual(len(self.typeahead("displ", amount=0)), 1)
+        self.post(
+            "/api/exam/search/typeahead/",
+            {"term": "Test", "amount": "many"},
+            status_code=400,
+        )
+        self.post(
+            "/api/exam/search/typeahead/",
+            {"term": "Test", "amount": ""},
+            status_code=400,
+        )
+
+    def test_not_public(self):
+        self.exam.public = False
+        self.exam.save()
+        self.user = self.nonAdminUsers[0]
+        self.assertEqual(self.typeahead("displ"), [])
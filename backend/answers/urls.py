@@ -12,6 +12,7 @@ from . import (
 
 urlpatterns = [
     path("search/", views_search.search, name="search"),
+    path("search/typeahead/", views_search.typeahead, name="search_typeahead"),
     path("listexamtypes/", views_listings.list_exam_types, name="listexamtypes"),
     path("listexams/", views_listings.list_exams, name="listexams"),
     path("listimportexams/", views_listings.list_import_exams, name="listimportexams"),
@@ -39,9 +40,15 @@ urlpatterns = [
     path(
         "cutversions/<str:filename>/", views_cuts.get_cut_versions, name="cutversions"
     ),
+    path("events/<str:filename>/", views_cuts.get_section_events, name="events"),
     path(
         "answersection/<int:oid>/", views_cuts.get_answersection, name="answersection"
     ),
+    path(
+        "answersections/<str:filename>/",
+        views_cuts.get_answersections,
+        name="answersections",
+    ),
     path("status/<str:filename>/", views.get_exam_admin_status, name="status"),
     path("metadata/<str:filename>/", views.exam_metadata, name="metadata"),
     path(
@@ -1,6 +1,10 @@
+import time
 from datetime import timedelta
 
-from django.http import JsonResponse
+from django.contrib.postgres.aggregates import JSONBAgg
+from django.db.models import Exists, JSONField, OuterRef, Q, Value
+from django.db.models.functions import JSONObject
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
@@ -8,7 +12,7 @@ import answers.views_files as files
 from answers.models import Exam, ExamType, ExamUserSolved
 from categories.models import Category
 from ediauth import auth_check
-from util import response
+from util import response, s3_util
 
 
 @response.request_get()
@@ -58,18 +62,33 @@ def answer_section_user_solved(request, filename: str):
     return JsonResponse({"user_solved": solved})
 
 
-@response.request_get()
-@auth_check.require_login
-def exam_metadata(request, filename):
-    exam = get_object_or_404(Exam, filename=filename)
-    admin_rights = auth_check.has_admin_rights_for_exam(request, exam)
-    can_view = exam.current_user_can_view(request)
-    solved = ExamUserSolved.objects.filter(
-        user=request.user,
-        exam=exam,
-    ).exists()
+def get_exam_metadata_queryset(request):
+    return (
+        Exam.objects.select_related("category", "exam_type")
+        .defer("search_vector", "category_search_vector")
+        .annotate(
+            attachments=JSONBAgg(
+                JSONObject(
+                    displayname="attachment__displayname",
+                    filename="attachment__filename",
+                ),
+                filter=Q(attachment__isnull=False),
+                order_by="attachment__displayname",
+                default=Value([], JSONField()),
+            ),
+            user_solved=Exists(
+                ExamUserSolved.objects.filter(user=request.user, exam=OuterRef("pk"))
+            ),
+        )
+    )
 
-    res = {
+
+def get_exam_metadata(request, exam):
+    """
+    Call `get_exam_metadata_queryset` to get the exam beforehand.
+    The presigned file URLs are not included.
+    """
+    return {
         "filename": exam.filename,
         "displayname": exam.displayname,
         "category": exam.category.slug,
@@ -82,23 +101,55 @@ def exam_metadata(request, filename):
         "finished_cuts": exam.finished_cuts,
         "has_solution": exam.has_solution,
         "dark_mode_warning": exam.dark_mode_warning,
-        "attachments": [
-            {
-                "displayname": att.displayname,
-                "filename": att.filename,
-            }
-            for att in exam.attachment_set.order_by("displayname").all()
-        ],
-        "canEdit": admin_rights,
+        "attachments": exam.attachments,
+        "canEdit": auth_check.has_admin_rights_for_exam(request, exam),
         "isExpert": auth_check.is_expert_for_exam(request, exam),
-        "canView": can_view,
-        "user_solved": solved,
+        "canView": exam.current_user_can_view(request),
+        "user_solved": exam.user_solved,
     }
 
-    if can_view:
+
+def load_exam_metadata(request, filename):
+    """
+    Returns the exam and its metadata, or (None, None) if there is no such exam. They
+    are loaded once per request and shared by `exam_metadata_etag` and
+    `exam_metadata`, so that a full response does not load them twice.
+    """
+    if not hasattr(request, "_exam_metadata"):
+        request._exam_metadata = {}
+    loaded = request._exam_metadata
+    if filename not in loaded:
+        exam = get_exam_metadata_queryset(request).filter(filename=filename).first()
+        loaded[filename] = (
+            exam,
+            None if exam is None else get_exam_metadata(request, exam),
+        )
+    return loaded[filename]
+
+
+def exam_metadata_etag(request, filename):
+    exam, metadata = load_exam_metadata(request, filename)
+    if exam is None:
+        return None
+    # The presigned URLs in the response expire, so a client has to get new ones
+    # while its old ones are still valid for at least half of their lifetime.
+    url_generation = int(time.time()) // (s3_util.PRESIGNED_URL_VALIDITY // 2)
+    return response.etag(metadata, url_generation)
+
+
+@response.request_get()
+@auth_check.require_login
+@response.conditional(exam_metadata_etag)
+def exam_metadata(request, filename):
+    exam, metadata = load_exam_metadata(request, filename)
+    if exam is None:
+        raise Http404()
+    res = dict(metadata)
+
+    if res["canView"]:
         res["exam_file"] = files.get_presigned_url_exam(exam)
 
-    if can_view and exam.has_solution:
+    if res["canView"] and exam.has_solution:
         res["solution_file"] = files.get_presigned_url_solution(exam)
 
     return response.success(value=res)
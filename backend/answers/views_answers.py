@@ -2,7 +2,7 @@ from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
-from answers import section_util
+from answers import section_util, votes
 from answers.models import Answer, AnswerSection
 from ediauth import auth_check
 from notifications import notification_util
@@ -98,6 +98,17 @@ def remove_answer(request, oid):
     )
 
 
+def vote_response(request, answer):
+    section = answer.answer_section
+    if section_util.wants_compact_response(request):
+        return response.success(
+            value=section_util.get_answer_counters_response(request, answer, section)
+        )
+    return response.success(
+        value=section_util.get_answersection_response(request, section)
+    )
+
+
 @response.request_post("like")
 @auth_check.require_login
 def set_like(request, oid):
@@ -105,25 +116,14 @@ def set_like(request, oid):
         Answer.objects.select_related("answer_section").all(), pk=oid
     )
     like = int(request.POST["like"])
-    old_like = 0
-    if answer.upvotes.filter(pk=request.user.pk).exists():
-        old_like = 1
-    elif answer.downvotes.filter(pk=request.user.pk).exists():
-        old_like = -1
-    if like != old_like:
-        if old_like == 1:
-            answer.upvotes.remove(request.user)
-        elif old_like == -1:
-            answer.downvotes.remove(request.user)
-        if like == 1:
-            answer.upvotes.add(request.user)
-        elif like == -1:
-            answer.downvotes.add(request.user)
-        answer.save()
-    section_util.increase_section_version(answer.answer_section)
-    return response.success(
-        value=section_util.get_answersection_response(request, answer.answer_section)
+    votes.set_memberships(
+        answer.answer_section,
+        answer,
+        request.user,
+        upvotes=like == 1,
+        downvotes=like == -1,
     )
+    return vote_response(request, answer)
 
 
 @response.request_post("vote")
@@ -135,17 +135,8 @@ def set_expertvote(request, oid):
     if not auth_check.is_expert_for_exam(request, answer.answer_section.exam):
         return response.not_allowed()
     vote = request.POST["vote"] != "false"
-    old_vote = answer.expertvotes.filter(pk=request.user.pk).exists()
-    if vote != old_vote:
-        if old_vote:
-            answer.expertvotes.remove(request.user)
-        else:
-            answer.expertvotes.add(request.user)
-        answer.save()
-    section_util.increase_section_version(answer.answer_section)
-    return response.success(
-        value=section_util.get_answersection_response(request, answer.answer_section)
-    )
+    votes.set_memberships(answer.answer_section, answer, request.user, expertvotes=vote)
+    return vote_response(request, answer)
 
 
 @response.request_post("flagged")
@@ -157,17 +148,8 @@ def set_flagged(request, oid):
     if request.user == answer.author:
         return response.not_possible("User can't flag their own answer")
     flagged = request.POST["flagged"] != "false"
-    old_flagged = answer.flagged.filter(pk=request.user.pk).exists()
-    if flagged != old_flagged:
-        if old_flagged:
-            answer.flagged.remove(request.user)
-        else:
-            answer.flagged.add(request.user)
-        answer.save()
-    section_util.increase_section_version(answer.answer_section)
-    return response.success(
-        value=section_util.get_answersection_response(request, answer.answer_section)
-    )
+    votes.set_memberships(answer.answer_section, answer, request.user, flagged=flagged)
+    return vote_response(request, answer)
 
 
 @response.request_post("marked_as_ai")
@@ -179,17 +161,10 @@ def set_marked_as_ai(request, oid):
     if request.user == answer.author:
         return response.not_possible("User can't mark their own answer as AI")
     marked_as_ai = request.POST["marked_as_ai"] != "false"
-    old_marked_as_ai = answer.marked_as_ai.filter(pk=request.user.pk).exists()
-    if marked_as_ai != old_marked_as_ai:
-        if old_marked_as_ai:
-            answer.marked_as_ai.remove(request.user)
-        else:
-            answer.marked_as_ai.add(request.user)
-        answer.save()
-    section_util.increase_section_version(answer.answer_section)
-    return response.success(
-        value=section_util.get_answersection_response(request, answer.answer_section)
+    votes.set_memberships(
+        answer.answer_section, answer, request.user, marked_as_ai=marked_as_ai
     )
+    return vote_response(request, answer)
 
 
 @response.request_post()
@@ -199,11 +174,8 @@ def reset_flagged(request, oid):
         Answer.objects.select_related("answer_section").all(), pk=oid
     )
     answer.flagged.clear()
-    answer.save()
     section_util.increase_section_version(answer.answer_section)
-    return response.success(
-        value=section_util.get_answersection_response(request, answer.answer_section)
-    )
+    return vote_response(request, answer)
 
 
 @response.request_post()
@@ -213,8 +185,5 @@ def reset_marked_as_ai(request, oid):
         Answer.objects.select_related("answer_section").all(), pk=oid
     )
     answer.marked_as_ai.clear()
-    answer.save()
     section_util.increase_section_version(answer.answer_section)
-    return response.success(
-        value=section_util.get_answersection_response(request, answer.answer_section)
-    )
+    return vote_response(request, answer)
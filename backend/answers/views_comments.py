@@ -1,7 +1,7 @@
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
-from answers import section_util
+from answers import section_util, votes
 from answers.models import Answer, Comment
 from ediauth import auth_check
 from notifications import notification_util
@@ -53,48 +53,48 @@ def remove_comment(request, oid):
     )
 
 
+def flag_response(request, comment):
+    section = comment.answer.answer_section
+    if section_util.wants_compact_response(request):
+        return response.success(
+            value=section_util.get_comment_counters_response(request, comment, section)
+        )
+    return response.success(
+        value=section_util.get_answersection_response(request, section)
+    )
+
+
 @response.request_post("flagged")
 @auth_check.require_login
 def set_flagged(request, oid):
-    comment = get_object_or_404(Comment, pk=oid)
+    comment = get_object_or_404(
+        Comment.objects.select_related("answer__answer_section"), pk=oid
+    )
     if request.user == comment.author:
         return response.not_possible("User can't flag their own comment")
     flagged = request.POST["flagged"] != "false"
-    old_flagged = comment.flagged.filter(pk=request.user.pk).exists()
-    if flagged != old_flagged:
-        if old_flagged:
-            comment.flagged.remove(request.user)
-        else:
-            comment.flagged.add(request.user)
-        comment.save()
-    section_util.increase_section_version(comment.answer.answer_section)
-    return response.success(
-        value=section_util.get_answersection_response(
-            request, comment.answer.answer_section
-        )
+    votes.set_memberships(
+        comment.answer.answer_section, comment, request.user, flagged=flagged
     )
+    return flag_response(request, comment)
 
 
 @response.request_post("marked_as_ai")
 @auth_check.require_login
 def set_marked_as_ai(request, oid):
-    comment = get_object_or_404(Comment, pk=oid)
+    comment = get_object_or_404(
+        Comment.objects.select_related("answer__answer_section"), pk=oid
+    )
     if request.user == comment.author:
         return response.not_possible("User can't mark their own comment as AI")
     marked_as_ai = request.POST["marked_as_ai"] != "false"
-    old_marked_as_ai = comment.marked_as_ai.filter(pk=request.user.pk).exists()
-    if marked_as_ai != old_marked_as_ai:
-        if old_marked_as_ai:
-            comment.marked_as_ai.remove(request.user)
-        else:
-            comment.marked_as_ai.add(request.user)
-        comment.save()
-    section_util.increase_section_version(comment.answer.answer_section)
-    return response.success(
-        value=section_util.get_answersection_response(
-            request, comment.answer.answer_section
-        )
+    votes.set_memberships(
+        comment.answer.answer_section,
+        comment,
+        request.user,
+        marked_as_ai=marked_as_ai,
     )
+    return flag_response(request, comment)
 
 
 @response.request_post()
@@ -102,13 +102,8 @@ def set_marked_as_ai(request, oid):
 def reset_flagged(request, oid):
     comment = get_object_or_404(Comment, pk=oid)
     comment.flagged.clear()
-    comment.save()
     section_util.increase_section_version(comment.answer.answer_section)
-    return response.success(
-        value=section_util.get_answersection_response(
-            request, comment.answer.answer_section
-        )
-    )
+    return flag_response(request, comment)
 
 
 @response.request_post()
@@ -116,10 +111,5 @@ def reset_flagged(request, oid):
 def reset_marked_as_ai(request, oid):
     comment = get_object_or_404(Comment, pk=oid)
     comment.marked_as_ai.clear()
-    comment.save()
     section_util.increase_section_version(comment.answer.answer_section)
-    return response.success(
-        value=section_util.get_answersection_response(
-            request, comment.answer.answer_section
-        )
-    )
+    return flag_response(request, comment)
@@ -1,13 +1,28 @@
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
-from answers import section_util
-from answers.models import AnswerSection, Exam
+from answers import section_events, section_util
+from answers.models import Answer, AnswerSection, Exam
 from ediauth import auth_check
 from util import response
 
 
+def cuts_etag(request, filename):
+    # Adding or removing a cut changes the ids, editing one bumps its version
+    versions = list(
+        AnswerSection.objects.filter(exam__filename=filename)
+        .order_by("id")
+        .values_list("id", "cut_version")
+    )
+    if not versions:
+        return None
+    return response.etag(filename, versions)
+
+
 @response.request_get()
 @auth_check.require_login
+@response.conditional(cuts_etag)
 def get_cuts(request, filename):
     sections = get_object_or_404(Exam, filename=filename).answersection_set.all()
     pages = {}
@@ -92,18 +107,100 @@ def get_cut_versions(request, filename):
 
 @response.request_get()
 @auth_check.require_login
+def get_section_events(request, filename):
+    """
+    Streams the changes of the sections of an exam as server-sent events,
+    see `section_events.stream`.
+    """
+    exam = get_object_or_404(Exam, filename=filename)
+    res = StreamingHttpResponse(
+        section_events.stream(exam), content_type="text/event-stream"
+    )
+    res["Cache-Control"] = "no-cache"
+    # Keeps reverse proxies like nginx from buffering the events
+    res["X-Accel-Buffering"] = "no"
+    return res
+
+
+def answersection_etag(request, oid):
+    section = (
+        AnswerSection.objects.select_related("exam__category")
+        .only("cut_version", "exam__category")
+        .filter(pk=oid)
+        .first()
+    )
+    if section is None:
+        return None
+    # Every change to the answers and comments of a section bumps its cut_version.
+    # Apart from that, the response only depends on who is asking.
+    return response.etag(
+        section.pk,
+        section.cut_version,
+        request.user.pk,
+        auth_check.has_admin_rights(request),
+        auth_check.has_admin_rights_for_exam(request, section.exam),
+    )
+
+
+@response.request_get()
+@auth_check.require_login
+@response.conditional(answersection_etag)
 def get_answersection(request, oid):
     section = get_object_or_404(
-        AnswerSection.objects.select_related("exam").prefetch_related(
+        AnswerSection.objects.select_related("exam__category"), pk=oid
+    )
+    return response.success(
+        value=section_util.get_answersection_response(request, section)
+    )
+
+
+def parse_known_versions(value):
+    """
+    Parses a list of known section versions like "12:3,13:1" into a dict.
+    """
+    known = {}
+    for item in filter(None, value.split(",")):
+        oid, version = item.split(":")
+        known[int(oid)] = int(version)
+    return known
+
+
+@response.request_get()
+@auth_check.require_login
+def get_answersections(request, filename):
+    """
+    Returns all sections of an exam with their answers and comments in a constant
+    number of queries. Sections whose version the client passes in `versions` and
+    that did not change since are left out, `cutVersions` lists all sections.
+    """
+    exam = get_object_or_404(Exam.objects.select_related("category"), filename=filename)
+    try:
+        known = parse_known_versions(request.GET.get("versions", ""))
+    except ValueError:
+        return response.not_possible("Invalid versions")
+
+    sections = list(exam.answersection_set.order_by("page_num", "rel_height", "id"))
+    changed = [
+        section for section in sections if known.get(section.id) != section.cut_version
+    ]
+    for section in changed:
+        section.exam = exam
+    prefetch_related_objects(
+        changed,
+        Prefetch(
             "answer_set",
-            "answer_set__comments",
-            "answer_set__upvotes",
-            "answer_set__downvotes",
-            "answer_set__expertvotes",
-            "answer_set__flagged",
+            queryset=section_util.prepare_answer_objects(Answer.objects, request),
+            to_attr="prepared_answers",
         ),
-        pk=oid,
     )
     return response.success(
-        value=section_util.get_answersection_response(request, section)
+        value={
+            "cutVersions": {section.id: section.cut_version for section in sections},
+            "sections": [
+                section_util.get_answersection_response(
+                    request, section, section.prepared_answers
+                )
+                for section in changed
+            ],
+        }
     )
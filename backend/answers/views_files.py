@@ -1,12 +1,10 @@
-import os
-
 from django.conf import settings
 from django.shortcuts import get_object_or_404
 
-from answers import pdf_utils
 from answers.models import Exam, ExamType
 from categories.models import Category
 from ediauth import auth_check
+from jobs import queue
 from util import response, s3_util
 
 
@@ -41,11 +39,13 @@ def upload_exam_pdf(request):
         resolve_alias=file.name,
     )
     exam.save()
+    # The exam can be viewed right away, extracting its text happens in the
+    # background and the client can follow the progress with the returned job.
     s3_util.save_uploaded_file_to_s3(
         settings.COMSOL_EXAM_DIR, filename, file, "application/pdf"
     )
-    pdf_utils.analyze_pdf(exam, os.path.join(settings.COMSOL_UPLOAD_FOLDER, filename))
-    return response.success(filename=filename)
+    job = queue.enqueue("process_exam_upload", owner=request.user, filename=filename)
+    return response.success(filename=filename, job=job.id)
 
 
 def get_existing_exam(request):
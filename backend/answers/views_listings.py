@@ -66,16 +66,12 @@ def list_import_exams(request):
 @response.request_get()
 @auth_check.require_admin
 def list_flagged(request):
-    answers = (
-        Answer.objects.exclude(flagged=None)
-        .select_related("author", "answer_section__exam")
-        .annotate(flagged_count=Count("flagged", distinct=True))
+    answers = Answer.objects.filter(flagged_count__gt=0).select_related(
+        "author", "answer_section__exam"
     )
 
-    exam_comments = (
-        Comment.objects.exclude(flagged=None)
-        .select_related("author", "answer__answer_section__exam")
-        .annotate(flagged_count=Count("flagged", distinct=True))
+    exam_comments = Comment.objects.filter(flagged_count__gt=0).select_related(
+        "author", "answer__answer_section__exam"
     )
 
     document_comments = (
@@ -151,7 +147,7 @@ def get_by_user(request, username, page=-1):
 
     sorted_answers = section_util.prepare_answer_objects(
         sorted_answers, request
-    ).order_by("-expert_count", "-delta_votes", "time")
+    ).order_by("-expertvote_count", "-delta_votes", "time")
 
     if page >= 0:
         PAGE_SIZE = 20
@@ -173,11 +169,9 @@ def get_comments_by_user(request, username, page=-1):
         .select_related(*section_util.get_comment_fields_to_preselect())
         .prefetch_related(*section_util.get_comment_fields_to_prefetch())
         .annotate(
-            flagged_count=Count("flagged", distinct=True),
             is_flagged=Exists(
                 Comment.objects.filter(id=OuterRef("id"), flagged=request.user)
             ),
-            marked_as_ai_count=Count("marked_as_ai", distinct=True),
             is_marked_as_ai=Exists(
                 Comment.objects.filter(id=OuterRef("id"), marked_as_ai=request.user)
             ),
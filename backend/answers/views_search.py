@@ -1,18 +1,34 @@
+import functools
 import logging
 import random
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from django.conf import settings
 from django.contrib.postgres.search import (
     SearchQuery,
     SearchRank,
+    SearchVector,
+)
+from django.db import OperationalError, connection, connections
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    Func,
+    OuterRef,
+    Q,
+    Subquery,
+    TextField,
+    When,
 )
-from django.db.models import Case, F, Func, Q, TextField, When
 from django.db.models import Value as V
-from django.db.models.functions import Concat
+from django.db.models.functions import Coalesce, Concat, Greatest
 
+from answers import search_cache
 from answers.models import Answer, Comment, Exam, ExamPage
+from categories.models import Category, EuclidCode
 from ediauth import auth_check
 from ediauth.auth_check import has_admin_rights
 from util import response
@@ -37,8 +53,16 @@ render to HTML on the client we parse the result of ts_headline again and instea
 <b> we insert random strings so that it becomes highly unlikely that the user can accidentally
 (there might also be security implications) highlight some text.
 
-The results of the different document types are merged and sorted again on the server (It's
-find in this case because only very few documents will be left)
+The search happens in two phases. First the matching model instances are ranked and limited
+using only the indexed vectors. The results of the different document types are then merged
+and sorted again on the server (It's find in this case because only very few documents will
+be left), and only the rows that made it into the final result are highlighted with
+`ts_headline`, which has to re-parse the whole text of every document it is called on.
+
+The three document types are independent of each other, so if `COMSOL_SEARCH_PARALLEL` is
+set they are searched at the same time on a shared thread pool, each with its own database
+connection and a statement timeout. A branch that takes too long contributes no results
+instead of holding up the others.
 """
 
 logger = logging.getLogger(__name__)
@@ -52,57 +76,48 @@ def flatten_and_filter(items):
     return [item for sublist in items for item in sublist if isinstance(sublist, list)]
 
 
-def parse_recursive(text, start_re, end_re, i, start_len, end_len):
+def parse_nested(text, start, end):
     """
-    Recursively parses `text` into an area where list elements correspond to sections
-    in `text` which were surrounded by `start_re` and `end_re`. `start_len`end `end_len`
-    can be used to remove the separators. `i` is the index from which the function starts
-    matching. The function assumes that the string is well formed. In the case that `end_re`
-    occurs more times then `end_re` the returned `i` can be used to include the rest
-    of `text`.
+    Parses `text` into a list where nested lists correspond to sections in `text` which
+    were surrounded by `start` and `end`. The separators themselves are removed. Works
+    in a single pass over `text`: the next occurrence of a separator is only searched
+    for again once the parser has moved past the previous one. Sections that are never
+    closed end with the text, a stray `end` on the top level is dropped.
 
     Returns:
-        `list, number`: The parsing result and the index where parsing stopped
+        `list`: The parsing result
     """
-    parts = []
-    s = text[i:]
+    root = []
+    stack = [root]
+    i = 0
+    next_start = text.find(start)
+    next_end = text.find(end)
     while i < len(text):
-        start_match = start_re.match(s)
-        end_match = end_re.match(s)
-        start_pos = start_match.end(0) if start_match else float("inf")
-        end_pos = end_match.end(0) if end_match else float("inf")
-        if not start_match and not end_match:
-            parts.append(s)
-            i += len(s)
-            return parts, i
-        elif start_pos < end_pos:
-            p = s[: start_pos - start_len]
-            if len(p) > 0:
-                parts.append(p)
-            i += start_pos
-            child, newI = parse_recursive(text, start_re, end_re, i, start_len, end_len)
-            i = newI
-            parts.append(child)
+        if 0 <= next_start < i:
+            next_start = text.find(start, i)
+        if 0 <= next_end < i:
+            next_end = text.find(end, i)
+        if next_start == -1 and next_end == -1:
+            stack[-1].append(text[i:])
+            break
+        start_pos = next_start + len(start) if next_start != -1 else float("inf")
+        end_pos = next_end + len(end) if next_end != -1 else float("inf")
+        if start_pos < end_pos:
+            if next_start > i:
+                stack[-1].append(text[i:next_start])
+            child = []
+            stack[-1].append(child)
+            stack.append(child)
+            i = start_pos
         else:
-            i += end_pos
-            parts.append(s[: end_pos - end_len])
-            return parts, i
-        s = text[i:]
-    return parts, i
-
-
-def parse_nested(text, start_re, end_re, start_len, end_len):
-    """
-    Uses `parse_recursive` but handles strings that are not well formed.
-
-    Returns:
-        `list`: The parsing result
-    """
-
-    res, i = parse_recursive(text, start_re, end_re, 0, start_len, end_len)
-    if i < len(text):
-        res += text[i:]
-    return res
+            stack[-1].append(text[i:next_end])
+            i = end_pos
+            if len(stack) > 1:
+                stack.pop()
+            elif i < len(text):
+                root.append(text[i:])
+                break
+    return root
 
 
 def parse_headline(text, start, end, frag):
@@ -110,13 +125,7 @@ def parse_headline(text, start, end, frag):
     Returns the parsed result of a psql headline function where `start`, `end` and
     `frag` are the psql parameters and `text` is the text result.
     """
-    start_re = re.compile(".*?(" + re.escape(str(start)) + ")", flags=re.DOTALL)
-    end_re = re.compile(".*?(" + re.escape(str(end)) + ")", flags=re.DOTALL)
-
-    return [
-        parse_nested(frag, start_re, end_re, len(start), len(end))
-        for frag in text.split(frag)
-    ]
+    return [parse_nested(part, str(start), str(end)) for part in text.split(frag)]
 
 
 def generate_boundary():
@@ -183,58 +192,43 @@ def search_exams(
     amount,
     with_category_displayname=False,
 ):
+    """
+    First phase of the exam search: finds the `amount` best ranked exams whose name or
+    pages match `term`. The results carry the ids of the exams and their matching pages
+    so that `add_exam_headlines` can highlight the ones that survive the merge.
+    """
     query = SearchQuery(term)
 
-    start_boundary = generate_boundary()
-    end_boundary = generate_boundary()
-    fragment_delimeter = generate_boundary()
+    # If we want the category displayname, we match against the vector of
+    # "category displayname - exam displayname" so that queries like
+    # "FS22 Graphics" find the computer graphics exam in FS22 as the top result.
+    # The default search_vector of an Exam is only based on the exam displayname
+    # and remark, and that's kind of useless to search with since FS22 can match
+    # so many different exams. Both vectors are maintained by triggers and
+    # GIN-indexed.
+    exam_vector = (
+        "category_search_vector" if with_category_displayname else "search_vector"
+    )
+
+    # An exam is as relevant as its best matching page, so that exams found
+    # through their text are not ranked below exams found through their name.
+    best_page_rank = (
+        ExamPage.objects.filter(exam=OuterRef("pk"), search_vector=term)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank")
+        .values("rank")[:1]
+    )
 
     can_view = Q(public=True) | Q(category__in=user_admin_categories)
     exams = (
         Exam.objects.filter(
             id__in=ExamPage.objects.filter(search_vector=term).values("exam_id")
         )
-        | (
-            # Two cases: if we want category displayname, it'll be slow but we
-            # do a runtime non-vector based full text search. otherwise, we just
-            # search by precalculated vectors of just exam displayname.
-            Exam.objects.annotate(
-                displayname_with_category=Concat(
-                    "category__displayname", V(" - "), "displayname"
-                )
-            ).filter(
-                # Slow! Ideally we want to use search_vector=term with a pre-indexed
-                # vector column of "displayname - category__displayname". But it's
-                # nontrivial to create such a column, since the number of triggers
-                # will exponentially grow to make every category's row update trigger
-                # all relevant exams' vectors to update.
-                # So we do runtime on-the-fly full text search on a Concat result.
-                # The default search_vector of an Exam model is only based on the
-                # exam displayname (no category part), and that's kind of useless to
-                # search with since FS22 can match so many different exams.
-                # We want to enable queries like "FS22 Graphics" to find the computer
-                # graphics exam in FS22 as the top result.
-                displayname_with_category__search=term
-            )
-            if with_category_displayname
-            else Exam.objects.filter(search_vector=term)
-        )
+        | Exam.objects.filter(**{exam_vector: term})
     ).annotate(
-        rank=SearchRank(F("search_vector"), query),
-        headline=headline(
-            # ts_headline requires a full scan and is slow, but at this point
-            # we've already narrowed down the results with the above .filter()s
-            (
-                # Highlight results in the concat if we need category name too
-                Concat(F("category__displayname"), V(" - "), F("displayname"))
-                if with_category_displayname
-                else F("displayname")
-            ),
-            query,
-            start_boundary,
-            end_boundary,
-            fragment_delimeter,
-            max_fragments=0,  # Disable fragment-based matching to get the whole result back
+        rank=Greatest(
+            SearchRank(F(exam_vector), query),
+            Coalesce(Subquery(best_page_rank, output_field=FloatField()), V(0.0)),
         ),
         category_displayname=F("category__displayname"),
         category_slug=F("category__slug"),
@@ -244,67 +238,113 @@ def search_exams(
     if category_filter:
         # Filter by slug
         exams = exams.filter(category__slug=category_filter)
-    exams = exams.only("filename")[:amount]
+    exams = list(
+        exams.order_by("-rank").values(
+            "id", "filename", "rank", "category_displayname", "category_slug"
+        )[:amount]
+    )
 
+    pages = {exam["id"]: [] for exam in exams}
     exam_pages_query = (
+        ExamPage.objects.filter(exam__in=list(pages), search_vector=term)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("page_number")
+        .values("id", "exam_id", "page_number", "rank")
+    )
+    for exam_page in exam_pages_query:
+        pages[exam_page["exam_id"]].append(exam_page)
+
+    return [
+        {
+            "type": "exam",
+            "id": exam["id"],
+            "filename": exam["filename"],
+            "category_displayname": exam["category_displayname"],
+            "category_slug": exam["category_slug"],
+            "rank": exam["rank"],
+            "pages": pages[exam["id"]],
+        }
+        for exam in exams
+    ]
+
+
+def add_exam_headlines(term, exams, with_category_displayname=False):
+    """
+    Second phase of the exam search: highlights the name and the matching pages of
+    the given results of `search_exams` in place. The internal ids are removed.
+    """
+    if not exams:
+        return
+    query = SearchQuery(term)
+
+    start_boundary = generate_boundary()
+    end_boundary = generate_boundary()
+    fragment_delimeter = generate_boundary()
+
+    exam_headlines = dict(
+        Exam.objects.filter(id__in=[exam["id"] for exam in exams])
+        .annotate(
+            headline=headline(
+                (
+                    # Highlight results in the concat if we need category name too
+                    Concat(F("category__displayname"), V(" - "), F("displayname"))
+                    if with_category_displayname
+                    else F("displayname")
+                ),
+                query,
+                start_boundary,
+                end_boundary,
+                fragment_delimeter,
+                max_fragments=0,  # Disable fragment-based matching to get the whole result back
+            )
+        )
+        .values_list("id", "headline")
+    )
+    page_headlines = dict(
         ExamPage.objects.filter(
-            exam__in=list(exams.values_list("id", flat=True)), search_vector=term
+            id__in=[page["id"] for exam in exams for page in exam["pages"]]
         )
         .annotate(
-            rank=SearchRank(F("search_vector"), query),
             headline=headline(
                 F("text"),
                 query,
                 start_boundary,
                 end_boundary,
                 fragment_delimeter,
-            ),
+            )
         )
-        .order_by("page_number")
-        .only("page_number", "exam_id")
+        .values_list("id", "headline")
     )
 
-    examScore = dict()
-    examPages = dict()
     for exam in exams:
-        examScore[exam.id] = exam.rank
-        examPages[exam.id] = []
-    for examPage in exam_pages_query:
-        if examPage.exam_id not in examScore:
-            continue
-        examScore[examPage.exam_id] = max(examPage.rank, examScore[examPage.exam_id])
-        examPages[examPage.exam_id].append(
+        exam["headline"] = parse_headline(
+            exam_headlines[exam.pop("id")],
+            start_boundary,
+            end_boundary,
+            fragment_delimeter,
+        )
+        exam["pages"] = [
             (
-                examPage.page_number,
-                examPage.rank,
+                page["page_number"],
+                page["rank"],
                 parse_headline(
-                    examPage.headline, start_boundary, end_boundary, fragment_delimeter
+                    page_headlines[page["id"]],
+                    start_boundary,
+                    end_boundary,
+                    fragment_delimeter,
                 ),
             )
-        )
-    return [
-        {
-            "type": "exam",
-            "filename": exam.filename,
-            "headline": parse_headline(
-                exam.headline, start_boundary, end_boundary, fragment_delimeter
-            ),
-            "category_displayname": exam.category_displayname,
-            "category_slug": exam.category_slug,
-            "rank": examScore[exam.id],
-            "pages": examPages[exam.id],
-        }
-        for exam in exams
-    ]
+            for page in exam["pages"]
+        ]
 
 
 def search_answers(term, is_admin, category_filter, user_admin_categories, amount):
+    """
+    First phase of the answer search: finds the `amount` best ranked answers matching
+    `term`. Their highlighted words are added by `add_highlighted_words`.
+    """
     query = SearchQuery(term)
 
-    start_boundary = generate_boundary()
-    end_boundary = generate_boundary()
-    fragment_delimeter = generate_boundary()
-
     answer_section_exam_can_view = Q(answer_section__exam__public=True) | Q(
         answer_section__exam__category__in=user_admin_categories
     )
@@ -332,9 +372,6 @@ def search_answers(term, is_admin, category_filter, user_admin_categories, amoun
                 ),
                 default=F("author__profile__display_username"),
             ),
-            highlighted_words=headline(
-                F("text"), query, start_boundary, end_boundary, fragment_delimeter, 1, 2
-            ),
             # Exam
             exam_displayname=F("answer_section__exam__displayname"),
             filename=F("answer_section__exam__filename"),
@@ -342,11 +379,12 @@ def search_answers(term, is_admin, category_filter, user_admin_categories, amoun
             category_displayname=F("answer_section__exam__category__displayname"),
             category_slug=F("answer_section__exam__category__slug"),
         )
+        .order_by("-rank")
         .values(
+            "id",
             "author_username",
             "author_displayname",
             "text",
-            "highlighted_words",
             "rank",
             "long_id",
             # Exam
@@ -357,30 +395,16 @@ def search_answers(term, is_admin, category_filter, user_admin_categories, amoun
             "category_slug",
         )[:amount]
     )
-    for answer in answers:
-        answer["highlighted_words"] = list(
-            flatten(
-                map(
-                    flatten_and_filter,
-                    parse_headline(
-                        answer["highlighted_words"],
-                        start_boundary,
-                        end_boundary,
-                        fragment_delimeter,
-                    ),
-                )
-            )
-        )
-    return answers
+    return list(answers)
 
 
 def search_comments(term, is_admin, category_filter, user_admin_categories, amount):
+    """
+    First phase of the comment search: finds the `amount` best ranked comments matching
+    `term`. Their highlighted words are added by `add_highlighted_words`.
+    """
     query = SearchQuery(term)
 
-    start_boundary = generate_boundary()
-    end_boundary = generate_boundary()
-    fragment_delimeter = generate_boundary()
-
     answer_answer_section_exam_can_view = Q(
         answer__answer_section__exam__public=True
     ) | Q(answer__answer_section__exam__category__in=user_admin_categories)
@@ -398,9 +422,6 @@ def search_comments(term, is_admin, category_filter, user_admin_categories, amou
             rank=SearchRank(F("search_vector"), query),
             author_username=F("author__username"),
             author_displayname=F("author__profile__display_username"),
-            highlighted_words=headline(
-                F("text"), query, start_boundary, end_boundary, fragment_delimeter, 1, 2
-            ),
             # Answer
             answer_long_id=F("answer__long_id"),
             # Exam
@@ -412,11 +433,12 @@ def search_comments(term, is_admin, category_filter, user_admin_categories, amou
             ),
             category_slug=F("answer__answer_section__exam__category__slug"),
         )
+        .order_by("-rank")
         .values(
+            "id",
             "author_username",
             "author_displayname",
             "text",
-            "highlighted_words",
             "rank",
             "long_id",
             # Answer
@@ -429,13 +451,44 @@ def search_comments(term, is_admin, category_filter, user_admin_categories, amou
             "category_slug",
         )[:amount]
     )
-    for comment in comments:
-        comment["highlighted_words"] = list(
+    return list(comments)
+
+
+def add_highlighted_words(term, model, results):
+    """
+    Second phase of the answer and comment search: adds the words matching `term` to
+    the given results of `search_answers` or `search_comments` in place. The internal
+    ids are removed.
+
+    Args:
+        term (str): The search term
+        model (Answer | Comment): The model the results belong to
+        results (list): The results of the first phase
+    """
+    if not results:
+        return
+    query = SearchQuery(term)
+
+    start_boundary = generate_boundary()
+    end_boundary = generate_boundary()
+    fragment_delimeter = generate_boundary()
+
+    headlines = dict(
+        model.objects.filter(id__in=[result["id"] for result in results])
+        .annotate(
+            highlighted_words=headline(
+                F("text"), query, start_boundary, end_boundary, fragment_delimeter, 1, 2
+            )
+        )
+        .values_list("id", "highlighted_words")
+    )
+    for result in results:
+        result["highlighted_words"] = list(
             flatten(
                 map(
                     flatten_and_filter,
                     parse_headline(
-                        comment["highlighted_words"],
+                        headlines[result.pop("id")],
                         start_boundary,
                         end_boundary,
                         fragment_delimeter,
@@ -443,7 +496,70 @@ def search_comments(term, is_admin, category_filter, user_admin_categories, amou
                 )
             )
         )
-    return comments
+
+
+@functools.cache
+def get_search_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.COMSOL_SEARCH_WORKERS, thread_name_prefix="search"
+    )
+
+
+def _run_parallel_branch(fn, timeout):
+    """
+    Runs a search branch on a worker thread. Django gives every thread its own
+    connection, which we limit with a statement timeout and close afterwards.
+    """
+    start = time.time()
+    try:
+        if timeout is not None:
+            with connection.cursor() as cursor:
+                cursor.execute("SET statement_timeout = %s", [int(timeout * 1000)])
+        return list(fn()), time.time() - start
+    finally:
+        connections.close_all()
+
+
+def run_search_branches(branches, parallel=False, timeout=None):
+    """
+    Evaluates the given search branches, either one after another or
+    concurrently on the search thread pool.
+
+    Args:
+        branches (dict): Maps a branch name to a function returning its results
+        parallel (bool, optional): Whether to run the branches concurrently.
+        timeout (float, optional): Seconds after which a concurrently running
+          branch is given up on. Its result is then None.
+
+    Returns:
+        `dict, dict`: The results and the durations in seconds of each branch
+    """
+    results = {}
+    durations = {}
+    if not parallel:
+        for name, fn in branches.items():
+            start = time.time()
+            results[name] = fn()
+            durations[name] = time.time() - start
+        return results, durations
+
+    executor = get_search_executor()
+    futures = {
+        name: executor.submit(_run_parallel_branch, fn, timeout)
+        for name, fn in branches.items()
+    }
+    deadline = None if timeout is None else time.time() + timeout
+    for name, future in futures.items():
+        try:
+            results[name], durations[name] = future.result(
+                timeout=None if deadline is None else max(0, deadline - time.time())
+            )
+        except (TimeoutError, OperationalError):
+            logger.warning(f"Search branch {name} timed out after {timeout} s")
+            future.cancel()
+            results[name] = None
+            durations[name] = timeout
+    return results, durations
 
 
 @response.request_post("term")
@@ -456,9 +572,7 @@ def search(request):
     include_comments = request.POST.get("include_comments", "true") == "true"
 
     # Whether include_exams should search and return the exam's category name
-    # too. Has no effect is include_exams is false. Is also much slower if set
-    # to true since we have to do a full-text-search on concatednated columns at
-    # runtime instead of using pre-calculated vectors.
+    # too. Has no effect is include_exams is false.
     exams_with_category_name = (
         request.POST.get("exams_with_category_name", "false") == "true"
     )
@@ -468,11 +582,33 @@ def search(request):
     category_filter = request.POST.get("category", "")
 
     user = request.user
-    user_admin_categories = user.category_admin_set.values_list("id", flat=True)
+    user_admin_categories = list(user.category_admin_set.values_list("id", flat=True))
     is_admin = has_admin_rights(request)
-    exams_start = time.time()
-    exams = (
-        search_exams(
+
+    cache_key = search_cache.get_key(
+        term,
+        search_cache.get_visibility(is_admin, user_admin_categories),
+        category_filter,
+        [
+            kind
+            for kind, included in (
+                ("exams", include_exams),
+                ("answers", include_answers),
+                ("comments", include_comments),
+            )
+            if included
+        ],
+        amount=amount,
+        exams_with_category_name=exams_with_category_name,
+    )
+    cached = search_cache.load(cache_key)
+    if cached is not None:
+        return response.success(value=cached)
+
+    branches = {}
+    if include_exams:
+        branches["exams"] = functools.partial(
+            search_exams,
             term,
             is_admin,
             category_filter,
@@ -480,21 +616,33 @@ def search(request):
             amount,
             exams_with_category_name,
         )
-        if include_exams
-        else []
-    )
-    answers_start = time.time()
-    answers = (
-        search_answers(term, is_admin, category_filter, user_admin_categories, amount)
-        if include_answers
-        else []
-    )
-    comments_start = time.time()
-    comments = (
-        search_comments(term, is_admin, category_filter, user_admin_categories, amount)
-        if include_comments
-        else []
+    if include_answers:
+        branches["answers"] = functools.partial(
+            search_answers,
+            term,
+            is_admin,
+            category_filter,
+            user_admin_categories,
+            amount,
+        )
+    if include_comments:
+        branches["comments"] = functools.partial(
+            search_comments,
+            term,
+            is_admin,
+            category_filter,
+            user_admin_categories,
+            amount,
+        )
+    results, durations = run_search_branches(
+        branches,
+        parallel=settings.COMSOL_SEARCH_PARALLEL,
+        timeout=settings.COMSOL_SEARCH_BRANCH_TIMEOUT,
     )
+    exams = results.get("exams") or []
+    answers = results.get("answers") or []
+    comments = results.get("comments") or []
+
     start_merge = time.time()
     res = []
     for exam in exams:
@@ -507,12 +655,131 @@ def search(request):
         comment["type"] = "comment"
         res.append(comment)
     res = sorted(res, key=lambda x: -x["rank"])
+
+    # Highlighting is by far the most expensive part of the search, so it is
+    # only done for the rows that made it into the final result.
+    start_headlines = time.time()
+    add_exam_headlines(term, exams, exams_with_category_name)
+    add_highlighted_words(term, Answer, answers)
+    add_highlighted_words(term, Comment, comments)
     end = time.time()
     if settings.DEBUG:
         logger.info(
             f"Found: {len(exams)} exams, {len(answers)} answers, {len(comments)} comments"
         )
         logger.info(
-            f"Time spent: exams: {(answers_start - exams_start) * 1000} ms, answers: {(comments_start - answers_start) * 1000} ms, comments: {(start_merge - comments_start) * 1000} ms, sorting: {(end - start_merge) * 1000} ms"
+            f"Time spent: exams: {durations.get('exams', 0) * 1000} ms, answers: {durations.get('answers', 0) * 1000} ms, comments: {durations.get('comments', 0) * 1000} ms, sorting: {(start_headlines - start_merge) * 1000} ms, headlines: {(end - start_headlines) * 1000} ms"
         )
+    # Partial results of timed out branches must not be served again
+    if None not in results.values():
+        search_cache.store(cache_key, res)
     return response.success(value=res)
+
+
+# Number of results per document type returned by the typeahead search
+TYPEAHEAD_AMOUNT = 5
+
+
+def prefix_query(term):
+    """
+    Turns a partially typed `term` into a query matching every word as a prefix,
+    e.g. "comp gra" becomes to_tsquery('comp:* & gra:*'). Unlike `SearchQuery(term)`
+    this also matches words that have not been typed completely.
+
+    Returns:
+        `SearchQuery | None`: The query or None if `term` contains no words
+    """
+    words = re.findall(r"\w+", term.lower())
+    if not words:
+        return None
+    return SearchQuery(
+        " & ".join(f"{word}:*" for word in words),
+        config="english",
+        search_type="raw",
+    )
+
+
+def typeahead_categories(term, query, amount):
+    by_name = (
+        Category.objects.annotate(
+            search_vector=SearchVector("displayname", config="english")
+        )
+        .filter(search_vector=query)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank", "displayname")
+        .values_list("id", flat=True)[:amount]
+    )
+    # Euclid codes such as INFR09014 are matched as plain prefixes of the code
+    by_code = EuclidCode.objects.filter(
+        code__startswith=term.strip().upper(), category__isnull=False
+    ).values_list("category_id", flat=True)[:amount]
+
+    ids = list(dict.fromkeys([*by_name, *by_code]))[:amount]
+    categories = Category.objects.prefetch_related("euclid_codes").in_bulk(ids)
+    return [
+        {
+            "type": "category",
+            "displayname": categories[pk].displayname,
+            "slug": categories[pk].slug,
+            "euclid_codes": [code.code for code in categories[pk].euclid_codes.all()],
+        }
+        for pk in ids
+    ]
+
+
+def typeahead_exams(query, is_admin, category_filter, user_admin_categories, amount):
+    exams = Exam.objects.filter(category_search_vector=query)
+    if not is_admin:
+        exams = exams.filter(Q(public=True) | Q(category__in=user_admin_categories))
+    if category_filter:
+        exams = exams.filter(category__slug=category_filter)
+    return list(
+        exams.annotate(
+            type=V("exam"),
+            rank=SearchRank(F("category_search_vector"), query),
+            category_displayname=F("category__displayname"),
+            category_slug=F("category__slug"),
+        )
+        .order_by("-rank", "displayname")
+        .values(
+            "type",
+            "filename",
+            "displayname",
+            "category_displayname",
+            "category_slug",
+        )[:amount]
+    )
+
+
+@response.request_post("term")
+@auth_check.require_login
+def typeahead(request):
+    """
+    Cheap search for suggestions while the user is still typing. It only looks at
+    category names, Euclid codes and the "category - exam" names of exams, all of
+    which are prefix matched using indexes. No headlines are computed.
+    """
+    query = prefix_query(request.POST["term"])
+    if query is None:
+        return response.success(value=[])
+    try:
+        amount = int(request.POST.get("amount", TYPEAHEAD_AMOUNT))
+    except ValueError:
+        return response.not_possible("Invalid amount")
+    amount = max(1, min(amount, TYPEAHEAD_AMOUNT))
+    category_filter = request.POST.get("category", "")
+    user_admin_categories = request.user.category_admin_set.values_list("id", flat=True)
+
+    categories = (
+        []
+        if category_filter
+        else typeahead_categories(request.POST["term"], query, amount)
+    )
+    exams = typeahead_exams(
+        query,
+        has_admin_rights(request),
+        category_filter,
+        user_admin_categories,
+        amount,
+    )
+    return response.success(value=categories + exams)
@@ -0,0 +1,54 @@
+from django.db import connection, transaction
+
+from answers import section_util
+
+"""
+Votes, flags and AI marks of answers and comments are rows in the many-to-many tables
+of the voted object, whose counters are kept up to date by triggers. Every change
+also increases the `cut_version` of the section, so that clients know that their copy
+of the section is outdated.
+
+`set_memberships` does all of that in a single statement: one data-modifying CTE per
+table, each an idempotent `INSERT ... ON CONFLICT DO NOTHING` or `DELETE`, followed by
+the version bump of `section_util.increase_section_version`.
+"""
+
+
+def set_memberships(section, obj, user, **memberships):
+    """
+    Adds `user` to or removes them from the many-to-many fields of `obj` given as
+    keyword arguments, e.g. `upvotes=True, downvotes=False`, and increases the
+    version of `section`, which is updated in place.
+    """
+    qn = connection.ops.quote_name
+    ctes = []
+    params = []
+    for i, (name, member) in enumerate(memberships.items()):
+        field = obj._meta.get_field(name)
+        table = qn(field.m2m_db_table())
+        owner = qn(field.m2m_column_name())
+        target = qn(field.m2m_reverse_name())
+        if member:
+            ctes.append(
+                f"change{i} AS (INSERT INTO {table} ({owner}, {target}) "
+                "VALUES (%s, %s) ON CONFLICT DO NOTHING)"
+            )
+        else:
+            ctes.append(
+                f"change{i} AS (DELETE FROM {table} "
+                f"WHERE {owner} = %s AND {target} = %s)"
+            )
+        params += [obj.pk, user.pk]
+    sql = "WITH " + ", ".join(ctes) + " " + section_util.increase_section_version_sql()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if len(memberships) > 1:
+            # All parts of the statement see the same snapshot, so two concurrent
+            # requests of the same user, e.g. a double click on upvote and then
+            # downvote, could otherwise leave them in both sets.
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtext(%s), %s)",
+                [f"{obj._meta.label}:{obj.pk}", user.pk],
+            )
+        cursor.execute(sql, params + [section.pk])
+        (section.cut_version,) = cursor.fetchone()
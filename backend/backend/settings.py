@@ -46,6 +46,22 @@ COMSOL_FILESTORE_DIR = "files/"
 COMSOL_EXAM_ALLOWED_EXTENSIONS = {"pdf"}
 COMSOL_IMAGE_ALLOWED_EXTENSIONS = {"jfif", "jpg", "jpeg", "png", "svg", "gif", "webp"}
 COMSOL_FILESTORE_ALLOWED_EXTENSIONS = {"pdf", "zip", "tar.gz", "tar.xz"}
+# Bytes per part of multipart uploads to S3, which requires at least 5 MiB, and how
+# many parts of a file are uploaded at the same time
+COMSOL_S3_UPLOAD_PART_SIZE = int(
+    os.environ.get("S3_UPLOAD_PART_SIZE", str(8 * 1024 * 1024))
+)
+COMSOL_S3_UPLOAD_CONCURRENCY = int(os.environ.get("S3_UPLOAD_CONCURRENCY", "4"))
+# How images, documents and attachments are downloaded, see s3_util.serve_file.
+# Browsers cannot reach the S3 server of the development setup, so it proxies.
+COMSOL_S3_DOWNLOAD_MODE = os.environ.get(
+    "S3_DOWNLOAD_MODE", "proxy" if DEBUG else "redirect"
+)
+# Internal location of the reverse proxy for the "accel" download mode. It receives
+# the presigned URL appended to it and has to proxy_pass to that URL.
+COMSOL_S3_ACCEL_REDIRECT_LOCATION = os.environ.get(
+    "S3_ACCEL_REDIRECT_LOCATION", "/internal-s3/"
+)
 COMSOL_CATEGORY_SLUG_CHARS = (
     "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
 )
@@ -53,6 +69,56 @@ COMSOL_DOCUMENT_SLUG_CHARS = (
     "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-"
 )
 
+# Run the exam, answer and comment branches of the search endpoint at the same
+# time, each on its own database connection. Not used during tests, since the
+# transaction of a test case is invisible to other connections.
+COMSOL_SEARCH_PARALLEL = (
+    os.environ.get("SEARCH_PARALLEL", "false").lower() == "true" and not TESTING
+)
+COMSOL_SEARCH_WORKERS = int(os.environ.get("SEARCH_WORKERS", "6"))
+# Seconds after which a parallel search branch is abandoned and contributes no
+# results, so that one slow branch cannot stall the whole response.
+COMSOL_SEARCH_BRANCH_TIMEOUT = float(os.environ.get("SEARCH_BRANCH_TIMEOUT", "2"))
+# Seconds for which search results are cached. Set to 0 to disable the cache. Writes
+# only invalidate the cache of the process that made them, so the cache is disabled
+# unless it is shared between the workers (see REDIS_URL below).
+COMSOL_SEARCH_CACHE_TIMEOUT = (
+    int(os.environ.get("SEARCH_CACHE_TIMEOUT", "300"))
+    if "REDIS_URL" in os.environ and not TESTING
+    else 0
+)
+
+# Run background jobs right after the request that queued them has committed, for
+# local development without a `manage.py run_jobs` worker.
+COMSOL_JOBS_EAGER = (
+    os.environ.get("JOBS_EAGER", str(DEBUG and not TESTING)).lower() == "true"
+)
+# Seconds an idle worker waits before looking for new jobs again
+COMSOL_JOBS_POLL_INTERVAL = float(os.environ.get("JOBS_POLL_INTERVAL", "2"))
+# Seconds before the first retry of a failed job, doubled for every further attempt
+COMSOL_JOBS_RETRY_DELAY = int(os.environ.get("JOBS_RETRY_DELAY", "30"))
+# Seconds after which a running job is assumed to belong to a dead worker
+COMSOL_JOBS_STALE_AFTER = int(os.environ.get("JOBS_STALE_AFTER", "600"))
+# Email notifications sent by a single job over one connection to the mail server
+COMSOL_NOTIFICATION_EMAIL_BATCH_SIZE = int(
+    os.environ.get("NOTIFICATION_EMAIL_BATCH_SIZE", "50")
+)
+
+# Whether workers listen for changed answer sections to push them to clients as
+# server-sent events, see answers/section_events.py
+COMSOL_EVENTS_LISTEN = (
+    os.environ.get("EVENTS_LISTEN", str(not TESTING)).lower() == "true"
+    and "SIP_POSTGRES_DB_NAME" in os.environ
+)
+# Seconds between keepalive comments in idle event streams
+COMSOL_EVENTS_KEEPALIVE = float(os.environ.get("EVENTS_KEEPALIVE", "15"))
+# Seconds after which an event stream ends and the browser opens a new one
+COMSOL_EVENTS_STREAM_TIMEOUT = float(os.environ.get("EVENTS_STREAM_TIMEOUT", "300"))
+# Milliseconds the browser waits before reconnecting to an event stream
+COMSOL_EVENTS_RETRY = int(os.environ.get("EVENTS_RETRY", "2000"))
+# Seconds before the listener reconnects after losing its database connection
+COMSOL_EVENTS_RECONNECT_DELAY = float(os.environ.get("EVENTS_RECONNECT_DELAY", "5"))
+
 COMSOL_AUTH_ACCEPTED_DOMAINS = "sms.ed.ac.uk"
 COMSOL_AUTH_ADMIN_UUNS = os.environ.get("ADMIN_UUNS", "").split(",")
 
@@ -204,6 +270,11 @@ else:
 
 s3_host = os.environ.get("SIP_S3_FILES_HOST", "s3")
 s3_port = os.environ.get("SIP_S3_FILES_PORT", "9000")
+# Files are downloaded from S3 directly, see COMSOL_S3_DOWNLOAD_MODE
+s3_sources = [
+    "https://" + s3_host + ":" + s3_port,
+    "http://" + s3_host + ":" + s3_port,
+]
 
 CONTENT_SECURITY_POLICY = {
     "DIRECTIVES": {
@@ -229,13 +300,14 @@ CONTENT_SECURITY_POLICY = {
         "frame-src": [
             "'self'",
             "https://minio.on.tardis.ac:80",
+            # Documents viewed inline
+            *s3_sources,
             # Captchas
             "https://challenges.cloudflare.com",
         ],
         "connect-src": [
             "'self'",
-            "https://" + s3_host + ":" + s3_port,
-            "http://" + s3_host + ":" + s3_port,
+            *s3_sources,
             # Allow fetch()-ing and rendering Markdown files from BetterInformatics
             # (assumption being that they are relatively safe -- if they contain XSS,
             # the Markdown renderer should prevent it from being executed)
@@ -250,6 +322,8 @@ CONTENT_SECURITY_POLICY = {
             "https://betterinformatics.com/static/img/",  # for the camel image
             "https://comp-soc.com/static/img/",  # for the compsoc logo
             "https://raw.githubusercontent.com/compsoc-edinburgh/",  # for anything else
+            # Uploaded images, which are redirected to S3
+            *s3_sources,
         ],
     }
 }
@@ -274,6 +348,7 @@ INSTALLED_APPS = [
     "frontend.apps.FrontendConfig",
     "health.apps.HealthConfig",
     "images.apps.ImagesConfig",
+    "jobs.apps.JobsConfig",
     "ediauth",
     "util.apps.UtilConfig",
     "notifications.apps.NotificationsConfig",
@@ -372,6 +447,48 @@ else:
     }
     print("Warning: no database configured!")
 
+# The listener of answers/section_events.py keeps a session open, so it should not use
+# one of the few connections of pgbouncer but connect to postgres directly.
+COMSOL_EVENTS_DATABASE = {
+    "NAME": os.environ.get("SIP_POSTGRES_DB_NAME"),
+    "USER": os.environ.get(
+        "SIP_POSTGRES_DIRECT_DB_USER", os.environ.get("SIP_POSTGRES_DB_USER")
+    ),
+    "PASSWORD": os.environ.get(
+        "SIP_POSTGRES_DIRECT_DB_PW", os.environ.get("SIP_POSTGRES_DB_PW")
+    ),
+    "HOST": os.environ.get(
+        "SIP_POSTGRES_DIRECT_DB_SERVER", os.environ.get("SIP_POSTGRES_DB_SERVER")
+    ),
+    "PORT": os.environ.get(
+        "SIP_POSTGRES_DIRECT_DB_PORT", os.environ.get("SIP_POSTGRES_DB_PORT")
+    ),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# If a Redis-compatible server is configured, the cache is shared between the
+# gunicorn workers. Otherwise every worker keeps its own cache in memory.
+if "REDIS_URL" in os.environ:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# Cache used by `util.func_cache` for functions cached with `shared=True`
+COMSOL_FUNC_CACHE_ALIAS = "default"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -47,6 +47,7 @@ api.add_router("image/", "images.api.router")
 api.add_router("dissertations/", "dissertations.api.router")
 api.add_router("user/", "users.api.router")
 api.add_router("document/", "documents.api.router")
+api.add_router("job/", "jobs.api.router")
 
 urlpatterns = [
     path("", include("health.urls")),
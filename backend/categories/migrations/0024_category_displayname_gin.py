@@ -0,0 +1,26 @@
+# Generated by Django 5.2.16 on 2026-10-18 13:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "categories",
+            "0023_alter_coursestats_options_coursestats_source_date_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="category",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.SearchVector(
+                    "displayname", config="english"
+                ),
+                name="categories_displayname_gin",
+            ),
+        ),
+    ]
@@ -0,0 +1,331 @@
+# Manually written on 2026/10/18
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("categories", "0024_category_displayname_gin"),
+        ("answers", "0027_answersection_notify"),
+        ("documents", "0019_20260801_merge_upstream_normalise_documentfile_order"),
+    ]
+
+    # Replaces the views categories_examcounts and categories_categorymetadata, which
+    # aggregated over all exams, sections and answers on every read, with tables of
+    # the same shape. Triggers recompute the row of a single exam or category whenever
+    # something it depends on changes:
+    #
+    #   answers_answer         -> exam of its section -> category of the exam
+    #   answers_answersection  -> its exam -> category of the exam
+    #   answers_exam           -> itself -> its old and new category
+    #   documents_document     -> its old and new category
+    #   categories_category    -> itself
+    #
+    # Rows are recomputed instead of adjusted by deltas, as answered_bits depends on
+    # the order of all sections of the exam. The advisory lock serializes concurrent
+    # recomputations of the same row, so that the second one runs with a snapshot
+    # that includes the changes of the first one. examcounts.answered_cuts is only
+    # used to compute categorymetadata.answered_cuts.
+    sql = """
+    DROP VIEW categories_examcounts;
+    DROP VIEW categories_categorymetadata;
+
+    CREATE TABLE categories_examcounts (
+        id bigint PRIMARY KEY,
+        exam_id integer NOT NULL UNIQUE,
+        count_cuts integer NOT NULL,
+        count_answered integer NOT NULL,
+        answered_cuts integer NOT NULL,
+        answered_bits text NOT NULL
+    );
+
+    CREATE TABLE categories_categorymetadata (
+        id bigint PRIMARY KEY,
+        category_id integer NOT NULL UNIQUE,
+        examcount_public integer NOT NULL,
+        examcount_answered integer NOT NULL,
+        total_cuts integer NOT NULL,
+        answered_cuts integer NOT NULL,
+        documentcount integer NOT NULL
+    );
+
+    CREATE FUNCTION categories_refresh_categorymetadata(category integer)
+    RETURNS void AS $$
+    BEGIN
+        IF category IS NULL THEN
+            RETURN;
+        END IF;
+        PERFORM pg_advisory_xact_lock(hashtext('categories_categorymetadata'), category);
+        IF NOT EXISTS (SELECT 1 FROM categories_category WHERE id = category) THEN
+            DELETE FROM categories_categorymetadata WHERE category_id = category;
+            RETURN;
+        END IF;
+        INSERT INTO categories_categorymetadata (
+            id, category_id, examcount_public, examcount_answered, total_cuts,
+            answered_cuts, documentcount
+        )
+        SELECT
+            category,
+            category,
+            COUNT(ae.id),
+            COUNT(ae.id) FILTER (WHERE ec.count_answered > 0),
+            COALESCE(SUM(ec.count_cuts), 0),
+            COALESCE(SUM(ec.answered_cuts), 0),
+            (SELECT COUNT(*) FROM documents_document dd WHERE dd.category_id = category)
+        FROM answers_exam ae
+        LEFT JOIN categories_examcounts ec ON ec.exam_id = ae.id
+        WHERE ae.category_id = category AND ae.public
+        ON CONFLICT (category_id) DO UPDATE SET
+            examcount_public = EXCLUDED.examcount_public,
+            examcount_answered = EXCLUDED.examcount_answered,
+            total_cuts = EXCLUDED.total_cuts,
+            answered_cuts = EXCLUDED.answered_cuts,
+            documentcount = EXCLUDED.documentcount;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE FUNCTION categories_refresh_examcounts(exam integer) RETURNS void AS $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock(hashtext('categories_examcounts'), exam);
+        IF NOT EXISTS (SELECT 1 FROM answers_exam WHERE id = exam) THEN
+            DELETE FROM categories_examcounts WHERE exam_id = exam;
+            RETURN;
+        END IF;
+        INSERT INTO categories_examcounts (
+            id, exam_id, count_cuts, count_answered, answered_cuts, answered_bits
+        )
+        SELECT
+            exam,
+            exam,
+            COUNT(*) FILTER (WHERE s.has_answers),
+            COUNT(*) FILTER (WHERE s.answered),
+            COUNT(*) FILTER (WHERE s.has_answers AND s.answered),
+            COALESCE(
+                string_agg(
+                    CASE WHEN s.answered THEN '1' ELSE '0' END,
+                    ''
+                    ORDER BY s.page_num, s.rel_height
+                ) FILTER (WHERE s.has_answers),
+                ''
+            )
+        FROM (
+            SELECT
+                aas.has_answers,
+                aas.page_num,
+                aas.rel_height,
+                EXISTS (
+                    SELECT 1 FROM answers_answer aa WHERE aa.answer_section_id = aas.id
+                ) AS answered
+            FROM answers_answersection aas
+            WHERE aas.exam_id = exam
+        ) s
+        ON CONFLICT (exam_id) DO UPDATE SET
+            count_cuts = EXCLUDED.count_cuts,
+            count_answered = EXCLUDED.count_answered,
+            answered_cuts = EXCLUDED.answered_cuts,
+            answered_bits = EXCLUDED.answered_bits;
+        PERFORM categories_refresh_categorymetadata(category_id)
+        FROM answers_exam WHERE id = exam;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE FUNCTION categories_answer_counts_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM categories_refresh_examcounts(exam_id)
+            FROM answers_answersection WHERE id = OLD.answer_section_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM categories_refresh_examcounts(exam_id)
+            FROM answers_answersection WHERE id = NEW.answer_section_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER answer_counts_trigger
+    AFTER INSERT OR DELETE ON answers_answer
+    FOR EACH ROW EXECUTE PROCEDURE categories_answer_counts_trigger();
+
+    CREATE TRIGGER answer_counts_update_trigger
+    AFTER UPDATE OF answer_section_id ON answers_answer
+    FOR EACH ROW
+    WHEN (OLD.answer_section_id IS DISTINCT FROM NEW.answer_section_id)
+    EXECUTE PROCEDURE categories_answer_counts_trigger();
+
+    CREATE FUNCTION categories_answersection_counts_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM categories_refresh_examcounts(OLD.exam_id);
+        END IF;
+        IF TG_OP = 'INSERT' OR (
+            TG_OP = 'UPDATE' AND OLD.exam_id IS DISTINCT FROM NEW.exam_id
+        ) THEN
+            PERFORM categories_refresh_examcounts(NEW.exam_id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER answersection_counts_trigger
+    AFTER INSERT OR DELETE ON answers_answersection
+    FOR EACH ROW EXECUTE PROCEDURE categories_answersection_counts_trigger();
+
+    CREATE TRIGGER answersection_counts_update_trigger
+    AFTER UPDATE OF exam_id, has_answers, page_num, rel_height ON answers_answersection
+    FOR EACH ROW
+    WHEN (
+        OLD.exam_id IS DISTINCT FROM NEW.exam_id
+        OR OLD.has_answers IS DISTINCT FROM NEW.has_answers
+        OR OLD.page_num IS DISTINCT FROM NEW.page_num
+        OR OLD.rel_height IS DISTINCT FROM NEW.rel_height
+    )
+    EXECUTE PROCEDURE categories_answersection_counts_trigger();
+
+    CREATE FUNCTION categories_exam_counts_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM categories_refresh_examcounts(NEW.id);
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM categories_refresh_examcounts(OLD.id);
+            PERFORM categories_refresh_categorymetadata(OLD.category_id);
+        ELSE
+            -- Lock both categories in the same order everywhere
+            PERFORM categories_refresh_categorymetadata(
+                LEAST(OLD.category_id, NEW.category_id)
+            );
+            IF OLD.category_id IS DISTINCT FROM NEW.category_id THEN
+                PERFORM categories_refresh_categorymetadata(
+                    GREATEST(OLD.category_id, NEW.category_id)
+                );
+            END IF;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER exam_counts_trigger
+    AFTER INSERT OR DELETE ON answers_exam
+    FOR EACH ROW EXECUTE PROCEDURE categories_exam_counts_trigger();
+
+    CREATE TRIGGER exam_counts_update_trigger
+    AFTER UPDATE OF public, category_id ON answers_exam
+    FOR EACH ROW
+    WHEN (
+        OLD.public IS DISTINCT FROM NEW.public
+        OR OLD.category_id IS DISTINCT FROM NEW.category_id
+    )
+    EXECUTE PROCEDURE categories_exam_counts_trigger();
+
+    CREATE FUNCTION categories_document_counts_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' THEN
+            PERFORM categories_refresh_categorymetadata(
+                LEAST(OLD.category_id, NEW.category_id)
+            );
+            PERFORM categories_refresh_categorymetadata(
+                GREATEST(OLD.category_id, NEW.category_id)
+            );
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM categories_refresh_categorymetadata(OLD.category_id);
+        ELSE
+            PERFORM categories_refresh_categorymetadata(NEW.category_id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER document_counts_trigger
+    AFTER INSERT OR DELETE ON documents_document
+    FOR EACH ROW EXECUTE PROCEDURE categories_document_counts_trigger();
+
+    CREATE TRIGGER document_counts_update_trigger
+    AFTER UPDATE OF category_id ON documents_document
+    FOR EACH ROW
+    WHEN (OLD.category_id IS DISTINCT FROM NEW.category_id)
+    EXECUTE PROCEDURE categories_document_counts_trigger();
+
+    CREATE FUNCTION categories_category_counts_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM categories_refresh_categorymetadata(OLD.id);
+        ELSE
+            PERFORM categories_refresh_categorymetadata(NEW.id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER category_counts_trigger
+    AFTER INSERT OR DELETE ON categories_category
+    FOR EACH ROW EXECUTE PROCEDURE categories_category_counts_trigger();
+
+    -- Exams refresh the metadata of their category as well
+    SELECT categories_refresh_examcounts(id) FROM answers_exam;
+    SELECT categories_refresh_categorymetadata(id) FROM categories_category;
+    """
+
+    reverse_sql = """
+    DROP TRIGGER IF EXISTS category_counts_trigger ON categories_category;
+    DROP FUNCTION IF EXISTS categories_category_counts_trigger();
+    DROP TRIGGER IF EXISTS document_counts_update_trigger ON documents_document;
+    DROP TRIGGER IF EXISTS document_counts_trigger ON documents_document;
+    DROP FUNCTION IF EXISTS categories_document_counts_trigger();
+    DROP TRIGGER IF EXISTS exam_counts_update_trigger ON answers_exam;
+    DROP TRIGGER IF EXISTS exam_counts_trigger ON answers_exam;
+    DROP FUNCTION IF EXISTS categories_exam_counts_trigger();
+    DROP TRIGGER IF EXISTS answersection_counts_update_trigger ON answers_answersection;
+    DROP TRIGGER IF EXISTS answersection_counts_trigger ON answers_answersection;
+    DROP FUNCTION IF EXISTS categories_answersection_counts_trigger();
+    DROP TRIGGER IF EXISTS answer_counts_update_trigger ON answers_answer;
+    DROP TRIGGER IF EXISTS answer_counts_trigger ON answers_answer;
+    DROP FUNCTION IF EXISTS categories_answer_counts_trigger();
+    DROP FUNCTION IF EXISTS categories_refresh_examcounts(integer);
+    DROP FUNCTION IF EXISTS categories_refresh_categorymetadata(integer);
+    DROP TABLE categories_examcounts;
+    DROP TABLE categories_categorymetadata;
+
+    CREATE VIEW categories_examcounts (id, exam_id, count_cuts, count_answered, answered_bits) AS
+        SELECT
+            CAST(ae.id AS bigint),
+            ae.id,
+            COUNT(aas.id) FILTER (WHERE aas.has_answers),
+            COUNT(sub.answer_section_id),
+            (
+                SELECT COALESCE(string_agg(
+                    CASE WHEN EXISTS (
+                        SELECT 1 FROM answers_answer aa WHERE aa.answer_section_id = aas2.id
+                    ) THEN '1' ELSE '0' END,
+                    ''
+                    ORDER BY aas2.page_num, aas2.rel_height
+                ), '')
+                FROM answers_answersection aas2
+                WHERE aas2.exam_id = ae.id AND aas2.has_answers
+            )
+        FROM answers_exam ae
+        LEFT JOIN answers_answersection aas ON aas.exam_id = ae.id
+        LEFT JOIN (
+            SELECT answer_section_id
+            FROM answers_answer aa
+            GROUP BY aa.answer_section_id
+        ) sub ON sub.answer_section_id = aas.id
+        GROUP BY ae.id
+    ;
+
+    CREATE VIEW categories_categorymetadata (id, category_id, examcount_public, examcount_answered, total_cuts, answered_cuts, documentcount) AS
+        SELECT row_number() OVER () as id,
+            cc.id AS category_id,
+            (SELECT COUNT(*) FROM answers_exam ae WHERE (ae.category_id = cc.id AND ae.public = true)),
+            (SELECT COUNT(*) FROM answers_exam ae WHERE (ae.category_id = cc.id AND ae.public=true AND EXISTS (
+                SELECT aa.id FROM answers_answer aa INNER JOIN answers_answersection aas ON (aa.answer_section_id = aas.id) WHERE aas.exam_id = ae.id
+            ))),
+            (SELECT COUNT(*) FROM answers_answersection aas INNER JOIN answers_exam ae ON (aas.exam_id = ae.id) WHERE (ae.category_id = cc.id AND ae.public = true AND aas.has_answers = true)),
+            (SELECT COUNT(*) FROM answers_answersection aas INNER JOIN answers_exam ae ON (aas.exam_id = ae.id) WHERE (ae.category_id = cc.id AND ae.public = true AND aas.has_answers = true AND EXISTS (
+                SELECT aa.id FROM answers_answer aa WHERE aa.answer_section_id = aas.id
+            ))),
+            (SELECT COUNT(*) FROM documents_document dd WHERE (dd.category_id = cc.id))
+        FROM categories_category cc
+    ;
+    """
+
+    operations = [migrations.RunSQL(sql, reverse_sql)]
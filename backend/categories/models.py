@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
 
 import dissertations.models
@@ -37,12 +39,23 @@ class Category(models.Model):
         "dissertations.models.Dissertation"
     ]  # for typehints on the many-to-many relation
 
+    class Meta:
+        indexes = [
+            # Used for prefix matching category names in the typeahead search
+            GinIndex(
+                SearchVector("displayname", config="english"),
+                name="categories_displayname_gin",
+            )
+        ]
+
     def answer_progress(self):
         if self.meta.total_cuts == 0:
             return 0
         return self.meta.answered_cuts / self.meta.total_cuts
 
 
+# CategoryMetaData and ExamCounts are tables maintained by triggers on answers,
+# sections, exams, documents and categories (migration 0025_materialize_counts).
 class CategoryMetaData(models.Model):
     category = models.OneToOneField(
         "Category", related_name="meta", on_delete=models.DO_NOTHING
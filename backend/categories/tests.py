@@ -1,7 +1,8 @@
 from django.contrib.auth.models import User
 
-from categories.models import Category, EuclidCode, MetaCategory
-from testing.tests import ComsolTest, ComsolTestExamsData
+from answers.models import Answer, AnswerSection
+from categories.models import Category, EuclidCode, ExamCounts, MetaCategory
+from testing.tests import ComsolTest, ComsolTestExamData, ComsolTestExamsData
 
 
 class TestAddRemove(ComsolTest):
@@ -343,4 +344,51 @@ class TestCourseStats(ComsolTest):
         self.assertEqual(len(res), 0)
 
 
-# TODO: test whether the counts returned in list_exams and withmeta are correct
+class TestCounts(ComsolTestExamData):
+    def get_exam_counts(self):
+        (res,) = self.get(f"/api/category/listexams/{self.category.slug}/")["value"]
+        return res["count_cuts"], res["count_answered"], res["answered_bits"]
+
+    def get_category_counts(self, category):
+        res = self.get("/api/category/listwithmeta/")["value"]
+        (res,) = [cat for cat in res if cat["slug"] == category.slug]
+        return res["examcountpublic"], res["examcountanswered"], res["answerprogress"]
+
+    def test_counts(self):
+        self.assertEqual(self.get_exam_counts(), (4, 4, "1111"))
+        self.assertEqual(self.get_category_counts(self.category), (1, 1, 1))
+
+        Answer.objects.filter(answer_section=self.sections[1]).delete()
+        self.assertEqual(self.get_exam_counts(), (4, 3, "1011"))
+        self.assertEqual(self.get_category_counts(self.category), (1, 1, 0.75))
+
+        self.post(f"/api/exam/editcut/{self.sections[3].id}/", {"has_answers": "false"})
+        self.assertEqual(self.get_exam_counts(), (3, 3, "101"))
+        examcount_public, examcount_answered, progress = self.get_category_counts(
+            self.category
+        )
+        self.assertEqual((examcount_public, examcount_answered), (1, 1))
+        self.assertAlmostEqual(progress, 2 / 3)
+
+        self.exam.public = False
+        self.exam.save()
+        self.assertEqual(self.get_category_counts(self.category), (0, 0, 0))
+
+        other = Category.objects.create(displayname="Other", slug="other")
+        self.assertEqual(self.get_category_counts(other), (0, 0, 0))
+        self.exam.public = True
+        self.exam.category = other
+        self.exam.save()
+        self.assertEqual(self.get_category_counts(self.category), (0, 0, 0))
+        self.assertEqual(self.get_category_counts(other)[:2], (1, 1))
+
+        Answer.objects.filter(answer_section__exam=self.exam).delete()
+        self.assertEqual(self.get_category_counts(other), (1, 0, 0))
+
+    def test_sections_order(self):
+        AnswerSection.objects.create(
+            exam=self.exam, author=self.get_my_user(), page_num=1, rel_height=0.1
+        )
+        self.assertEqual(self.get_exam_counts(), (5, 4, "01111"))
+        self.exam.delete()
+        self.assertFalse(ExamCounts.objects.exists())
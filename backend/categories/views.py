@@ -285,6 +285,7 @@ def add_user_to_set(request, slug):
         if not cat.admins.filter(pk=user.pk).exists():
             cat.admins.add(user)
             cat.save()
+            auth_check.reset_admin_rights_cache(user, cat)
     elif request.POST["key"] == "experts":
         if not cat.experts.filter(pk=user.pk).exists():
             cat.experts.add(user)
@@ -303,6 +304,7 @@ def remove_user_from_set(request, slug):
         if cat.admins.filter(pk=user.pk).exists():
             cat.admins.remove(user)
             cat.save()
+            auth_check.reset_admin_rights_cache(user, cat)
     elif request.POST["key"] == "experts":
         if cat.experts.filter(pk=user.pk).exists():
             cat.experts.remove(user)
@@ -172,12 +172,15 @@ def upload_dissertation(
     # Upload PDF to Minio
     # Assuming the bucket already exists or is created by Minio setup
     file_name = f"{title.replace(' ', '_')}_{pdf_file.name}"
-    s3_util.save_file_to_s3(
-        bucket_name + "/",
-        file_name,
-        temp_file_path,
-        pdf_file.content_type or "application/pdf",
-    )
+    try:
+        s3_util.save_file_to_s3(
+            bucket_name + "/",
+            file_name,
+            temp_file_path,
+            pdf_file.content_type or "application/pdf",
+        )
+    finally:
+        os.remove(temp_file_path)
     file_path = f"/{bucket_name}/{file_name}"
 
     # Create Dissertation entry in DB
@@ -227,14 +230,15 @@ def redact_dissertation(
     except Exception as e:
         return response.not_possible(f"Error redacting file: {str(e)}")
 
-    s3_util.save_file_to_s3(
-        bucket_name + "_temp_redacted/",
-        f"redacted_{pdf_file.name}",
-        temp_file_path,
-        pdf_file.content_type or "application/pdf",
-    )
-
-    os.remove(temp_file_path)
+    try:
+        s3_util.save_file_to_s3(
+            bucket_name + "_temp_redacted/",
+            f"redacted_{pdf_file.name}",
+            temp_file_path,
+            pdf_file.content_type or "application/pdf",
+        )
+    finally:
+        os.remove(temp_file_path)
 
     # Delete any existing redacted files older than 5 minutes: ideally we should
     # do this kind of churn in a scheduled celery task or something)
@@ -392,12 +396,15 @@ def update_dissertation(
 
         # Upload PDF to Minio
         file_name = f"{dissertation.title.replace(' ', '_')}_{pdf_file.name}"
-        s3_util.save_file_to_s3(
-            bucket_name + "/",
-            file_name,
-            temp_file_path,
-            pdf_file.content_type or "application/pdf",
-        )
+        try:
+            s3_util.save_file_to_s3(
+                bucket_name + "/",
+                file_name,
+                temp_file_path,
+                pdf_file.content_type or "application/pdf",
+            )
+        finally:
+            os.remove(temp_file_path)
         file_path = f"/{bucket_name}/{file_name}"
 
         dissertation.file_path = file_path
@@ -931,7 +931,8 @@ def get_document_file(request, slug: str, filename):
     )
     _, ext = os.path.splitext(document_file.filename)
     attachment_filename = document_file.display_name + ext
-    return s3_util.send_file(
+    return s3_util.serve_file(
+        request,
         settings.COMSOL_DOCUMENT_DIR,
         filename,
         as_attachment=True,
@@ -90,7 +90,7 @@ def has_admin_rights(request):
     return "admin" in getattr(request, "roles", [])
 
 
-@func_cache.cache(60)
+@func_cache.cache(60, shared=True)
 def _has_admin_rights_for_any_category(user):
     return user.category_admin_set.exists()
 
@@ -101,7 +101,7 @@ def has_admin_rights_for_any_category(request):
     return _has_admin_rights_for_any_category(request.user)
 
 
-@func_cache.cache(60)
+@func_cache.cache(60, shared=True)
 def _has_admin_rights_for_category(user, category):
     return user.category_admin_set.filter(pk=category.pk).exists()
 
@@ -112,6 +112,16 @@ def has_admin_rights_for_category(request, category):
     return _has_admin_rights_for_category(request.user, category)
 
 
+def reset_admin_rights_cache(user, category):
+    """
+    Has to be called whenever `user` becomes or stops being an admin of `category`.
+    Other processes only notice the change right away if the function cache is
+    shared (see `util.func_cache`), otherwise after at most 60 seconds.
+    """
+    _has_admin_rights_for_any_category.invalidate(user)
+    _has_admin_rights_for_category.invalidate(user, category)
+
+
 def has_admin_rights_for_exam(request, exam):
     return has_admin_rights_for_category(request, exam.category)
 
@@ -1,3 +1,5 @@
+import urllib.request
+
 from django.conf import settings
 
 from categories.models import Category
@@ -20,5 +22,15 @@ class TestUploadDownload(ComsolTest):
                     "file": f,
                 },
             )
-        self.get("/api/filestore/get/{}/".format(res["filename"]), as_json=False)
+        # Downloads are redirected to S3
+        response = self.get(
+            "/api/filestore/get/{}/".format(res["filename"]),
+            status_code=302,
+            as_json=False,
+        )
+        with (
+            urllib.request.urlopen(response["Location"]) as download,
+            open(f"{settings.COMSOL_ASSETS_FOLDER}/exam10.pdf", "rb") as f,
+        ):
+            self.assertEqual(download.read(), f.read())
         self.post("/api/filestore/remove/{}/".format(res["filename"]), {})
@@ -54,6 +54,6 @@ def remove(request, filename):
 @response.request_get()
 def get(request, filename):
     get_object_or_404(Attachment, filename=filename)
-    return s3_util.send_file(
-        settings.COMSOL_FILESTORE_DIR, filename, attachment_filename=filename
+    return s3_util.serve_file(
+        request, settings.COMSOL_FILESTORE_DIR, filename, attachment_filename=filename
     )
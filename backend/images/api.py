@@ -3,6 +3,7 @@ from django.shortcuts import get_object_or_404
 from ninja import File, Router, Schema, UploadedFile
 
 from ediauth import auth_check
+from images import derivatives
 from images.models import Image
 from util import s3_util
 from util.response import ErrorSchema, not_allowed, not_possible
@@ -44,6 +45,7 @@ def upload_image(request, file: File[UploadedFile]):
     image = Image(filename=filename, owner=request.user, displayname=file.name)
     image.save()
     s3_util.save_uploaded_file_to_s3(settings.COMSOL_IMAGE_DIR, filename, file)
+    derivatives.request_default_derivatives(filename)
     return {"filename": filename}
 
 
@@ -64,10 +66,31 @@ def remove_image(request, filename: str):
         return not_allowed()
 
     s3_util.delete_file(settings.COMSOL_IMAGE_DIR, filename)
+    derivatives.delete_derivatives(filename)
     image.delete()
     return {}
 
 
 @router.get("/get/{filename}/", operation_id="getImage")
-def get_image(request, filename: str):
-    return s3_util.send_file(settings.COMSOL_IMAGE_DIR, filename)
+def get_image(request, filename: str, w: int | None = None, fmt: str | None = None):
+    """
+    Serves an image, or a derivative at most `w` pixels wide in the format `fmt` if
+    either is given, see derivatives.py.
+    """
+    image = get_object_or_404(Image, filename=filename)
+    if fmt is not None and fmt not in derivatives.FORMATS:
+        return not_possible("Invalid Format")
+    if w is not None and w < 1:
+        return not_possible("Invalid Width")
+    if (w is not None or fmt is not None) and image.has_derivatives:
+        derivative = derivatives.select_derivative(filename, w, fmt)
+        if derivative is None:
+            # Served until the derivative has been made, so it must not be cached
+            # under the URL of the derivative
+            return s3_util.serve_file(request, settings.COMSOL_IMAGE_DIR, filename)
+        filename = derivative
+    # Images get a new random name when they are uploaded and derivatives are named
+    # after them, so they never change
+    return s3_util.serve_file(
+        request, settings.COMSOL_IMAGE_DIR, filename, immutable=True
+    )
@@ -0,0 +1,192 @@
+import io
+import logging
+import os
+
+from django.conf import settings
+from PIL import Image, ImageOps, features
+
+from jobs import queue
+from util import func_cache, s3_util
+
+"""
+Resized copies of uploaded images in other formats, so that pages embedding a photo
+do not load all megabytes of it. Derivatives are made by a job, for the ones the
+frontend uses right after the upload and for all others the first time they are
+requested, while the original is served in the meantime. They are stored next to the
+original in S3 under a name derived from it and their parameters, e.g.
+`imgs/<name>.w640.webp`. Which derivatives exist is cached in the process, so that
+later requests do not have to ask S3. Images no derivatives can be made of, e.g.
+animated ones, are marked with `Image.has_derivatives` and always served as they are.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Widths derivatives are made in. Requested widths are rounded up to the next one so
+# that arbitrary widths cannot fill the bucket, and the largest one limits the size
+# of all derivatives.
+WIDTHS = (320, 640, 1280, 1920)
+
+# Formats derivatives can have, with their content type and encoder options
+FORMATS = {
+    "jpeg": ("image/jpeg", {"quality": 85, "optimize": True, "progressive": True}),
+    "png": ("image/png", {"optimize": True}),
+    "webp": ("image/webp", {"quality": 80}),
+}
+if features.check("avif"):
+    FORMATS["avif"] = ("image/avif", {"quality": 60})
+
+# Formats of the originals derivatives are made of, by extension. SVGs do not need
+# them and GIFs are often animated.
+SOURCE_FORMATS = {
+    "jfif": "jpeg",
+    "jpg": "jpeg",
+    "jpeg": "jpeg",
+    "png": "png",
+    "webp": "webp",
+}
+
+# Derivatives requested by the frontend, see markdown-text.tsx and image-overlay.tsx.
+# They are made as soon as an image is uploaded.
+DEFAULT_VARIANTS = ((1920, "webp"), (320, "webp"))
+
+# Seconds for which a worker remembers the derivatives it has seen
+DERIVATIVE_CACHE_VALIDITY = 60 * 60
+# Seconds before a worker requests a missing derivative again
+REQUEST_VALIDITY = 60
+
+
+def get_width(width):
+    for candidate in WIDTHS:
+        if width <= candidate:
+            return candidate
+    return WIDTHS[-1]
+
+
+def get_derivative_name(filename, width, fmt):
+    stem, _ = os.path.splitext(filename)
+    return f"{stem}.w{width}.{fmt}"
+
+
+def make_derivative(original, width, fmt):
+    """
+    Returns the encoded image, at most `width` pixels wide, or None if the original
+    cannot be turned into one.
+    """
+    try:
+        with Image.open(io.BytesIO(original)) as image:
+            if getattr(image, "is_animated", False):
+                return None
+            # Phone photos are often stored sideways with an orientation tag, which is
+            # not kept
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((width, image.height))
+            if fmt == "jpeg":
+                if image.mode != "RGB":
+                    image = image.convert("RGB")
+            elif image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            out = io.BytesIO()
+            image.save(out, format=fmt, **FORMATS[fmt][1])
+            return out.getvalue()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning("Could not make a derivative of an image", exc_info=True)
+        return None
+
+
+def generate_derivatives(filename, variants):
+    """
+    Makes the derivatives of an image with the given (width, format) pairs that do not
+    exist yet. Returns False if the original cannot be turned into one. Decoding and
+    encoding take a while and would block the other greenlets of a gevent worker, so
+    this runs in the job queue, see tasks.py.
+    """
+    missing = [
+        (width, fmt)
+        for width, fmt in variants
+        if not s3_util.is_file_in_s3(
+            settings.COMSOL_IMAGE_DIR, get_derivative_name(filename, width, fmt)
+        )
+    ]
+    if not missing:
+        return True
+    original = s3_util.get_file_content(settings.COMSOL_IMAGE_DIR, filename)
+    if original is None:
+        # Raised so that the job is retried
+        raise FileNotFoundError(f"Could not read image {filename}")
+    for width, fmt in missing:
+        data = make_derivative(original, width, fmt)
+        if data is None:
+            return False
+        s3_util.save_data_to_s3(
+            settings.COMSOL_IMAGE_DIR,
+            get_derivative_name(filename, width, fmt),
+            data,
+            FORMATS[fmt][0],
+        )
+    return True
+
+
+@func_cache.cache(DERIVATIVE_CACHE_VALIDITY, maxsize=4096)
+def find_derivative(name):
+    """
+    Returns the name of a derivative if it exists, or None. A None is forgotten right
+    away by `get_derivative`, so that the derivative is served once it has been made.
+    """
+    return name if s3_util.is_file_in_s3(settings.COMSOL_IMAGE_DIR, name) else None
+
+
+@func_cache.cache(REQUEST_VALIDITY, maxsize=4096)
+def request_derivatives(filename, variants):
+    """
+    Queues making the given (width, format) derivatives of an image. A worker requests
+    a derivative at most once every `REQUEST_VALIDITY` seconds, and the job does
+    nothing for derivatives that exist already.
+    """
+    queue.enqueue(
+        "make_image_derivatives",
+        filename=filename,
+        variants=[list(variant) for variant in variants],
+    )
+
+
+def get_derivative(filename, width, fmt):
+    """
+    Returns the name of the derivative of an image, or None if it does not exist yet,
+    in which case it is requested. Missing derivatives are not cached.
+    """
+    name = get_derivative_name(filename, width, fmt)
+    if find_derivative(name) is None:
+        find_derivative.invalidate(name)
+        request_derivatives(filename, ((width, fmt),))
+        return None
+    return name
+
+
+def request_default_derivatives(filename):
+    """
+    Requests the derivatives the frontend asks for, right after an image was uploaded.
+    """
+    if get_source_format(filename) is not None:
+        request_derivatives(filename, DEFAULT_VARIANTS)
+
+
+def get_source_format(filename):
+    return SOURCE_FORMATS.get(os.path.splitext(filename)[1][1:].lower())
+
+
+def select_derivative(filename, width=None, fmt=None):
+    """
+    Returns the name of the file to serve for an image requested with the given
+    width and format, or None if its derivative is still being made. Images that
+    have no derivatives are served as they are.
+    """
+    source = get_source_format(filename)
+    if source is None:
+        return filename
+    width = WIDTHS[-1] if width is None else get_width(width)
+    return get_derivative(filename, width, fmt or source)
+
+
+def delete_derivatives(filename):
+    stem, _ = os.path.splitext(filename)
+    s3_util.delete_files_with_prefix(settings.COMSOL_IMAGE_DIR, stem + ".w")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.16 on 2026-10-18 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('images', '0002_image_displayname'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='has_derivatives',
+            field=models.BooleanField(default=True),
+        ),
+    ]
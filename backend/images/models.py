@@ -5,3 +5,6 @@ class Image(models.Model):
     filename = models.CharField(max_length=256)
     owner = models.ForeignKey("auth.User", on_delete=models.CASCADE)
     displayname = models.CharField(max_length=256)
+    # Cleared when no derivatives can be made of the image, e.g. because it is
+    # animated or cannot be decoded, so that the original is served right away
+    has_derivatives = models.BooleanField(default=True)
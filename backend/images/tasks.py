@@ -0,0 +1,17 @@
+from images import derivatives
+from images.models import Image
+from jobs import queue
+
+
+@queue.handler("make_image_derivatives")
+def make_image_derivatives(filename, variants):
+    """
+    Makes the derivatives of an image with the given [width, format] pairs that do not
+    exist yet. Images no derivatives can be made of are marked, so that they are not
+    requested again.
+    """
+    if not Image.objects.filter(filename=filename).exists():
+        # Removed before we got to it
+        return
+    if not derivatives.generate_derivatives(filename, variants):
+        Image.objects.filter(filename=filename).update(has_derivatives=False)
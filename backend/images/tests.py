@@ -1,6 +1,17 @@
+import io
+import os
+import urllib.parse
+import urllib.request
+
 from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image as PILImage
 
+from images.models import Image
+from jobs import queue
+from jobs.models import Job
 from testing.tests import ComsolTest
+from util import s3_util
 
 
 class TestUploadRemove(ComsolTest):
@@ -18,11 +29,33 @@ class TestUploadRemove(ComsolTest):
             )
         images = self.get("/api/image/list/")["value"]
         self.assertEqual(len(images), 1)
-        self.get("/api/image/get/{}/".format(res["filename"]), as_json=False)
+        self.get(
+            "/api/image/get/{}/".format(res["filename"]), as_json=False, status_code=302
+        )
         self.post("/api/image/remove/{}/".format(res["filename"]), {})
         images = self.get("/api/image/list/")["value"]
         self.assertEqual(len(images), 0)
 
+    def test_redirect_allowed_by_csp(self):
+        with open(
+            f"{settings.COMSOL_ASSETS_FOLDER}/static/test_uploadrm.svg", "rb"
+        ) as f:
+            res = self.post("/api/image/upload/", {"file": f})
+        response = self.get(
+            f"/api/image/get/{res['filename']}/", as_json=False, status_code=302
+        )
+        location = urllib.parse.urlsplit(response["Location"])
+        origin = f"{location.scheme}://{location.netloc}"
+        directives = {
+            directive.split()[0]: directive.split()[1:]
+            for directive in response["Content-Security-Policy"].split(";")
+            if directive.strip()
+        }
+        # Browsers check the target of the redirect against the policy of the page
+        self.assertIn(origin, directives["img-src"])
+        self.assertIn(origin, directives["frame-src"])
+        self.post(f"/api/image/remove/{res['filename']}/", {})
+
     def test_wrong_file_extension(self):
         with open(f"{settings.COMSOL_ASSETS_FOLDER}/exam10.pdf", "rb") as f:
             self.post(
@@ -51,7 +84,7 @@ class TestRemoveImage(ComsolTest):
                 },
             )
 
-        self.get(f"/api/image/get/{res['filename']}/", as_json=False, status_code=200)
+        self.get(f"/api/image/get/{res['filename']}/", as_json=False, status_code=302)
 
         self.filename = res["filename"]
 
@@ -60,7 +93,7 @@ class TestRemoveImage(ComsolTest):
         self.login_as(self.nonAdminUsers[1])
 
         self.post(f"/api/image/remove/{self.filename}/", {}, status_code=403)
-        self.get(f"/api/image/get/{self.filename}/", as_json=False, status_code=200)
+        self.get(f"/api/image/get/{self.filename}/", as_json=False, status_code=302)
 
     def test_can_delete_owned_image(self):
         # If same user, should be able to remove image
@@ -75,3 +108,106 @@ class TestRemoveImage(ComsolTest):
 
         self.post(f"/api/image/remove/{self.filename}/", {}, status_code=200)
         self.get(f"/api/image/get/{self.filename}/", as_json=False, status_code=404)
+
+
+class TestDerivatives(ComsolTest):
+    def upload(self, name, data):
+        res = self.post(
+            "/api/image/upload/",
+            {"file": SimpleUploadedFile(name, data)},
+        )
+        return res["filename"]
+
+    def download(self, path):
+        res = self.get(path, status_code=302, test_post=False, as_json=False)
+        with urllib.request.urlopen(res["Location"]) as download:
+            return download.read()
+
+    def test_derivative(self):
+        out = io.BytesIO()
+        PILImage.new("RGB", (2000, 1000), "red").save(out, format="png")
+        original = out.getvalue()
+        filename = self.upload("photo.png", original)
+        stem, _ = os.path.splitext(filename)
+
+        # The original is served until the derivative has been made, and must not
+        # be cached under the URL of the derivative
+        res = self.get(
+            f"/api/image/get/{filename}/?w=500&fmt=webp",
+            status_code=302,
+            test_post=False,
+            as_json=False,
+        )
+        self.assertIn("no-cache", res["Cache-Control"])
+        self.assertEqual(
+            self.download(f"/api/image/get/{filename}/?w=500&fmt=webp"), original
+        )
+        self.assertFalse(
+            s3_util.is_file_in_s3(settings.COMSOL_IMAGE_DIR, f"{stem}.w640.webp")
+        )
+
+        queue.run_pending()
+        # The derivatives the frontend uses are made right after the upload
+        self.assertTrue(
+            s3_util.is_file_in_s3(settings.COMSOL_IMAGE_DIR, f"{stem}.w1920.webp")
+        )
+        data = self.download(f"/api/image/get/{filename}/?w=500&fmt=webp")
+        with PILImage.open(io.BytesIO(data)) as image:
+            self.assertEqual(image.format, "WEBP")
+            # Rounded up to the next width derivatives are made in
+            self.assertEqual(image.size, (640, 320))
+
+        # Without a format, the derivative keeps the format of the original
+        self.download(f"/api/image/get/{filename}/?w=320")
+        queue.run_pending()
+        data = self.download(f"/api/image/get/{filename}/?w=320")
+        with PILImage.open(io.BytesIO(data)) as image:
+            self.assertEqual(image.format, "PNG")
+            self.assertEqual(image.size, (320, 160))
+
+        self.post(f"/api/image/remove/{filename}/", {})
+        self.assertFalse(
+            s3_util.is_file_in_s3(settings.COMSOL_IMAGE_DIR, f"{stem}.w640.webp")
+        )
+
+    def test_svg_original(self):
+        with open(
+            f"{settings.COMSOL_ASSETS_FOLDER}/static/test_uploadrm.svg", "rb"
+        ) as f:
+            original = f.read()
+        filename = self.upload("image.svg", original)
+        data = self.download(f"/api/image/get/{filename}/?w=320&fmt=webp")
+        self.assertEqual(data, original)
+        self.post(f"/api/image/remove/{filename}/", {})
+
+    def test_invalid(self):
+        filename = self.upload("image.png", b"not an image")
+        self.get(
+            f"/api/image/get/{filename}/?fmt=bmp",
+            status_code=400,
+            test_post=False,
+            as_json=False,
+        )
+        self.get(
+            f"/api/image/get/{filename}/?w=0",
+            status_code=400,
+            test_post=False,
+            as_json=False,
+        )
+        # Images that cannot be read are served as they are
+        queue.run_pending()
+        self.assertFalse(Image.objects.get(filename=filename).has_derivatives)
+        jobs = Job.objects.count()
+        res = self.get(
+            f"/api/image/get/{filename}/?w=320",
+            status_code=302,
+            test_post=False,
+            as_json=False,
+        )
+        # ...for good, without asking for the derivative again
+        self.assertNotIn("no-cache", res["Cache-Control"])
+        self.assertEqual(Job.objects.count(), jobs)
+        self.assertEqual(
+            self.download(f"/api/image/get/{filename}/?w=320"), b"not an image"
+        )
+        self.post(f"/api/image/remove/{filename}/", {})
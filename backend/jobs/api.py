@@ -0,0 +1,42 @@
+from django.shortcuts import get_object_or_404
+from ninja import Router, Schema
+
+from ediauth import auth_check
+from jobs.models import Job
+from util.response import ErrorSchema, not_allowed
+from util.schemas import ValueWrapped
+
+router = Router(tags=["Jobs"])
+
+
+class JobOut(Schema):
+    id: int
+    kind: str
+    status: Job.Status
+    attempts: int
+    max_attempts: int
+    time_created: str
+    time_finished: str | None = None
+
+    @staticmethod
+    def resolve_time_created(obj):
+        return obj.time_created.isoformat()
+
+    @staticmethod
+    def resolve_time_finished(obj):
+        return obj.time_finished.isoformat() if obj.time_finished else None
+
+
+class JobResponse(ValueWrapped[JobOut]):
+    pass
+
+
+@router.get(
+    "/{job_id}/", response={200: JobResponse, 403: ErrorSchema}, operation_id="getJob"
+)
+@auth_check.require_login
+def get_job(request, job_id: int):
+    job = get_object_or_404(Job, pk=job_id)
+    if job.owner != request.user and not auth_check.has_admin_rights(request):
+        return not_allowed()
+    return {"value": job}
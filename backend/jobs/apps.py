@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    name = "jobs"
+
+    def ready(self):
+        # Job handlers are registered in the `tasks` module of each app
+        autodiscover_modules("tasks")
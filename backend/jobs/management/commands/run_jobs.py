@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit as soon as no job is due instead of waiting for new ones",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            queue.requeue_stale()
+            count = queue.run_pending()
+            if count:
+                self.stdout.write(f"Ran {count} job(s)")
+            if options["once"]:
+                return
+            time.sleep(settings.COMSOL_JOBS_POLL_INTERVAL)
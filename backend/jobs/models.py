@@ -0,0 +1,40 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    # Name of the handler registered with `jobs.queue.handler`
+    kind = models.CharField(max_length=64)
+    # Keyword arguments for the handler
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.QUEUED
+    )
+    # The user that caused the job, who is allowed to see its status
+    owner = models.ForeignKey(
+        "auth.User", null=True, blank=True, on_delete=models.SET_NULL
+    )
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    # Queued jobs are not picked up before this time, used to back off retries
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    time_created = models.DateTimeField(default=timezone.now)
+    time_finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["run_after"],
+                condition=Q(status="queued"),
+                name="jobs_job_queued_idx",
+            )
+        ]
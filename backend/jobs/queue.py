@@ -0,0 +1,116 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from jobs.models import Job
+
+"""
+A small job queue on top of postgres, used for work that is too slow to be done while
+a gunicorn worker waits, such as processing uploaded exams. Jobs are rows in the
+`jobs_job` table and are executed by `manage.py run_jobs`. Several workers can run at
+the same time: a worker claims a job with `SELECT ... FOR UPDATE SKIP LOCKED`, so no
+job is handed out twice.
+
+A job that raises is queued again with an exponential backoff until it has used up its
+attempts, after which it is marked as failed. Jobs of a worker that died while running
+them are queued again once their lock is older than `COMSOL_JOBS_STALE_AFTER`.
+Handlers therefore have to be safe to run more than once.
+"""
+
+logger = logging.getLogger(__name__)
+
+handlers = {}
+
+
+def handler(kind):
+    """
+    Registers the decorated function as the handler for jobs of the given kind. The
+    function is called with the payload of the job as keyword arguments.
+    """
+
+    def decorator(f):
+        handlers[kind] = f
+        return f
+
+    return decorator
+
+
+def enqueue(kind, owner=None, max_attempts=3, **payload):
+    if kind not in handlers:
+        raise ValueError(f"No handler registered for job kind {kind}")
+    job = Job(kind=kind, owner=owner, max_attempts=max_attempts, payload=payload)
+    job.save()
+    if settings.COMSOL_JOBS_EAGER:
+        transaction.on_commit(run_pending)
+    return job
+
+
+def requeue_stale():
+    """
+    Queues jobs again whose worker has not finished them in time, presumably because
+    it was killed.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.COMSOL_JOBS_STALE_AFTER)
+    return Job.objects.filter(status=Job.Status.RUNNING, locked_at__lt=cutoff).update(
+        status=Job.Status.QUEUED, locked_at=None
+    )
+
+
+def claim():
+    """
+    Marks the next due job as running and returns it, or None if there is none.
+    """
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.QUEUED, run_after__lte=timezone.now())
+            .order_by("run_after", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.Status.RUNNING
+        job.attempts += 1
+        job.locked_at = timezone.now()
+        job.save(update_fields=["status", "attempts", "locked_at"])
+    return job
+
+
+def run(job):
+    try:
+        handlers[job.kind](**job.payload)
+    except Exception:
+        logger.exception(f"Job {job.id} ({job.kind}) failed, attempt {job.attempts}")
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.Status.QUEUED
+            job.run_after = timezone.now() + timedelta(
+                seconds=settings.COMSOL_JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Job.Status.FAILED
+            job.time_finished = timezone.now()
+    else:
+        job.status = Job.Status.DONE
+        job.error = ""
+        job.time_finished = timezone.now()
+    job.locked_at = None
+    job.save(
+        update_fields=["status", "error", "run_after", "locked_at", "time_finished"]
+    )
+    return job
+
+
+def run_pending():
+    """
+    Runs jobs until none is due anymore and returns how many were run.
+    """
+    count = 0
+    while (job := claim()) is not None:
+        run(job)
+        count += 1
+    return count
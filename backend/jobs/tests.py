@@ -0,0 +1,109 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job
+from testing.tests import ComsolTest
+
+calls = []
+
+
+@queue.handler("test_job")
+def run_test_job(value, fail_times=0):
+    calls.append(value)
+    if calls.count(value) <= fail_times:
+        raise RuntimeError("failed")
+
+
+@override_settings(COMSOL_JOBS_RETRY_DELAY=0)
+class TestQueue(ComsolTest):
+    def mySetUp(self):
+        calls.clear()
+
+    def test_run(self):
+        job = queue.enqueue("test_job", value=1)
+        queue.enqueue("test_job", value=2)
+        self.assertEqual(queue.run_pending(), 2)
+        self.assertEqual(calls, [1, 2])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.time_finished)
+        self.assertEqual(queue.run_pending(), 0)
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            queue.enqueue("does_not_exist")
+
+    def test_retry(self):
+        job = queue.enqueue("test_job", value=1, fail_times=1)
+        with self.assertLogs("jobs.queue", level="ERROR"):
+            self.assertEqual(queue.run_pending(), 2)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.error, "")
+
+    def test_failed(self):
+        job = queue.enqueue("test_job", max_attempts=2, value=1, fail_times=5)
+        with self.assertLogs("jobs.queue", level="ERROR") as logs:
+            queue.run_pending()
+        self.assertEqual(len(logs.records), 2)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("RuntimeError", job.error)
+
+    def test_backoff(self):
+        job = queue.enqueue("test_job", value=1, fail_times=1)
+        with (
+            override_settings(COMSOL_JOBS_RETRY_DELAY=60),
+            self.assertLogs("jobs.queue", level="ERROR"),
+        ):
+            self.assertEqual(queue.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+
+    def test_requeue_stale(self):
+        job = queue.enqueue("test_job", value=1)
+        self.assertEqual(queue.claim(), job)
+        self.assertIsNone(queue.claim())
+        self.assertEqual(queue.requeue_stale(), 0)
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timedelta(days=1)
+        )
+        self.assertEqual(queue.requeue_stale(), 1)
+        self.assertEqual(queue.run_pending(), 1)
+
+    def test_eager(self):
+        with (
+            override_settings(COMSOL_JOBS_EAGER=True),
+            mock.patch.object(queue, "run_pending") as run_pending,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            queue.enqueue("test_job", value=1)
+        run_pending.assert_called_once()
+
+
+class TestStatus(ComsolTest):
+    def test_status(self):
+        job = queue.enqueue("test_job", owner=self.get_my_user(), value=1)
+        res = self.get(f"/api/job/{job.id}/")["value"]
+        self.assertEqual(res["status"], "queued")
+        self.assertEqual(res["kind"], "test_job")
+        self.assertIsNone(res["time_finished"])
+
+        queue.run_pending()
+        res = self.get(f"/api/job/{job.id}/")["value"]
+        self.assertEqual(res["status"], "done")
+        self.assertIsNotNone(res["time_finished"])
+
+    def test_not_owner(self):
+        job = queue.enqueue("test_job", owner=self.get_my_user(), value=1)
+        self.user = self.nonAdminUsers[0]
+        self.get(f"/api/job/{job.id}/", status_code=403)
+        self.get("/api/job/12345/", status_code=404)
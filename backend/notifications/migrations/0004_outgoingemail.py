@@ -0,0 +1,25 @@
+# Generated by Django 5.2.16 on 2026-10-18 14:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_notification_feedback'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.TextField()),
+                ('body', models.TextField()),
+                ('from_email', models.CharField(max_length=256)),
+                ('to', models.CharField(max_length=256)),
+                ('time_created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
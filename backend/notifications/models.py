@@ -42,3 +42,16 @@ class NotificationSetting(models.Model):
     type = models.IntegerField()
     enabled = models.BooleanField(default=True)
     email_enabled = models.BooleanField(default=True)
+
+
+class OutgoingEmail(models.Model):
+    """
+    An email notification waiting to be sent by the `send_notification_emails` job,
+    see tasks.py. It is deleted once it has been sent.
+    """
+
+    subject = models.TextField()
+    body = models.TextField()
+    from_email = models.CharField(max_length=256)
+    to = models.CharField(max_length=256)
+    time_created = models.DateTimeField(default=timezone.now)
@@ -2,25 +2,14 @@ from typing import Literal, overload
 
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.mail import send_mail
 
 from answers.models import Answer
 from answers.models import Comment as AnswerComment
 from documents.models import Comment as DocumentComment
 from documents.models import Document
-from notifications.models import Notification, NotificationSetting, NotificationType
-
-
-def is_notification_enabled(receiver, notification_type):
-    return NotificationSetting.objects.filter(
-        user=receiver, type=notification_type.value, enabled=True
-    ).exists()
-
-
-def is_notification_email_enabled(receiver: User, notification_type: NotificationType):
-    return NotificationSetting.objects.filter(
-        user=receiver, type=notification_type.value, email_enabled=True
-    ).exists()
+from jobs import queue
+from notifications.models import Notification, NotificationType, OutgoingEmail
+from notifications.preferences import get_preferences, get_user_preferences
 
 
 @overload
@@ -59,85 +48,109 @@ def send_notification(
     message: str,
     associated_data: Answer | Document,
 ):
-    if sender == receiver:
-        return
-    if is_notification_enabled(receiver, type_):
-        send_inapp_notification(
-            sender, receiver, type_, title, message, associated_data
-        )
-    if is_notification_email_enabled(receiver, type_):
-        send_email_notification(
-            sender, receiver, type_, title, message, associated_data
-        )
+    send_notifications(sender, [receiver], type_, title, message, associated_data)
 
 
-def send_inapp_notification(sender, receiver, type_, title, message, data):
-    # In the case a user has a comment on their own answer, this prevents them from getting
-    # 2 notifications if they have both notification options on.
-    # "new comment to answer" will be shown instead of "new comment to comment"
-    # the only time we want to prevent this is when the receiver is the answer author AND
-    # the receiver has both settings turned on
-    if (
-        isinstance(data, Answer)
-        and data.author == receiver
-        and type_ == NotificationType.NEW_COMMENT_TO_COMMENT
-        and is_notification_enabled(receiver, NotificationType.NEW_COMMENT_TO_ANSWER)
-    ):
+def send_notifications(
+    sender: User,
+    receivers: list[User],
+    type_: NotificationType,
+    title: str,
+    message: str,
+    data: Answer | Document,
+):
+    """
+    Notifies every receiver except the sender, each at most once. The preferences of
+    all receivers are resolved at once, the in-app notifications are inserted at once
+    and the emails are queued to be sent in the background.
+    """
+    receivers = {receiver.id: receiver for receiver in receivers if receiver != sender}
+    # The author of the data may have been notified before by the same request, e.g.
+    # by new_comment_to_answer before new_comment_to_comment. Their object already
+    # carries their preferences, which would have to be read again for another one.
+    if type(data).author.is_cached(data) and data.author_id in receivers:
+        receivers[data.author_id] = data.author
+    receivers = list(receivers.values())
+    if not receivers:
         return
-
-    notification = Notification(
-        sender=sender,
-        receiver=receiver,
-        type=type_.value,
-        title=title,
-        text=message,
-        answer=data if isinstance(data, Answer) else None,
-        document=data if isinstance(data, Document) else None,
+    # In the case a user has a comment on their own answer, this prevents them from
+    # getting 2 notifications if they have both notification options on.
+    # "new comment to answer" will be shown instead of "new comment to comment"
+    # the only time we want to prevent this is when the receiver is the answer author
+    # AND the receiver has both settings turned on
+    deduplicate = (
+        isinstance(data, Answer) and type_ == NotificationType.NEW_COMMENT_TO_COMMENT
     )
-    notification.save()
-
-
-def send_email_notification(
+    preferences = get_preferences(receivers)
+
+    notifications = []
+    email_receivers = []
+    for receiver in receivers:
+        receiver_preferences = preferences[receiver.id]
+        in_app = receiver_preferences.enabled(type_)
+        email = receiver_preferences.email_enabled(type_)
+        if deduplicate and data.author_id == receiver.id:
+            answer = NotificationType.NEW_COMMENT_TO_ANSWER
+            in_app = in_app and not receiver_preferences.enabled(answer)
+            email = email and not receiver_preferences.email_enabled(answer)
+        if in_app:
+            notifications.append(
+                Notification(
+                    sender=sender,
+                    receiver=receiver,
+                    type=type_.value,
+                    title=title,
+                    text=message,
+                    answer=data if isinstance(data, Answer) else None,
+                    document=data if isinstance(data, Document) else None,
+                )
+            )
+        if email:
+            email_receivers.append(receiver)
+
+    Notification.objects.bulk_create(notifications)
+    queue_email_notifications(sender, email_receivers, title, message, data)
+
+
+def queue_email_notifications(
     sender: User,
-    receiver: User,
-    type_: NotificationType,
+    receivers: list[User],
     title: str,
     message: str,
     data: Document | Answer,
 ):
-    """If the user has email notifications enabled, send an email notification.
-
-    Parameters
-    ----------
-    notification : Notification
     """
-    if (
-        isinstance(data, Answer)
-        and data.author == receiver
-        and type_ == NotificationType.NEW_COMMENT_TO_COMMENT
-        and is_notification_email_enabled(
-            receiver, NotificationType.NEW_COMMENT_TO_ANSWER
-        )
-    ):
+    Adds an email for each receiver to the outbox and queues jobs sending them in
+    batches of `COMSOL_NOTIFICATION_EMAIL_BATCH_SIZE`, see tasks.py.
+    """
+    if not receivers:
         return
-
-    send_mail(
-        f"BetterInformatics: {title} / {data.display_name if isinstance(data, Document) else data.answer_section.exam.displayname}",
-        (
-            f"Hello {receiver.profile.display_username}!\n"
-            f"{message}\n\n"
-            f"View it in context here: {get_absolute_notification_url(data)}"
-        ),
-        f'"{sender.username} (via BetterInformatics)" <{settings.VERIF_CODE_FROM_EMAIL_ADDRESS}>',
-        [receiver.email],
-        fail_silently=False,
+    subject = f"BetterInformatics: {title} / {data.display_name if isinstance(data, Document) else data.answer_section.exam.displayname}"
+    url = get_absolute_notification_url(data)
+    from_email = f'"{sender.username} (via BetterInformatics)" <{settings.VERIF_CODE_FROM_EMAIL_ADDRESS}>'
+    emails = OutgoingEmail.objects.bulk_create(
+        OutgoingEmail(
+            subject=subject,
+            body=(
+                f"Hello {receiver.profile.display_username}!\n"
+                f"{message}\n\n"
+                f"View it in context here: {url}"
+            ),
+            from_email=from_email,
+            to=receiver.email,
+        )
+        for receiver in receivers
     )
+    ids = [email.id for email in emails]
+    batch_size = settings.COMSOL_NOTIFICATION_EMAIL_BATCH_SIZE
+    for i in range(0, len(ids), batch_size):
+        queue.enqueue("send_notification_emails", ids=ids[i : i + batch_size])
 
 
 def send_feedback_notification(sender, receiver, type_, title, message, feedback):
     if sender == receiver:
         return
-    if not is_notification_enabled(receiver, type_):
+    if not get_user_preferences(receiver).enabled(type_):
         return
     notification = Notification(
         sender=sender,
@@ -179,31 +192,33 @@ def new_comment_to_answer(answer: Answer, new_comment: AnswerComment):
     )
 
 
-def _new_comment_to_comment(old_comment: AnswerComment, new_comment: AnswerComment):
-    send_notification(
+def new_comment_to_comment(answer: Answer, new_comment: AnswerComment):
+    send_notifications(
         new_comment.author,
-        old_comment.author,
+        [
+            comment.author
+            for comment in answer.comments.select_related("author__profile")
+            if comment != new_comment
+        ],
         NotificationType.NEW_COMMENT_TO_COMMENT,
         "New comment",
         f"A new comment was added to an answer you commented on.\n\n{new_comment.text}",
-        old_comment.answer,
+        answer,
     )
 
 
-def new_comment_to_comment(answer: Answer, new_comment: AnswerComment):
-    done = set()
-    for comment in answer.comments.all():
-        if comment != new_comment and comment.author not in done:
-            done.add(comment.author)
-            _new_comment_to_comment(comment, new_comment)
-
-
-def _new_answer_to_answer(old_answer: Answer, new_answer: Answer):
-    if old_answer.kind != Answer.Kind.PERSONAL:
-        return
-    send_notification(
+def new_answer_to_answer(new_answer: Answer):
+    send_notifications(
         new_answer.author,
-        old_answer.author,
+        [
+            other_answer.author
+            for other_answer in Answer.objects.filter(
+                answer_section=new_answer.answer_section,
+                kind=Answer.Kind.PERSONAL,
+            )
+            .exclude(pk=new_answer.pk)
+            .select_related("author__profile")
+        ],
         NotificationType.NEW_COMMENT_TO_ANSWER,
         "New answer",
         "A new answer was posted to a question you answered.",
@@ -211,15 +226,6 @@ def _new_answer_to_answer(old_answer: Answer, new_answer: Answer):
     )
 
 
-def new_answer_to_answer(new_answer: Answer):
-    for other_answer in Answer.objects.filter(
-        answer_section=new_answer.answer_section,
-        kind=Answer.Kind.PERSONAL,
-    ):
-        if other_answer != new_answer:
-            _new_answer_to_answer(other_answer, new_answer)
-
-
 def new_comment_to_document(document: Document, new_comment: DocumentComment):
     send_notification(
         new_comment.author,
@@ -0,0 +1,75 @@
+from notifications.models import NotificationSetting, NotificationType
+
+"""
+Resolves which notifications users want. All settings of a user are read at once and
+packed into a bitmask, which is kept on the user object, so that the settings are read
+at most once per user object no matter how many notifications are sent to it. Other
+objects of the same user read them again, so `notification_util.send_notifications`
+reuses the object of the author of an answer or document, who is notified most often.
+"""
+
+# Name of the attribute of User objects the preferences are kept in, like the
+# permission caches of django.contrib.auth
+CACHE_ATTRIBUTE = "_notification_preferences"
+
+
+class NotificationPreferences:
+    """
+    The notification settings of a user, with an in-app and an email bit for every
+    `NotificationType`.
+    """
+
+    __slots__ = ("mask",)
+
+    def __init__(self, mask=0):
+        self.mask = mask
+
+    @staticmethod
+    def bit(type_, email):
+        return 1 << (2 * type_ + email)
+
+    def add(self, type_, enabled, email_enabled):
+        if enabled:
+            self.mask |= self.bit(type_, False)
+        if email_enabled:
+            self.mask |= self.bit(type_, True)
+
+    def enabled(self, type_: NotificationType):
+        return bool(self.mask & self.bit(type_.value, False))
+
+    def email_enabled(self, type_: NotificationType):
+        return bool(self.mask & self.bit(type_.value, True))
+
+
+def get_preferences(users):
+    """
+    Returns a dict from user id to the `NotificationPreferences` of the given users.
+    The users whose preferences are not known yet are loaded with a single query.
+    """
+    missing = [user for user in users if not hasattr(user, CACHE_ATTRIBUTE)]
+    if missing:
+        preferences = {user.id: NotificationPreferences() for user in missing}
+        for (
+            user_id,
+            type_,
+            enabled,
+            email_enabled,
+        ) in NotificationSetting.objects.filter(user__in=list(preferences)).values_list(
+            "user_id", "type", "enabled", "email_enabled"
+        ):
+            preferences[user_id].add(type_, enabled, email_enabled)
+        for user in missing:
+            setattr(user, CACHE_ATTRIBUTE, preferences[user.id])
+    return {user.id: getattr(user, CACHE_ATTRIBUTE) for user in users}
+
+
+def get_user_preferences(user):
+    return get_preferences([user])[user.id]
+
+
+def invalidate(user):
+    """
+    Forgets the preferences kept on the user object, after its settings changed.
+    """
+    if hasattr(user, CACHE_ATTRIBUTE):
+        delattr(user, CACHE_ATTRIBUTE)
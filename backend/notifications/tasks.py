@@ -0,0 +1,25 @@
+from django.core import mail
+
+from jobs import queue
+from notifications.models import OutgoingEmail
+
+
+@queue.handler("send_notification_emails")
+def send_notification_emails(ids):
+    """
+    Sends the outgoing emails with the given ids over a single connection. Each one is
+    deleted as soon as it is sent, so a retry after a failure only sends the rest.
+    """
+    emails = list(OutgoingEmail.objects.filter(id__in=ids).order_by("id"))
+    if not emails:
+        return
+    with mail.get_connection() as connection:
+        for email in emails:
+            mail.EmailMessage(
+                email.subject,
+                email.body,
+                email.from_email,
+                [email.to],
+                connection=connection,
+            ).send()
+            email.delete()
@@ -1,7 +1,20 @@
+from django.contrib.auth.models import User
 from django.core import mail
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
+from answers.models import Answer, Comment
 from documents.models import Document, DocumentType
-from notifications.models import Notification
+from jobs import queue
+from jobs.models import Job
+from notifications import notification_util, preferences
+from notifications.models import (
+    Notification,
+    NotificationSetting,
+    NotificationType,
+    OutgoingEmail,
+)
 from testing.tests import ComsolTest, ComsolTestExamData
 
 
@@ -47,6 +60,41 @@ class TestNotificationSettings(ComsolTest):
         self.assertEqual(len(res), len(types))
 
 
+class TestNotificationPreferences(ComsolTest):
+    def test_preferences(self):
+        user = self.get_my_user()
+        NotificationSetting.objects.filter(user=user).delete()
+        NotificationSetting.objects.create(
+            user=user,
+            type=NotificationType.NEW_COMMENT_TO_ANSWER.value,
+            enabled=True,
+            email_enabled=False,
+        )
+        NotificationSetting.objects.create(
+            user=user,
+            type=NotificationType.DOCUMENT_TRANSFER.value,
+            enabled=False,
+            email_enabled=True,
+        )
+        with self.assertNumQueries(1):
+            for _ in range(2):
+                res = preferences.get_user_preferences(user)
+        self.assertTrue(res.enabled(NotificationType.NEW_COMMENT_TO_ANSWER))
+        self.assertFalse(res.email_enabled(NotificationType.NEW_COMMENT_TO_ANSWER))
+        self.assertFalse(res.enabled(NotificationType.DOCUMENT_TRANSFER))
+        self.assertTrue(res.email_enabled(NotificationType.DOCUMENT_TRANSFER))
+        self.assertFalse(res.enabled(NotificationType.NEW_COMMENT_TO_COMMENT))
+        self.assertFalse(res.email_enabled(NotificationType.NEW_COMMENT_TO_COMMENT))
+
+    def test_preferences_of_many(self):
+        users = list(User.objects.all())
+        with self.assertNumQueries(1):
+            res = preferences.get_preferences(users)
+        self.assertEqual(set(res), {user.id for user in users})
+        with self.assertNumQueries(0):
+            preferences.get_preferences(users)
+
+
 class TestNotifications(ComsolTestExamData):
     def test_notification_lifecycle(self):
         res = self.get("/api/notification/unread/")["value"]
@@ -124,6 +172,9 @@ class TestNotifications(ComsolTestExamData):
         self.assertEqual(len(res), 1)
         self.assertEqual(res[0]["type"], 4)  # New comment on Document
 
+        # Emails are sent in the background
+        self.assertEqual(len(mail.outbox), 0)
+        queue.run_pending()
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(
             mail.outbox[0].to, [f"{self.users[0]['username']}@sms.ed.ac.uk"]
@@ -184,6 +235,7 @@ class TestNotifications(ComsolTestExamData):
         self.assertEqual(len(res), 1)
         self.assertEqual(res[0]["type"], 2)
 
+        queue.run_pending()
         # Check that two emails were sent:
         # - One for user 0 (comment on answer)
         # - One for user 3 (comment on comment)
@@ -196,3 +248,65 @@ class TestNotifications(ComsolTestExamData):
             [f"{self.users[3]['username']}@sms.ed.ac.uk"],
             list(map(lambda x: x.to, mail.outbox)),
         )
+
+    def test_author_preferences_read_once(self):
+        # Only the author of the answer commented on it so far
+        answer = Answer.objects.get(pk=self.answers[0].pk)
+        answer.comments.exclude(author=answer.author).delete()
+        comment = Comment.objects.create(
+            answer=answer,
+            author=User.objects.get(username=self.users[1]["username"]),
+            text="Comment",
+        )
+        with CaptureQueriesContext(connection) as queries:
+            notification_util.new_comment_to_answer(answer, comment)
+            notification_util.new_comment_to_comment(answer, comment)
+        self.assertEqual(
+            len(
+                [q for q in queries if "notifications_notificationsetting" in q["sql"]]
+            ),
+            1,
+        )
+
+    def enable_all(self, user, email):
+        self.login_as(user)
+        for val in range(1, 6):
+            self.post(
+                "/api/notification/setenabled/",
+                {
+                    "type": val,
+                    "enabled": "true",
+                    "email_enabled": "true" if email else "false",
+                },
+            )
+
+    @override_settings(COMSOL_NOTIFICATION_EMAIL_BATCH_SIZE=2)
+    def test_new_answer_fan_out(self):
+        # Every user but user 0 answered the section of self.answers[0] and gets
+        # notified about a new answer, users 1 to 3 by email
+        for user in self.users[1:]:
+            self.enable_all(user, email=True)
+        self.answers[0].delete()
+
+        self.login_as(self.users[0])
+        section = self.answers[0].answer_section
+        self.post(
+            f"/api/exam/setanswer/{section.id}/",
+            {"text": "New answer", "kind": "personal"},
+        )
+
+        notifications = Notification.objects.filter(type=1)
+        self.assertEqual(
+            sorted(notification.receiver.username for notification in notifications),
+            sorted(user["username"] for user in self.users[1:]),
+        )
+        self.assertEqual(OutgoingEmail.objects.count(), 3)
+        self.assertEqual(Job.objects.filter(kind="send_notification_emails").count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(queue.run_pending(), 2)
+        self.assertEqual(
+            sorted(email.to[0] for email in mail.outbox),
+            sorted(f"{user['username']}@sms.ed.ac.uk" for user in self.users[1:]),
+        )
+        self.assertEqual(OutgoingEmail.objects.count(), 0)
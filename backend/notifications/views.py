@@ -1,6 +1,7 @@
 from django.shortcuts import get_object_or_404
 
 from ediauth import auth_check
+from notifications import preferences
 from notifications.models import Notification, NotificationSetting, NotificationType
 from notifications.notification_util import get_relative_notification_url
 from util import response
@@ -36,6 +37,7 @@ def setenabled(request):
     if "email_enabled" in request.POST:
         setting.email_enabled = request.POST["email_enabled"] != "false"
     setting.save()
+    preferences.invalidate(request.user)
     return response.success()
 
 
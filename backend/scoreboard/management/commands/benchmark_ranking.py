@@ -0,0 +1,185 @@
+import array
+import bisect
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from scoreboard.ranking import ScoreHistogram
+
+
+def fake_scores(rng, users):
+    """
+    Most users never get a vote, the scores of the others have a long tail.
+    """
+    return [
+        int(rng.paretovariate(1.2)) - 1 if rng.random() < 0.3 else 0
+        for _ in range(users)
+    ]
+
+
+class LegacyRanking:
+    """
+    The ranking list every worker used to keep: all usernames sorted by score and a
+    linear search for the rank.
+    """
+
+    def __init__(self, scores):
+        self.ranking = [
+            user for user, _ in sorted(enumerate(scores), key=lambda x: -x[1])
+        ]
+        self.scores = scores
+
+    def rank(self, user):
+        # Like the old `get_user_scores`, which ranked ties by their list position
+        if user not in self.ranking:
+            return -1
+        return self.ranking.index(user) + 1
+
+
+class SortedArrayRanking:
+    """
+    All scores in a compact sorted array and a binary search for the rank.
+    """
+
+    def __init__(self, scores):
+        self.negated = array.array("i", sorted(-score for score in scores))
+        self.scores = scores
+
+    def rank(self, user):
+        return bisect.bisect_left(self.negated, -self.scores[user]) + 1
+
+
+class HistogramRanking:
+    """
+    The distinct scores with the number of users above them, see scoreboard.ranking.
+    """
+
+    def __init__(self, scores):
+        counts = {}
+        for score in scores:
+            counts[score] = counts.get(score, 0) + 1
+        self.histogram = ScoreHistogram(sorted(counts.items(), reverse=True))
+        self.scores = scores
+
+    def rank(self, user):
+        return self.histogram.rank(self.scores[user])
+
+
+WINDOW_QUERY = """
+SELECT rank FROM (
+    SELECT user_id, rank() OVER (ORDER BY score DESC) AS rank
+    FROM benchmark_userscore
+) ranks WHERE user_id = %(user)s
+"""
+COUNT_QUERY = """
+SELECT count(*) + 1 FROM benchmark_userscore WHERE score > %(score)s
+"""
+TOP_QUERY = """
+SELECT user_id, score FROM benchmark_userscore ORDER BY score DESC LIMIT %s
+"""
+
+
+class QueryRanking:
+    """
+    Runs `query` against a temporary table shaped like scoreboard_userscore.
+    """
+
+    def __init__(self, cursor, query, scores):
+        self.cursor = cursor
+        self.query = query
+        self.scores = scores
+
+    def rank(self, user):
+        self.cursor.execute(self.query, {"user": user, "score": self.scores[user]})
+        return self.cursor.fetchone()[0]
+
+
+def create_table(cursor, scores):
+    cursor.execute(
+        """
+        CREATE TEMPORARY TABLE benchmark_userscore (
+            user_id integer PRIMARY KEY,
+            score integer NOT NULL
+        )
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO benchmark_userscore
+        SELECT * FROM unnest(%s::integer[], %s::integer[])
+        """,
+        [list(range(len(scores))), scores],
+    )
+    cursor.execute("CREATE INDEX ON benchmark_userscore (score)")
+    # Sets the visibility map, so that counts are index only scans
+    cursor.execute("VACUUM ANALYZE benchmark_userscore")
+
+
+def measure(fun, items):
+    """
+    Returns the average time `fun` took per item and its results.
+    """
+    start = time.perf_counter()
+    results = [fun(item) for item in items]
+    return (time.perf_counter() - start) / len(items), results
+
+
+class Command(BaseCommand):
+    help = "Compares ways to look up the rank of a user and the top users"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+        )
+        parser.add_argument("--lookups", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        for users in options["users"]:
+            scores = fake_scores(rng, users)
+            lookups = [rng.randrange(users) for _ in range(options["lookups"])]
+            self.stdout.write(f"{users} users, {len(set(scores))} distinct scores")
+            with connection.cursor() as cursor:
+                create_table(cursor, scores)
+                try:
+                    self.compare(cursor, scores, lookups)
+                finally:
+                    cursor.execute("DROP TABLE benchmark_userscore")
+
+    def compare(self, cursor, scores, lookups):
+        approaches = [
+            ("legacy list", LegacyRanking),
+            ("sorted array", SortedArrayRanking),
+            ("histogram", HistogramRanking),
+            ("window query", lambda s: QueryRanking(cursor, WINDOW_QUERY, s)),
+            ("indexed count", lambda s: QueryRanking(cursor, COUNT_QUERY, s)),
+        ]
+        expected = None
+        for name, approach in approaches:
+            build, (ranking,) = measure(approach, [scores])
+            lookup, ranks = measure(ranking.rank, lookups)
+            # The legacy list breaks ties by position, so its ranks differ
+            if name != "legacy list":
+                if expected is None:
+                    expected = ranks
+                elif ranks != expected:
+                    raise AssertionError(f"{name} disagrees on ranks")
+            self.stdout.write(
+                f"  rank {name:>13}: build {build * 1e3:9.1f} ms, "
+                f"lookup {lookup * 1e6:10.1f} us"
+            )
+
+        def legacy_top(limit):
+            return ranking_list[:limit]
+
+        def indexed_top(limit):
+            cursor.execute(TOP_QUERY, [limit])
+            return cursor.fetchall()
+
+        ranking_list = LegacyRanking(scores).ranking
+        for name, top in (("legacy list", legacy_top), ("index scan", indexed_top)):
+            lookup, _ = measure(top, [10] * len(lookups))
+            self.stdout.write(f"  top 10 {name:>11}: lookup {lookup * 1e6:10.1f} us")
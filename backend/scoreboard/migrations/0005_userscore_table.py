@@ -0,0 +1,288 @@
+# Manually written on 2026/10/18
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("scoreboard", "0004_add_answer_scores"),
+        ("answers", "0027_answersection_notify"),
+        ("documents", "0019_20260801_merge_upstream_normalise_documentfile_order"),
+    ]
+
+    # Replaces the view scoreboard_userscore, which aggregated over all answers,
+    # votes, documents, cuts and comments for every user on every read, with a table
+    # of the same shape. Triggers add the difference every insert, delete or update
+    # makes to the counters of the affected users. Votes on answers are not counted
+    # on the vote tables but on the upvote_count and downvote_count columns of
+    # answers_answer (see answers/migrations/0026_vote_counts.py), so that an answer
+    # changing its kind or author moves its votes along. `score` is indexed for
+    # rankings.
+    sql = """
+    DROP VIEW scoreboard_userscore;
+
+    CREATE TABLE scoreboard_userscore (
+        id bigint PRIMARY KEY,
+        user_id integer NOT NULL UNIQUE,
+        upvotes integer NOT NULL DEFAULT 0,
+        downvotes integer NOT NULL DEFAULT 0,
+        document_likes integer NOT NULL DEFAULT 0,
+        answers integer NOT NULL DEFAULT 0,
+        official integer NOT NULL DEFAULT 0,
+        cuts integer NOT NULL DEFAULT 0,
+        documents integer NOT NULL DEFAULT 0,
+        comments integer NOT NULL DEFAULT 0,
+        score integer GENERATED ALWAYS AS (document_likes + upvotes - downvotes) STORED
+    );
+    CREATE INDEX scoreboard_userscore_score ON scoreboard_userscore (score);
+
+    CREATE FUNCTION scoreboard_add(author integer, counter text, delta integer)
+    RETURNS void AS $$
+    BEGIN
+        IF author IS NULL OR delta = 0 THEN
+            RETURN;
+        END IF;
+        EXECUTE format(
+            'INSERT INTO scoreboard_userscore (id, user_id, %I) VALUES ($1, $1, $2) '
+            'ON CONFLICT (user_id) DO UPDATE SET %I = scoreboard_userscore.%I + $2',
+            counter, counter, counter
+        ) USING author, delta;
+    END
+    $$ LANGUAGE plpgsql;
+
+    -- Counts the row itself in the counter given as the trigger argument
+    CREATE FUNCTION scoreboard_count_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM scoreboard_add(OLD.author_id, TG_ARGV[0], -1);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM scoreboard_add(NEW.author_id, TG_ARGV[0], 1);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER scoreboard_cuts_trigger
+    AFTER INSERT OR DELETE ON answers_answersection
+    FOR EACH ROW EXECUTE PROCEDURE scoreboard_count_trigger('cuts');
+    CREATE TRIGGER scoreboard_cuts_update_trigger
+    AFTER UPDATE OF author_id ON answers_answersection
+    FOR EACH ROW WHEN (OLD.author_id IS DISTINCT FROM NEW.author_id)
+    EXECUTE PROCEDURE scoreboard_count_trigger('cuts');
+
+    CREATE TRIGGER scoreboard_comments_trigger
+    AFTER INSERT OR DELETE ON answers_comment
+    FOR EACH ROW EXECUTE PROCEDURE scoreboard_count_trigger('comments');
+    CREATE TRIGGER scoreboard_comments_update_trigger
+    AFTER UPDATE OF author_id ON answers_comment
+    FOR EACH ROW WHEN (OLD.author_id IS DISTINCT FROM NEW.author_id)
+    EXECUTE PROCEDURE scoreboard_count_trigger('comments');
+
+    CREATE TRIGGER scoreboard_documents_trigger
+    AFTER INSERT OR DELETE ON documents_document
+    FOR EACH ROW EXECUTE PROCEDURE scoreboard_count_trigger('documents');
+    CREATE TRIGGER scoreboard_documents_update_trigger
+    AFTER UPDATE OF author_id ON documents_document
+    FOR EACH ROW WHEN (OLD.author_id IS DISTINCT FROM NEW.author_id)
+    EXECUTE PROCEDURE scoreboard_count_trigger('documents');
+
+    -- Only personal answers earn votes and count as answers
+    CREATE FUNCTION scoreboard_answer_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            IF OLD.kind = 'personal' THEN
+                PERFORM scoreboard_add(OLD.author_id, 'answers', -1);
+                PERFORM scoreboard_add(OLD.author_id, 'upvotes', -OLD.upvote_count);
+                PERFORM scoreboard_add(OLD.author_id, 'downvotes', -OLD.downvote_count);
+            ELSIF OLD.kind = 'official' THEN
+                PERFORM scoreboard_add(OLD.author_id, 'official', -1);
+            END IF;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            IF NEW.kind = 'personal' THEN
+                PERFORM scoreboard_add(NEW.author_id, 'answers', 1);
+                PERFORM scoreboard_add(NEW.author_id, 'upvotes', NEW.upvote_count);
+                PERFORM scoreboard_add(NEW.author_id, 'downvotes', NEW.downvote_count);
+            ELSIF NEW.kind = 'official' THEN
+                PERFORM scoreboard_add(NEW.author_id, 'official', 1);
+            END IF;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER scoreboard_answer_trigger
+    AFTER INSERT OR DELETE ON answers_answer
+    FOR EACH ROW EXECUTE PROCEDURE scoreboard_answer_trigger();
+    CREATE TRIGGER scoreboard_answer_update_trigger
+    AFTER UPDATE OF author_id, kind, upvote_count, downvote_count ON answers_answer
+    FOR EACH ROW WHEN (
+        OLD.author_id IS DISTINCT FROM NEW.author_id
+        OR OLD.kind IS DISTINCT FROM NEW.kind
+        OR OLD.upvote_count IS DISTINCT FROM NEW.upvote_count
+        OR OLD.downvote_count IS DISTINCT FROM NEW.downvote_count
+    )
+    EXECUTE PROCEDURE scoreboard_answer_trigger();
+
+    CREATE FUNCTION scoreboard_document_like_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM scoreboard_add(author_id, 'document_likes', 1)
+            FROM documents_document WHERE id = NEW.document_id;
+        ELSE
+            PERFORM scoreboard_add(author_id, 'document_likes', -1)
+            FROM documents_document WHERE id = OLD.document_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER scoreboard_document_like_trigger
+    AFTER INSERT OR DELETE ON documents_document_likes
+    FOR EACH ROW EXECUTE PROCEDURE scoreboard_document_like_trigger();
+
+    -- Documents have no counter of their likes, so they are counted when the
+    -- author changes
+    CREATE FUNCTION scoreboard_document_author_trigger() RETURNS trigger AS $$
+    DECLARE
+        likes integer;
+    BEGIN
+        SELECT COUNT(*) INTO likes
+        FROM documents_document_likes WHERE document_id = NEW.id;
+        PERFORM scoreboard_add(OLD.author_id, 'document_likes', -likes);
+        PERFORM scoreboard_add(NEW.author_id, 'document_likes', likes);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER scoreboard_document_author_trigger
+    AFTER UPDATE OF author_id ON documents_document
+    FOR EACH ROW WHEN (OLD.author_id IS DISTINCT FROM NEW.author_id)
+    EXECUTE PROCEDURE scoreboard_document_author_trigger();
+
+    CREATE FUNCTION scoreboard_user_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO scoreboard_userscore (id, user_id) VALUES (NEW.id, NEW.id)
+            ON CONFLICT (user_id) DO NOTHING;
+        ELSE
+            DELETE FROM scoreboard_userscore WHERE user_id = OLD.id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER scoreboard_user_trigger
+    AFTER INSERT OR DELETE ON auth_user
+    FOR EACH ROW EXECUTE PROCEDURE scoreboard_user_trigger();
+
+    INSERT INTO scoreboard_userscore (
+        id, user_id, upvotes, downvotes, document_likes, answers, official, cuts,
+        documents, comments
+    )
+    SELECT
+        au.id,
+        au.id,
+        COALESCE((
+            SELECT SUM(aa.upvote_count) FROM answers_answer aa
+            WHERE aa.author_id = au.id AND aa.kind = 'personal'
+        ), 0),
+        COALESCE((
+            SELECT SUM(aa.downvote_count) FROM answers_answer aa
+            WHERE aa.author_id = au.id AND aa.kind = 'personal'
+        ), 0),
+        (
+            SELECT COUNT(*) FROM documents_document_likes ddl
+            INNER JOIN documents_document dd ON dd.id = ddl.document_id
+            WHERE dd.author_id = au.id
+        ),
+        (
+            SELECT COUNT(*) FROM answers_answer aa
+            WHERE aa.author_id = au.id AND aa.kind = 'personal'
+        ),
+        (
+            SELECT COUNT(*) FROM answers_answer aa
+            WHERE aa.author_id = au.id AND aa.kind = 'official'
+        ),
+        (SELECT COUNT(*) FROM answers_answersection aas WHERE aas.author_id = au.id),
+        (SELECT COUNT(*) FROM documents_document dd WHERE dd.author_id = au.id),
+        (SELECT COUNT(*) FROM answers_comment ac WHERE ac.author_id = au.id)
+    FROM auth_user au;
+    """
+
+    reverse_sql = """
+    DROP TRIGGER IF EXISTS scoreboard_user_trigger ON auth_user;
+    DROP FUNCTION IF EXISTS scoreboard_user_trigger();
+    DROP TRIGGER IF EXISTS scoreboard_document_author_trigger ON documents_document;
+    DROP FUNCTION IF EXISTS scoreboard_document_author_trigger();
+    DROP TRIGGER IF EXISTS scoreboard_document_like_trigger ON documents_document_likes;
+    DROP FUNCTION IF EXISTS scoreboard_document_like_trigger();
+    DROP TRIGGER IF EXISTS scoreboard_answer_update_trigger ON answers_answer;
+    DROP TRIGGER IF EXISTS scoreboard_answer_trigger ON answers_answer;
+    DROP FUNCTION IF EXISTS scoreboard_answer_trigger();
+    DROP TRIGGER IF EXISTS scoreboard_documents_update_trigger ON documents_document;
+    DROP TRIGGER IF EXISTS scoreboard_documents_trigger ON documents_document;
+    DROP TRIGGER IF EXISTS scoreboard_comments_update_trigger ON answers_comment;
+    DROP TRIGGER IF EXISTS scoreboard_comments_trigger ON answers_comment;
+    DROP TRIGGER IF EXISTS scoreboard_cuts_update_trigger ON answers_answersection;
+    DROP TRIGGER IF EXISTS scoreboard_cuts_trigger ON answers_answersection;
+    DROP FUNCTION IF EXISTS scoreboard_count_trigger();
+    DROP FUNCTION IF EXISTS scoreboard_add(integer, text, integer);
+    DROP TABLE scoreboard_userscore;
+
+    CREATE VIEW scoreboard_userscore (id, user_id, upvotes, downvotes, document_likes, answers, official, cuts, documents, comments) AS
+        SELECT au.id as id,
+        au.id AS user_id,
+        COALESCE(auv.count, 0) AS auv_count,
+        COALESCE(adv.count, 0) AS adv_count,
+        COALESCE(dv.count, 0) AS dv_count,
+        COALESCE(aa.count, 0) AS aa_count,
+        COALESCE(ao.count, 0) AS ao_count,
+        COALESCE(aas.count, 0) AS aas_count,
+        COALESCE(dd.count, 0) AS dd_count,
+        COALESCE(ac.count, 0) AS ac_count
+        FROM auth_user au
+        LEFT JOIN (SELECT aa.author_id as id, COUNT(*) as count
+            FROM answers_answer_upvotes aav
+            INNER JOIN answers_answer aa ON (aa.id = aav.answer_id)
+            WHERE aa.kind = 'personal'
+            GROUP by aa.author_id
+        ) auv ON (auv.id = au.id)
+        LEFT JOIN (SELECT aa.author_id as id, COUNT(*) as count
+            FROM answers_answer_downvotes aav
+            INNER JOIN answers_answer aa ON (aa.id = aav.answer_id)
+            WHERE aa.kind = 'personal'
+            GROUP by aa.author_id
+        ) adv ON (adv.id = au.id)
+        LEFT JOIN (SELECT dd.author_id as id, COUNT(*) as count
+            FROM documents_document_likes ddl
+            INNER JOIN documents_document dd ON(ddl.document_id = dd.id)
+            GROUP BY dd.author_id
+        ) dv ON (dv.id = au.id)
+        LEFT JOIN (SELECT aa.author_id as id, COUNT(*) as count
+            FROM answers_answer aa
+            WHERE aa.kind = 'personal'
+            GROUP BY aa.author_id
+        ) aa ON (aa.id = au.id)
+        LEFT JOIN (SELECT aa.author_id as id, COUNT(*) as count
+            FROM answers_answer aa
+            WHERE aa.kind = 'official'
+            GROUP BY aa.author_id
+        ) ao ON (ao.id = au.id)
+        LEFT JOIN (SELECT aas.author_id as id, COUNT(*) as count
+            FROM answers_answersection aas
+            GROUP BY aas.author_id
+        ) aas ON (aas.id = au.id)
+        LEFT JOIN (SELECT dd.author_id as id, COUNT(*) as count
+            FROM documents_document dd
+            GROUP BY dd.author_id
+        ) dd ON (dd.id = au.id)
+        LEFT JOIN (SELECT ac.author_id as id, COUNT(*) as count
+            FROM answers_comment ac
+            GROUP BY ac.author_id
+        ) ac ON (ac.id = au.id)
+        ORDER BY auv_count desc;
+    """
+
+    operations = [migrations.RunSQL(sql, reverse_sql)]
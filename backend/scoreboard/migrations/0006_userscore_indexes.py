@@ -0,0 +1,30 @@
+# Manually written on 2026/10/18
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("scoreboard", "0005_userscore_table"),
+    ]
+
+    # The top N users of every score type are read in the order of its column (see
+    # scoreboard/ranking.py), which with an index only touches the first N entries
+    # instead of sorting all users. `score` is already indexed by 0005.
+    sql = """
+    CREATE INDEX scoreboard_userscore_answers ON scoreboard_userscore (answers);
+    CREATE INDEX scoreboard_userscore_comments ON scoreboard_userscore (comments);
+    CREATE INDEX scoreboard_userscore_documents ON scoreboard_userscore (documents);
+    CREATE INDEX scoreboard_userscore_cuts ON scoreboard_userscore (cuts);
+    CREATE INDEX scoreboard_userscore_official ON scoreboard_userscore (official);
+    """
+
+    reverse_sql = """
+    DROP INDEX scoreboard_userscore_answers;
+    DROP INDEX scoreboard_userscore_comments;
+    DROP INDEX scoreboard_userscore_documents;
+    DROP INDEX scoreboard_userscore_cuts;
+    DROP INDEX scoreboard_userscore_official;
+    """
+
+    operations = [migrations.RunSQL(sql, reverse_sql)]
@@ -1,6 +1,9 @@
 from django.db import models
 
 
+# A table maintained by triggers on answers, votes, documents, cuts and comments, see
+# migration 0005_userscore_table. The score columns are indexed for rankings, see
+# ranking.py.
 class UserScore(models.Model):
     user = models.OneToOneField(
         "auth.User", related_name="scores", on_delete=models.DO_NOTHING
@@ -13,6 +16,8 @@ class UserScore(models.Model):
     documents = models.IntegerField()
     cuts = models.IntegerField()
     official = models.IntegerField()
+    # document_likes + upvotes - downvotes
+    score = models.IntegerField()
 
     class Meta:
         managed = False
@@ -0,0 +1,99 @@
+import bisect
+
+from django.db.models import Count, F
+
+from scoreboard.models import UserScore
+from util import func_cache
+
+"""
+Answers "which rank does a user have" and "who are the best N users" without loading
+the scores of all users.
+
+Ranks come from a histogram of the scores: the distinct scores in descending order
+and how many users have a higher score than each of them. Most users share a handful
+of scores, so the histogram stays small no matter how many users there are and a
+lookup is a binary search. The histogram is refreshed every `HISTOGRAM_VALIDITY`
+seconds, so a rank does not reflect the score changes of other users made since then.
+All workers share a single copy of it only if `REDIS_URL` configures a shared cache.
+Otherwise every worker builds its own, and consecutive requests may see ranks that
+differ by the changes of the last `HISTOGRAM_VALIDITY` seconds.
+`management/commands/benchmark_ranking.py` compares it against the alternatives.
+
+The top N users of a score type are read with the index on its column of
+scoreboard_userscore (migration 0006_userscore_indexes).
+"""
+
+HISTOGRAM_VALIDITY = 60
+
+# Score types of the API and the columns of scoreboard_userscore they rank by
+SCORE_TYPES = {
+    "score": "score",
+    "score_answers": "answers",
+    "score_comments": "comments",
+    "score_documents": "documents",
+    "score_cuts": "cuts",
+    "score_official": "official",
+}
+
+
+class ScoreHistogram:
+    def __init__(self, counts):
+        """
+        `counts` are (score, number of users) pairs in descending order of score.
+        """
+        # Negated, so that the list is ascending for bisect
+        self.scores = []
+        # Number of users with a higher score than the score at the same index
+        self.higher = []
+        self.total = 0
+        for score, users in counts:
+            self.scores.append(-score)
+            self.higher.append(self.total)
+            self.total += users
+
+    def rank(self, score):
+        """
+        Returns one plus the number of users with a higher score. Users with the
+        same score share their rank.
+        """
+        i = bisect.bisect_left(self.scores, -score)
+        return (self.higher[i] if i < len(self.scores) else self.total) + 1
+
+
+@func_cache.cache(HISTOGRAM_VALIDITY, shared=True)
+def get_score_histogram():
+    return ScoreHistogram(
+        UserScore.objects.values_list("score")
+        .annotate(users=Count("id"))
+        .order_by("-score")
+    )
+
+
+def get_rank(score):
+    return get_score_histogram().rank(score)
+
+
+def get_total_users():
+    return get_score_histogram().total
+
+
+def get_top(scoretype, limit):
+    """
+    Returns the `limit` users with the highest score of the given type, or None if
+    there is no such score type.
+    """
+    column = SCORE_TYPES.get(scoretype)
+    if column is None:
+        return None
+    return list(
+        UserScore.objects.order_by(f"-{column}")[:limit].values(
+            "score",
+            username=F("user__username"),
+            displayName=F("user__profile__display_username"),
+            score_answers=F("answers"),
+            score_comments=F("comments"),
+            score_cuts=F("cuts"),
+            score_official=F("official"),
+            score_documents=F("documents"),
+        )
+    )
@@ -1,3 +1,8 @@
+from django.contrib.auth.models import User
+
+from answers.models import Answer
+from documents.models import Document, DocumentType
+from scoreboard.ranking import ScoreHistogram
 from testing.tests import ComsolTestExamData
 
 
@@ -14,5 +19,94 @@ class TestScoreboard(ComsolTestExamData):
             res = self.get(f"/api/scoreboard/top/{ty}/")["value"]
             self.assertEqual(len(res), min(10, len(self.users)))
 
+    def test_top_unknown(self):
+        self.get("/api/scoreboard/top/score_unknown/", status_code=404)
+
+    def test_histogram(self):
+        histogram = ScoreHistogram([(5, 1), (2, 3), (0, 10), (-1, 1)])
+        self.assertEqual(histogram.total, 15)
+        self.assertEqual(histogram.rank(7), 1)
+        self.assertEqual(histogram.rank(5), 1)
+        self.assertEqual(histogram.rank(3), 2)
+        self.assertEqual(histogram.rank(2), 2)
+        self.assertEqual(histogram.rank(0), 5)
+        self.assertEqual(histogram.rank(-1), 15)
+        self.assertEqual(histogram.rank(-2), 16)
+        self.assertEqual(ScoreHistogram([]).rank(0), 1)
+
+    def get_scores(self, user):
+        res = self.get(f"/api/scoreboard/userinfo/{user['username']}/")["value"]
+        return {
+            key: res[key]
+            for key in [
+                "rank",
+                "score",
+                "score_answers",
+                "score_comments",
+                "score_cuts",
+                "score_official",
+                "score_documents",
+            ]
+        }
+
+    def test_scores(self):
+        first, second, third, fourth = self.users
+        self.assertEqual(
+            self.get_scores(first),
+            {
+                "rank": 1,
+                "score": 0,
+                "score_answers": 4,
+                "score_comments": 16,
+                "score_cuts": 4,
+                "score_official": 0,
+                "score_documents": 0,
+            },
+        )
+
+        # Answers of the first section are by the four users in order
+        second_answer, third_answer = self.answers[1], self.answers[2]
+        self.post(f"/api/exam/setlike/{second_answer.id}/", {"like": 1})
+        self.post(f"/api/exam/setlike/{third_answer.id}/", {"like": -1})
+        self.assertEqual(self.get_scores(second)["rank"], 1)
+        self.assertEqual(self.get_scores(first)["rank"], 2)
+        self.assertEqual(self.get_scores(fourth)["rank"], 2)
+        self.assertEqual(self.get_scores(third)["score"], -1)
+        self.assertEqual(self.get_scores(third)["rank"], 4)
+
+        # Official answers do not earn votes
+        second_answer.kind = Answer.Kind.OFFICIAL
+        second_answer.save()
+        scores = self.get_scores(second)
+        self.assertEqual(scores["score"], 0)
+        self.assertEqual(scores["score_answers"], 3)
+        self.assertEqual(scores["score_official"], 1)
+
+        third_answer.delete()
+        scores = self.get_scores(third)
+        self.assertEqual(scores["score"], 0)
+        self.assertEqual(scores["score_answers"], 3)
+        self.assertEqual(scores["score_comments"], 15)
+
+        document = Document.objects.create(
+            display_name="Document",
+            description="",
+            category=self.category,
+            author=User.objects.get(username=fourth["username"]),
+            document_type=DocumentType.objects.get(display_name="Documents"),
+        )
+        document.likes.add(User.objects.get(username=first["username"]))
+        scores = self.get_scores(fourth)
+        self.assertEqual((scores["rank"], scores["score"]), (1, 1))
+        self.assertEqual(scores["score_documents"], 1)
+
+        document.author = User.objects.get(username=first["username"])
+        document.save()
+        self.assertEqual(self.get_scores(fourth)["score_documents"], 0)
+        self.assertEqual(self.get_scores(first)["score"], 1)
 
-# TODO check whether the returned values make sense (i.e. the scores are calculated correctly
+    def test_top_order(self):
+        self.post(f"/api/exam/setlike/{self.answers[3].id}/", {"like": 1})
+        res = self.get("/api/scoreboard/top/score/")["value"]
+        self.assertEqual(res[0]["username"], self.users[3]["username"])
+        self.assertEqual(res[0]["score"], 1)
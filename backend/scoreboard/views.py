@@ -1,26 +1,18 @@
 from django.contrib.auth.models import User
-from django.db.models import F
 from django.shortcuts import get_object_or_404
 
 from ediauth import auth_check
-from util import func_cache, response
+from scoreboard import ranking
+from util import response
 
 
 def get_user_scores(user, res):
-    list = get_ranking_list()
-    total_users = User.objects.count()
-    if user.username in list:
-        rank = list.index(user.username) + 1
-    else:
-        rank = total_users
-
     scores = user.scores
-
     res.update(
         {
-            "rank": rank,
-            "total_users": total_users,
-            "score": scores.document_likes + scores.upvotes - scores.downvotes,
+            "rank": ranking.get_rank(scores.score),
+            "total_users": ranking.get_total_users(),
+            "score": scores.score,
             "score_answers": scores.answers,
             "score_comments": scores.comments,
             "score_cuts": scores.cuts,
@@ -31,62 +23,6 @@ def get_user_scores(user, res):
     return res
 
 
-@func_cache.cache(600)
-def get_ranking_list():
-    return list(
-        User.objects.annotate(
-            score=F("scores__document_likes")
-            + F("scores__upvotes")
-            - F("scores__downvotes"),
-        )
-        .order_by("-score")
-        .values_list("username", flat=True)
-    )
-
-
-@func_cache.cache(600)
-def get_scoreboard_top(scoretype, limit):
-    users = User.objects.annotate(
-        displayName=F("profile__display_username"),
-        score=F("scores__document_likes")
-        + F("scores__upvotes")
-        - F("scores__downvotes"),
-        score_answers=F("scores__answers"),
-        score_comments=F("scores__comments"),
-        score_documents=F("scores__documents"),
-        score_cuts=F("scores__cuts"),
-        score_official=F("scores__official"),
-    )
-
-    if scoretype == "score":
-        users = users.order_by("-score")
-    elif scoretype == "score_answers":
-        users = users.order_by("-score_answers")
-    elif scoretype == "score_comments":
-        users = users.order_by("-score_comments")
-    elif scoretype == "score_documents":
-        users = users.order_by("-score_documents")
-    elif scoretype == "score_cuts":
-        users = users.order_by("-score_cuts")
-    elif scoretype == "score_official":
-        users = users.order_by("-score_official")
-    else:
-        return response.not_found()
-
-    return list(
-        users[:limit].values(
-            "username",
-            "displayName",
-            "score",
-            "score_answers",
-            "score_comments",
-            "score_cuts",
-            "score_official",
-            "score_documents",
-        )
-    )
-
-
 @response.request_get()
 @auth_check.require_login
 def userinfo(request, username):
@@ -112,4 +48,7 @@ def scoreboard_top(request, scoretype):
     limit = int(request.GET.get("limit", "10"))
     if limit > 10 and not auth_check.has_admin_rights(request):
         return response.not_allowed()
-    return response.success(value=get_scoreboard_top(scoretype, limit))
+    top = ranking.get_top(scoretype, limit)
+    if top is None:
+        return response.not_found()
+    return response.success(value=top)
@@ -18,7 +18,7 @@ from ediauth import auth_check
 from util import func_cache, response
 
 
-@func_cache.cache(3600 * 12)  # Cache for 12 hours
+@func_cache.cache(3600 * 12, shared=True)  # Cache for 12 hours
 def get_stats():
     stats = {}
 
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class UtilConfig(AppConfig):
     name = "util"
+
+    def ready(self):
+        from util import func_cache
+
+        if not settings.DEBUG and not settings.TESTING:
+            func_cache.warn_if_not_shared()
@@ -1,28 +1,156 @@
+import hashlib
+import logging
+import threading
 import time
+from collections import OrderedDict
 
 from django.conf import settings
+from django.core.cache import caches
+from django.db import models
+from prometheus_client import Counter
 
+"""
+Caches the results of functions for a limited time. The cache either lives in the
+process (`shared=False`), where it is a size capped LRU, or in the Django cache
+configured by `COMSOL_FUNC_CACHE_ALIAS` (`shared=True`), so that all gunicorn workers
+share the results and an invalidation reaches all of them. The latter needs a cache
+that is shared between processes, i.e. `REDIS_URL`. Otherwise the Django cache lives
+in each process as well, and `warn_if_not_shared` logs a warning at startup.
+
+Arguments are turned into keys by value, model instances by their primary key, so the
+cache never keeps model instances alive. Caching is disabled during tests.
+"""
+
+hits = Counter(
+    "comsol_func_cache_hits_total",
+    "Number of calls answered from the function cache",
+    ["function"],
+)
+misses = Counter(
+    "comsol_func_cache_misses_total",
+    "Number of calls of cached functions that had to be computed",
+    ["function"],
+)
+
+_missing = object()
+
+logger = logging.getLogger(__name__)
+
+
+def warn_if_not_shared():
+    """
+    Warns if the cache of `shared=True` is private to each process, in which case
+    invalidations only reach the process that made them and the others keep their
+    results until they expire.
+    """
+    backend = settings.CACHES[settings.COMSOL_FUNC_CACHE_ALIAS]["BACKEND"]
+    if backend.endswith(".LocMemCache"):
+        logger.warning(
+            "The function cache is not shared between processes, configure "
+            "REDIS_URL so that invalidations reach all of them"
+        )
+
+
+def make_key(item):
+    return tuple(
+        (arg._meta.label, arg.pk) if isinstance(arg, models.Model) else arg
+        for arg in item
+    )
+
+
+class LocalBackend:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _missing
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return _missing
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, validity):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + validity)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SharedBackend:
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def cache(self):
+        return caches[settings.COMSOL_FUNC_CACHE_ALIAS]
+
+    def _key(self, key):
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return f"func_cache:{self.name}:{digest}"
+
+    def get(self, key):
+        return self.cache.get(self._key(key), _missing)
+
+    def set(self, key, value, validity):
+        self.cache.set(self._key(key), value, timeout=validity)
+
+    def delete(self, key):
+        self.cache.delete(self._key(key))
+
+    def clear(self):
+        # Shared entries cannot be enumerated, they expire on their own
+        pass
+
+
+def cache(validity, maxsize=1024, shared=False):
+    """
+    Caches the results of the decorated function for `validity` seconds. Results are
+    kept in the process, at most `maxsize` of them, unless `shared` is set.
+    """
 
-def cache(validity):
     class FuncCache:
         def __init__(self, fun):
             self.fun = fun
-            self.cache = {}
-            self.cache_time = {}
+            self.name = f"{fun.__module__}.{fun.__qualname__}"
+            self.backend = SharedBackend(self.name) if shared else LocalBackend(maxsize)
 
         def __call__(self, *item):
-            if (
-                settings.TESTING
-                or item not in self.cache
-                or time.time() - self.cache_time[item] > validity
-            ):
-                self.cache[item] = self.fun(*item)
-                self.cache_time[item] = time.time()
-            return self.cache[item]
+            if settings.TESTING:
+                return self.fun(*item)
+            key = make_key(item)
+            value = self.backend.get(key)
+            if value is not _missing:
+                hits.labels(self.name).inc()
+                return value
+            misses.labels(self.name).inc()
+            value = self.fun(*item)
+            self.backend.set(key, value, validity)
+            return value
+
+        def invalidate(self, *item):
+            """Removes the cached result for the given arguments."""
+            self.backend.delete(make_key(item))
 
         def reset_cache(self, key):
-            if key in self.cache:
-                del self.cache[key]
-                del self.cache_time[key]
+            self.invalidate(*key)
+
+        def clear(self):
+            self.backend.clear()
 
     return FuncCache
@@ -23,7 +23,14 @@ class Command(BaseCommand):
                             ],
                             "AllowedHeaders": ["Range"],
                             "AllowedMethods": ["GET"],
-                            "ExposeHeaders": ["Accept-Ranges"],
+                            # Downloads are redirected to S3, viewers that
+                            # fetch ranges of documents need these
+                            "ExposeHeaders": [
+                                "Accept-Ranges",
+                                "Content-Range",
+                                "Content-Length",
+                                "ETag",
+                            ],
                             "MaxAgeSeconds": 3000,
                         }
                     ]
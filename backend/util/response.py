@@ -1,3 +1,4 @@
+import hashlib
 from datetime import datetime
 from functools import wraps
 
@@ -7,6 +8,8 @@ from django.http import (
     HttpResponseNotAllowed,
     JsonResponse,
 )
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from ninja import Schema
 
 
@@ -39,6 +42,36 @@ request_delete = request_method(["DELETE"])
 request_get = request_method(["GET"])
 
 
+def etag(*parts):
+    """
+    Returns a strong ETag for a response that is completely determined by `parts`.
+    """
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def conditional(etag_func):
+    """
+    Adds the ETag returned by `etag_func(request, *args, **kwargs)` to the response and
+    answers with 304 Not Modified if the client already has that version. `etag_func`
+    has to be much cheaper than the view itself and may return None if it cannot
+    tell, e.g. because the object does not exist. Responses depend on the user, so
+    they may only be kept by the browser and have to be revalidated on every use.
+    """
+
+    def wrap_func(f):
+        conditional_f = condition(etag_func=etag_func)(f)
+
+        @wraps(f)
+        def wrapper(request: WSGIRequest, *args, **kwargs):
+            res = conditional_f(request, *args, **kwargs)
+            patch_cache_control(res, private=True, no_cache=True)
+            return res
+
+        return wrapper
+
+    return wrap_func
+
+
 # Used in class based views
 def required_args(*req_args, optional=False):
     def wrap_func(f):
@@ -1,14 +1,39 @@
+import io
+import mimetypes
 import os
 import random
+from datetime import UTC, datetime
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
 from botocore.exceptions import ClientError
 from django.conf import settings
 from django.core.files.uploadedfile import UploadedFile
-from django.http import FileResponse
-
-from util import response
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    HttpResponseRedirect,
+)
+from django.utils.cache import patch_cache_control
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_http_date_safe,
+)
+
+from util import func_cache, response
+
+# Seconds for which the URLs of `presigned_get_object` stay valid
+PRESIGNED_URL_VALIDITY = 60 * 60 * 24
+# Seconds for which `serve_file` hands out the same presigned URL for a file, so that
+# browsers can cache what it points to. Redirects may be cached for the rest of the
+# validity of the URL.
+DOWNLOAD_URL_CACHE_VALIDITY = PRESIGNED_URL_VALIDITY // 2
+DOWNLOAD_REDIRECT_MAX_AGE = PRESIGNED_URL_VALIDITY - DOWNLOAD_URL_CACHE_VALIDITY
+# Seconds for which browsers may keep files that never change under their name
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
 
 
 def _patch_headers(request, **kwargs):
@@ -61,20 +86,37 @@ def save_uploaded_file_to_disk(dest: str, uploaded_file: UploadedFile):
             destination.write(chunk)
 
 
+def get_transfer_config():
+    """
+    Files larger than a part are uploaded in parts of `COMSOL_S3_UPLOAD_PART_SIZE`
+    bytes, `COMSOL_S3_UPLOAD_CONCURRENCY` at a time, so at most that many parts are
+    held in memory.
+    """
+    return TransferConfig(
+        multipart_threshold=settings.COMSOL_S3_UPLOAD_PART_SIZE,
+        multipart_chunksize=settings.COMSOL_S3_UPLOAD_PART_SIZE,
+        max_concurrency=settings.COMSOL_S3_UPLOAD_CONCURRENCY,
+    )
+
+
 def save_uploaded_file_to_s3(
     directory: str,
     filename: str,
     uploaded_file: UploadedFile,
     content_type: str | None = None,
 ):
-    temp_file_path = os.path.join(settings.COMSOL_UPLOAD_FOLDER, filename)
-    save_uploaded_file_to_disk(temp_file_path, uploaded_file)
+    """
+    Streams an uploaded file to S3, without another copy on disk.
+    """
     if content_type is None:
         content_type = uploaded_file.content_type
-    with open(temp_file_path, "rb") as temp_file:
-        s3_bucket.put_object(
-            Body=temp_file, Key=directory + filename, ContentType=content_type
-        )
+    uploaded_file.seek(0)
+    s3_bucket.upload_fileobj(
+        uploaded_file,
+        directory + filename,
+        ExtraArgs={"ContentType": content_type},
+        Config=get_transfer_config(),
+    )
 
 
 def save_file_to_s3(
@@ -83,10 +125,21 @@ def save_file_to_s3(
     path: str,
     content_type: str = "application/octet-stream",
 ):
-    with open(path, "rb") as file:
-        s3_bucket.put_object(
-            Body=file, Key=directory + filename, ContentType=content_type
-        )
+    s3_bucket.upload_file(
+        path,
+        directory + filename,
+        ExtraArgs={"ContentType": content_type},
+        Config=get_transfer_config(),
+    )
+
+
+def save_data_to_s3(directory: str, filename: str, data: bytes, content_type: str):
+    s3_bucket.upload_fileobj(
+        io.BytesIO(data),
+        directory + filename,
+        ExtraArgs={"ContentType": content_type},
+        Config=get_transfer_config(),
+    )
 
 
 def delete_file(directory, filename):
@@ -108,6 +161,21 @@ def delete_files(directory: str, filenames):
     return True
 
 
+def delete_files_with_prefix(directory: str, prefix: str):
+    try:
+        objects_to_delete = [
+            {"Key": obj.key}
+            for obj in s3_bucket.objects.filter(Prefix=directory + prefix)
+        ]
+        if objects_to_delete:
+            s3_client.delete_objects(
+                Bucket=s3_bucket_name, Delete={"Objects": objects_to_delete}
+            )
+    except ClientError:
+        return False
+    return True
+
+
 def delete_files_older_than(directory: str, prefix: str, cutoff_time):
     try:
         objects_to_delete = []
@@ -123,6 +191,18 @@ def delete_files_older_than(directory: str, prefix: str, cutoff_time):
     return True
 
 
+def get_file_content(directory: str, filename: str):
+    """
+    Returns the content of a file, or None if it does not exist.
+    """
+    try:
+        return s3_client.get_object(Bucket=s3_bucket_name, Key=directory + filename)[
+            "Body"
+        ].read()
+    except ClientError:
+        return None
+
+
 def save_file(directory: str, filename: str, destination: str):
     try:
         s3_bucket.download_file(directory + filename, destination)
@@ -141,41 +221,137 @@ def presigned_get_object(
     if display_name is None:
         display_name = filename
 
-    if inline:
-        content_disposition = "inline; filename=" + display_name
-    else:
-        content_disposition = "attachment; filename=" + display_name
+    params = {
+        "Bucket": s3_bucket_name,
+        "Key": directory + filename,
+        "ResponseContentDisposition": content_disposition_header(
+            not inline, display_name
+        ),
+    }
+    if content_type is not None:
+        params["ResponseContentType"] = content_type
     return s3_client.generate_presigned_url(
         ClientMethod="get_object",
-        Params={
-            "Bucket": s3_bucket_name,
-            "Key": directory + filename,
-            "ResponseContentDisposition": content_disposition,
-            "ResponseContentType": content_type,
-        },
-        ExpiresIn=60 * 60 * 24,
+        Params=params,
+        ExpiresIn=PRESIGNED_URL_VALIDITY,
         HttpMethod="GET",
     )
 
 
+# Shared, so that every worker hands out the same URL and browsers can cache what it
+# points to no matter which worker answers
+@func_cache.cache(DOWNLOAD_URL_CACHE_VALIDITY, shared=True)
+def get_download_url(directory, filename, inline, content_type, display_name):
+    return presigned_get_object(directory, filename, inline, content_type, display_name)
+
+
+def serve_file(
+    request,
+    directory: str,
+    filename: str,
+    as_attachment: bool = False,
+    attachment_filename: str | None = None,
+    immutable: bool = False,
+):
+    """
+    Serves a file from S3 without passing its content through the worker, depending
+    on `COMSOL_S3_DOWNLOAD_MODE`:
+
+    - "redirect": redirects to a presigned URL
+    - "accel": hands a presigned URL to the reverse proxy with X-Accel-Redirect
+    - "proxy": streams the file through the worker with `send_file`
+
+    Files that never change under their name, such as images, can be `immutable`,
+    which lets browsers cache the redirect or the file. Missing files are only
+    noticed by S3.
+    """
+    mode = settings.COMSOL_S3_DOWNLOAD_MODE
+    if mode == "proxy":
+        return send_file(
+            request, directory, filename, as_attachment, attachment_filename, immutable
+        )
+
+    url = get_download_url(
+        directory,
+        filename,
+        not as_attachment,
+        mimetypes.guess_type(filename)[0],
+        attachment_filename or filename,
+    )
+    if mode == "accel":
+        res = HttpResponse()
+        res["X-Accel-Redirect"] = settings.COMSOL_S3_ACCEL_REDIRECT_LOCATION + url
+    else:
+        res = HttpResponseRedirect(url)
+    if immutable:
+        patch_cache_control(res, public=True, max_age=DOWNLOAD_REDIRECT_MAX_AGE)
+    else:
+        patch_cache_control(res, private=True, no_cache=True)
+    return res
+
+
 def send_file(
+    request,
     directory: str,
     filename: str,
     as_attachment: bool = False,
     attachment_filename: str | None = None,
+    immutable: bool = False,
 ):
+    """
+    Streams a file from S3 through the worker. Byte ranges and the validators of the
+    request are passed on to S3, so that viewers can seek and browsers revalidate
+    their copy instead of downloading it again.
+    """
+    params = {"Bucket": s3_bucket_name, "Key": directory + filename}
+    if "If-None-Match" in request.headers:
+        params["IfNoneMatch"] = request.headers["If-None-Match"]
+    elif "If-Modified-Since" in request.headers:
+        modified_since = parse_http_date_safe(request.headers["If-Modified-Since"])
+        if modified_since is not None:
+            params["IfModifiedSince"] = datetime.fromtimestamp(modified_since, UTC)
+    # S3 cannot check If-Range, so such requests get the whole file
+    if "Range" in request.headers and "If-Range" not in request.headers:
+        params["Range"] = request.headers["Range"]
+
     try:
-        attachment_filename = attachment_filename or filename
-        data = s3_client.get_object(
-            Bucket=s3_bucket_name,
-            Key=directory + filename,
-        )
-        return FileResponse(
-            data["Body"], as_attachment=as_attachment, filename=attachment_filename
-        )
-    except ClientError:
+        data = s3_client.get_object(**params)
+    except ClientError as e:
+        status = e.response["ResponseMetadata"]["HTTPStatusCode"]
+        if status == 304:
+            res = HttpResponseNotModified()
+            headers = e.response["ResponseMetadata"].get("HTTPHeaders", {})
+            if "etag" in headers:
+                res["ETag"] = headers["etag"]
+            _patch_file_cache_control(res, immutable)
+            return res
+        if status == 416:
+            return HttpResponse(status=416)
         return response.not_found()
 
+    res = FileResponse(
+        data["Body"],
+        as_attachment=as_attachment,
+        filename=attachment_filename or filename,
+        status=206 if "ContentRange" in data else 200,
+    )
+    res["Content-Length"] = data["ContentLength"]
+    res["Accept-Ranges"] = "bytes"
+    if "ContentRange" in data:
+        res["Content-Range"] = data["ContentRange"]
+    res["ETag"] = data["ETag"]
+    res["Last-Modified"] = http_date(data["LastModified"].timestamp())
+    _patch_file_cache_control(res, immutable)
+    return res
+
+
+def _patch_file_cache_control(res, immutable):
+    if immutable:
+        patch_cache_control(res, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        # Revalidated with the ETag on every use
+        patch_cache_control(res, private=True, no_cache=True)
+
 
 def is_file_in_s3(directory, filename):
     try:
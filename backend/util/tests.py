@@ -0,0 +1,215 @@
+import os
+import urllib.request
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from images.models import Image
+from testing.tests import ComsolTest
+from util import func_cache, s3_util
+
+
+@override_settings(TESTING=False)
+class TestFuncCache(ComsolTest):
+    def mySetUp(self):
+        cache.clear()
+        self.calls = []
+
+    def make_cached(self, **kwargs):
+        @func_cache.cache(60, **kwargs)
+        def square(x):
+            self.calls.append(x)
+            return x * x
+
+        return square
+
+    def test_local(self):
+        square = self.make_cached(maxsize=2)
+        self.assertEqual([square(2), square(2), square(3)], [4, 4, 9])
+        self.assertEqual(self.calls, [2, 3])
+        # 2 was used more recently than 3, so 3 is evicted
+        square(2)
+        square(4)
+        square(2)
+        square(3)
+        self.assertEqual(self.calls, [2, 3, 4, 3])
+        self.assertEqual(len(square.backend.entries), 2)
+
+    def test_expiry(self):
+        square = self.make_cached()
+        square(2)
+        with mock.patch("time.monotonic", return_value=10**12):
+            square(2)
+        self.assertEqual(self.calls, [2, 2])
+
+    def test_shared(self):
+        square = self.make_cached(shared=True)
+        other_worker = func_cache.cache(60, shared=True)(square.fun)
+        square(2)
+        self.assertEqual(other_worker(2), 4)
+        self.assertEqual(self.calls, [2])
+        other_worker.invalidate(2)
+        square(2)
+        self.assertEqual(self.calls, [2, 2])
+
+    def test_model_keys(self):
+        square = self.make_cached()
+        user = self.get_my_user()
+        square(1)
+        self.assertEqual(list(square.backend.entries), [(1,)])
+        cached = func_cache.cache(60)(lambda user: user.username)
+        cached(user)
+        self.assertEqual(list(cached.backend.entries), [(("auth.User", user.pk),)])
+        self.assertEqual(cached(User.objects.get(pk=user.pk)), user.username)
+
+    def test_metrics(self):
+        square = self.make_cached()
+        hits = func_cache.hits.labels(square.name)
+        misses = func_cache.misses.labels(square.name)
+        hits_before, misses_before = hits._value.get(), misses._value.get()
+        square(2)
+        square(2)
+        self.assertEqual(hits._value.get() - hits_before, 1)
+        self.assertEqual(misses._value.get() - misses_before, 1)
+
+    def test_warn_if_not_shared(self):
+        with self.assertLogs("util.func_cache", "WARNING"):
+            func_cache.warn_if_not_shared()
+        redis = {"BACKEND": "django.core.cache.backends.redis.RedisCache"}
+        with (
+            override_settings(CACHES={"default": redis}),
+            self.assertNoLogs("util.func_cache", "WARNING"),
+        ):
+            func_cache.warn_if_not_shared()
+
+
+class TestS3Download(ComsolTest):
+    def mySetUp(self):
+        self.filename = s3_util.generate_filename(16, settings.COMSOL_IMAGE_DIR, ".png")
+        s3_util.save_uploaded_file_to_s3(
+            settings.COMSOL_IMAGE_DIR,
+            self.filename,
+            SimpleUploadedFile(self.filename, b"image", "image/png"),
+        )
+        self.addCleanup(s3_util.delete_file, settings.COMSOL_IMAGE_DIR, self.filename)
+        Image(
+            filename=self.filename, owner=self.get_my_user(), displayname="image.png"
+        ).save()
+
+    def download(self):
+        return self.get(
+            f"/api/image/get/{self.filename}/",
+            status_code=302,
+            test_post=False,
+            as_json=False,
+        )
+
+    def test_redirect(self):
+        res = self.download()
+        self.assertIn("public", res["Cache-Control"])
+        with urllib.request.urlopen(res["Location"]) as download:
+            self.assertEqual(download.read(), b"image")
+            self.assertEqual(download.headers["Content-Type"], "image/png")
+            self.assertTrue(
+                download.headers["Content-Disposition"].startswith("inline")
+            )
+
+    @override_settings(TESTING=False)
+    def test_redirect_url_cached(self):
+        cache.clear()
+        with mock.patch.object(
+            s3_util, "presigned_get_object", wraps=s3_util.presigned_get_object
+        ) as presigned_get_object:
+            url = self.download()["Location"]
+            self.assertEqual(self.download()["Location"], url)
+            # Other workers hand out the same URL
+            other_worker = func_cache.cache(60, shared=True)(
+                s3_util.get_download_url.fun
+            )
+            self.assertEqual(
+                other_worker(
+                    settings.COMSOL_IMAGE_DIR,
+                    self.filename,
+                    True,
+                    "image/png",
+                    self.filename,
+                ),
+                url,
+            )
+        self.assertEqual(presigned_get_object.call_count, 1)
+
+    @override_settings(COMSOL_S3_DOWNLOAD_MODE="accel")
+    def test_accel(self):
+        res = self.get(
+            f"/api/image/get/{self.filename}/", test_post=False, as_json=False
+        )
+        self.assertTrue(res["X-Accel-Redirect"].startswith("/internal-s3/http"))
+
+    def proxy(self, **headers):
+        with override_settings(COMSOL_S3_DOWNLOAD_MODE="proxy"):
+            return self.client.get(f"/api/image/get/{self.filename}/", **headers)
+
+    def test_proxy(self):
+        res = self.proxy()
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b"".join(res.streaming_content), b"image")
+        self.assertEqual(res["Content-Length"], "5")
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", res["Cache-Control"])
+        self.assertIn("Last-Modified", res)
+
+    def test_proxy_range(self):
+        res = self.proxy(HTTP_RANGE="bytes=1-3")
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b"".join(res.streaming_content), b"mag")
+        self.assertEqual(res["Content-Range"], "bytes 1-3/5")
+        self.assertEqual(res["Content-Length"], "3")
+
+        res = self.proxy(HTTP_RANGE="bytes=10-")
+        self.assertEqual(res.status_code, 416)
+
+    def test_proxy_not_modified(self):
+        etag = self.proxy()["ETag"]
+        res = self.proxy(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], etag)
+        self.assertEqual(self.proxy(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+        last_modified = self.proxy()["Last-Modified"]
+        res = self.proxy(HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(res.status_code, 304)
+
+
+class TestS3Upload(ComsolTest):
+    def upload(self, data):
+        filename = s3_util.generate_filename(16, settings.COMSOL_FILESTORE_DIR, ".bin")
+        uploads = set(os.listdir(settings.COMSOL_UPLOAD_FOLDER))
+        s3_util.save_uploaded_file_to_s3(
+            settings.COMSOL_FILESTORE_DIR,
+            filename,
+            SimpleUploadedFile(filename, data, "application/octet-stream"),
+        )
+        self.addCleanup(s3_util.delete_file, settings.COMSOL_FILESTORE_DIR, filename)
+        # Nothing is left behind in the upload folder
+        self.assertEqual(set(os.listdir(settings.COMSOL_UPLOAD_FOLDER)), uploads)
+        return s3_util.s3_client.get_object(
+            Bucket=s3_util.s3_bucket_name,
+            Key=settings.COMSOL_FILESTORE_DIR + filename,
+        )
+
+    def test_small(self):
+        obj = self.upload(b"small file")
+        self.assertEqual(obj["Body"].read(), b"small file")
+        self.assertEqual(obj["ContentType"], "application/octet-stream")
+
+    @override_settings(COMSOL_S3_UPLOAD_PART_SIZE=5 * 1024 * 1024)
+    def test_multipart(self):
+        data = os.urandom(11 * 1024 * 1024)
+        obj = self.upload(data)
+        self.assertEqual(obj["Body"].read(), data)
+        # The ETag of a multipart upload ends with the number of parts
+        self.assertTrue(obj["ETag"].strip('"').endswith("-3"))
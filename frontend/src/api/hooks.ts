@@ -7,7 +7,6 @@ import {
   CategoryMetaData,
   CategoryMetaDataMinimal,
   CourseStats,
-  CutVersions,
   ExamMetaData,
   MetaCategory,
   NotificationEnabled,
@@ -252,10 +251,6 @@ export const loadSplitRenderer = async (filename: string) => {
   const renderer = new PDF(pdf);
   return [pdf, renderer] as const;
 };
-export const loadCutVersions = async (filename: string) => {
-  return (await fetchGet(`/api/exam/cutversions/${filename}/`))
-    .value as CutVersions;
-};
 export const loadCuts = async (filename: string) => {
   return (await fetchGet(`/api/exam/cuts/${filename}/`))
     .value as ServerCutResponse;
@@ -1,23 +1,21 @@
-import React, { useState, useMemo, useEffect, useCallback } from "react";
+import React, { useMemo, useEffect, useCallback } from "react";
 import {
   ExamMetaData,
   Section,
   SectionKind,
   EditMode,
   EditState,
-  CutVersions,
   PdfSection,
   CutUpdate,
 } from "../interfaces";
 import AnswerSectionComponent from "./answer-section";
 import PdfSectionCanvas from "../pdf/pdf-section-canvas";
-import { useRequest } from "ahooks";
-import { loadCutVersions } from "../api/hooks";
 import PDF from "../pdf/pdf-renderer";
 import { fetchGet } from "../api/fetch-utils";
 import { getAnswerSectionId } from "../utils/exam-utils";
 import { useLocation } from "react-router-dom";
 import { useScrollToPermalink } from "../hooks/useScrollToPermalink";
+import useCutVersions from "../hooks/useCutVersions";
 
 interface Props {
   metaData: ExamMetaData;
@@ -104,13 +102,7 @@ const Exam: React.FC<Props> = React.memo(
       [editState, metaData.filename, onAddCut, onMoveCut],
     );
 
-    const [cutVersions, setCutVersions] = useState<CutVersions>({});
-    useRequest(() => loadCutVersions(metaData.filename), {
-      pollingInterval: 60_000,
-      onSuccess: response => {
-        setCutVersions(oldVersions => ({ ...oldVersions, ...response }));
-      },
-    });
+    const [cutVersions, setCutVersions] = useCutVersions(metaData.filename);
     const snap =
       editState.mode === EditMode.Add || editState.mode === EditMode.Move
         ? editState.snap
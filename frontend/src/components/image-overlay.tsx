@@ -108,7 +108,10 @@ const ImageModal: React.FC<ModalProps> = ({
                 }
               >
                 <Card.Section>
-                  <Image src={`/api/image/get/${image}/`} alt={image} />
+                  <Image
+                    src={`/api/image/get/${image}/?w=320&fmt=webp`}
+                    alt={image}
+                  />
                 </Card.Section>
               </Card>
               <Center>
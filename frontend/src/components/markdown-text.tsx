@@ -24,7 +24,8 @@ const transformImageUri = (
 ) => {
   if (uri.startsWith("pending:")) return pendingImages?.get(uri) ?? "";
   if (uri.includes("/")) return uri;
-  return `/api/image/get/${uri}/`;
+  // Scaled down and re-encoded by the backend, which serves SVGs and GIFs as they are
+  return `/api/image/get/${uri}/?w=1920&fmt=webp`;
 };
 
 export const slugifyHeading = (text: string) => {
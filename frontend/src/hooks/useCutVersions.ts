@@ -0,0 +1,36 @@
+import { useEffect, useState } from "react";
+import { CutVersions } from "../interfaces";
+
+interface SectionEvent {
+  oid: number;
+  // null if the section was removed
+  cutVersion: number | null;
+}
+
+/**
+ * Follows the versions of the answer sections of an exam through the server-sent
+ * events of `/api/exam/events/`. The first event lists all versions, every later
+ * one a section that changed. The browser reconnects on its own whenever the
+ * stream ends and gets all versions again. The versions can also be set locally,
+ * e.g. after the user changed a section.
+ */
+const useCutVersions = (filename: string) => {
+  const [cutVersions, setCutVersions] = useState<CutVersions>({});
+  useEffect(() => {
+    const source = new EventSource(`/api/exam/events/${filename}/`);
+    source.addEventListener("versions", event => {
+      const versions = JSON.parse(event.data) as CutVersions;
+      setCutVersions(oldVersions => ({ ...oldVersions, ...versions }));
+    });
+    source.addEventListener("section", event => {
+      const { oid, cutVersion } = JSON.parse(event.data) as SectionEvent;
+      if (cutVersion === null) return;
+      setCutVersions(oldVersions => ({ ...oldVersions, [oid]: cutVersion }));
+    });
+    return () => {
+      source.close();
+    };
+  }, [filename]);
+  return [cutVersions, setCutVersions] as const;
+};
+export default useCutVersions;